@@ -0,0 +1,316 @@
+"""
+Overload protection for the chat routes.
+
+    with admission.admit("get_response", client, request_timeout):
+        ...
+
+Each route has a Gate: at most `limit` requests run at once and at most
+`queue_size` wait for a slot. Anything beyond that is turned away at once
+with a 503 instead of joining an ever longer queue. Every request gets a
+deadline, MEDIBOT_REQUEST_BUDGET seconds after it arrived (or sooner if the
+client sends X-Request-Timeout). A request still queued at its deadline is
+rejected, and the deadline bounds the lookups it makes, retries included.
+If MEDIBOT_CLIENT_RATE is set, per-client token buckets answer 429 to a
+client sending faster than that. It is off by default: behind a reverse proxy
+every client has the proxy's address. While a route is saturated, chat replies skip their
+OpenFDA/Nominatim lookups (see should_shed()).
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from http_client import TokenBucket
+import metrics
+
+# Requests running at once per route (0 = no limit) and requests queued behind them
+LIMIT = int(os.environ.get("MEDIBOT_ADMISSION_LIMIT", 8))
+QUEUE_SIZE = int(os.environ.get("MEDIBOT_ADMISSION_QUEUE", 16))
+# Seconds from arrival to the point an answer is no longer worth sending
+REQUEST_BUDGET = float(os.environ.get("MEDIBOT_REQUEST_BUDGET", 5.0))
+# Requests per second per client address (0 = unlimited, the default), with bursts of CLIENT_BURST
+CLIENT_RATE = float(os.environ.get("MEDIBOT_CLIENT_RATE", 0))
+CLIENT_BURST = int(os.environ.get("MEDIBOT_CLIENT_BURST", 20))
+MAX_CLIENTS = 10000
+# Lookups need at least this much of the budget left to be worth starting
+LOOKUP_BUDGET = float(os.environ.get("MEDIBOT_LOOKUP_BUDGET", 0.5))
+
+BUSY = "MediBot is busy, please try again in a moment."
+
+
+class Rejected(Exception):
+    """
+    A request turned away by admission control: `status` is 429 or 503, `cause`
+    one of "rate_limited", "queue_full" or "deadline".
+    """
+
+    def __init__(self, status, cause, reason, retry_after=1):
+        super().__init__(reason)
+        self.status = status
+        self.cause = cause
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Gate:
+    """
+    Concurrency limit with a bounded FIFO queue. A released slot is handed
+    straight to the oldest waiter, so late arrivals can't overtake the queue.
+    Threads wait in enter(), asyncio tasks in enter_async(); both can share a gate.
+    """
+
+    def __init__(self, name, limit=LIMIT, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.expired = 0
+        self.shed_lookups = 0
+
+    def _try_enter(self, wake):
+        """Takes a free slot (True) or queues `wake` (False); raises Rejected if the queue is full. Holds the lock."""
+        if self.limit <= 0 or (self.active < self.limit and not self._waiters):
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise Rejected(503, "queue_full", BUSY)
+        self._waiters.append(wake)
+        self.queued += 1
+        return False
+
+    def _give_up(self, wake):
+        """Leaves the queue at the deadline; returns False if a slot was handed over just before."""
+        with self._lock:
+            try:
+                self._waiters.remove(wake)
+            except ValueError:
+                return False
+            self.expired += 1
+        return True
+
+    def enter(self, deadline):
+        """Blocks until a slot is free; raises Rejected if the queue is full or `deadline` passes first."""
+        event = threading.Event()
+        with self._lock:
+            if self._try_enter(event.set):
+                return
+        if not event.wait(max(0.0, deadline - time.monotonic())) and self._give_up(event.set):
+            raise Rejected(503, "deadline", BUSY)
+
+    async def enter_async(self, deadline):
+        """asyncio version of enter()."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        wake = functools.partial(loop.call_soon_threadsafe, _resolve, future)
+        with self._lock:
+            if self._try_enter(wake):
+                return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            if self._give_up(wake):
+                raise Rejected(503, "deadline", BUSY)
+        except asyncio.CancelledError:
+            # The client went away while queued; pass on a slot we were handed meanwhile
+            if not self._give_up(wake):
+                self.leave()
+            raise
+
+    def leave(self):
+        with self._lock:
+            if not self._waiters:
+                self.active -= 1
+                return
+            wake = self._waiters.popleft()
+            self.admitted += 1
+        wake()
+
+    def saturated(self):
+        """True when requests are queueing for this route."""
+        return bool(self._waiters)
+
+    def stats(self):
+        return {"limit": self.limit, "queue_size": self.queue_size, "active": self.active,
+                "waiting": len(self._waiters), "admitted": self.admitted, "queued": self.queued,
+                "rejected": self.rejected, "expired": self.expired, "shed_lookups": self.shed_lookups}
+
+
+class ClientLimiter:
+    """Token bucket per client address, for the `max_clients` most recent clients."""
+
+    def __init__(self, rate=CLIENT_RATE, burst=CLIENT_BURST, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self, client):
+        """Raises Rejected (429) if `client` is over its rate."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, max_wait=0)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+        if bucket.reserve() is None:
+            self.rejected += 1
+            raise Rejected(429, "rate_limited", "Too many messages, please slow down.",
+                           retry_after=max(1, round(1 / self.rate)))
+
+    def stats(self):
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self._buckets), "rejected": self.rejected}
+
+
+class Ticket:
+    """
+    An admitted request. Inside `with ticket:` its deadline is visible to
+    remaining() and should_shed(); leaving the block (or release()) frees its slot.
+    """
+
+    def __init__(self, gate, deadline):
+        self.gate = gate
+        self.deadline = deadline
+        self._released = False
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        self.release()
+
+    def release(self):
+        # Idempotent, so a streamed response can release from its generator or its close hook
+        if not self._released:
+            self._released = True
+            self.gate.leave()
+
+    def hold(self, events):
+        """Wraps a response generator so the ticket is active while it runs and released when it ends."""
+        with self:
+            yield from events
+
+    async def hold_async(self, events):
+        with self:
+            async for event in events:
+                yield event
+
+
+_current = contextvars.ContextVar("medibot_admission", default=None)
+gates = {}
+_gates_lock = threading.Lock()
+_gate_settings = {}
+clients = ClientLimiter()
+
+
+def gate(route):
+    with _gates_lock:
+        if route not in gates:
+            gates[route] = Gate(route, **_gate_settings)
+        return gates[route]
+
+
+def configure(client_rate=None, client_burst=None, **gate_settings):
+    """
+    Replaces the gates and client limiter, e.g. configure(limit=4, queue_size=8, client_rate=0).
+    Accepts the Gate keyword arguments limit and queue_size.
+    """
+    global clients
+    with _gates_lock:
+        gates.clear()
+        _gate_settings.clear()
+        _gate_settings.update(gate_settings)
+    clients = ClientLimiter(CLIENT_RATE if client_rate is None else client_rate,
+                            CLIENT_BURST if client_burst is None else client_burst)
+
+
+def request_deadline(request_timeout=None):
+    """Monotonic deadline for a request arriving now; a client's X-Request-Timeout can only shorten it."""
+    budget = REQUEST_BUDGET
+    try:
+        if request_timeout is not None and float(request_timeout) > 0:
+            budget = min(budget, float(request_timeout))
+    except ValueError:
+        pass
+    return time.monotonic() + budget
+
+
+def admit(route, client=None, request_timeout=None):
+    """Waits for a slot on `route`'s gate and returns its Ticket; raises Rejected (429/503) instead."""
+    deadline = request_deadline(request_timeout)
+    route_gate = gate(route)
+    try:
+        clients.check(client)
+        route_gate.enter(deadline)
+    except Rejected as e:
+        metrics.record_shed(route, e.cause)
+        raise
+    return Ticket(route_gate, deadline)
+
+
+async def admit_async(route, client=None, request_timeout=None):
+    """asyncio version of admit()."""
+    deadline = request_deadline(request_timeout)
+    route_gate = gate(route)
+    try:
+        clients.check(client)
+        await route_gate.enter_async(deadline)
+    except Rejected as e:
+        metrics.record_shed(route, e.cause)
+        raise
+    return Ticket(route_gate, deadline)
+
+
+def remaining():
+    """Seconds left in the current request's budget, or None outside an admitted request."""
+    ticket = _current.get()
+    return None if ticket is None else ticket.deadline - time.monotonic()
+
+
+def should_shed():
+    """
+    True if the current request should skip its integration lookup: its route
+    is saturated, or too little of its budget is left for an upstream call.
+    """
+    ticket = _current.get()
+    if ticket is None:
+        return False
+    if ticket.gate.saturated() or ticket.deadline - time.monotonic() < LOOKUP_BUDGET:
+        ticket.gate.shed_lookups += 1
+        metrics.record_shed(ticket.gate.name, "lookup")
+        return True
+    return False
+
+
+def current_deadline():
+    """The current request's deadline (time.monotonic()), for upstream calls; None outside an admitted request."""
+    ticket = _current.get()
+    return None if ticket is None else ticket.deadline
+
+
+def stats():
+    with _gates_lock:
+        routes = {name: g.stats() for name, g in gates.items()}
+    return {"routes": routes, "clients": clients.stats()}
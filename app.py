@@ -1,155 +1,455 @@
-from flask import Flask, render_template, request, jsonify
-import pickle
-import nltk
+from flask import Flask, Response, render_template, request, jsonify
+import numpy as np
+import json
 import os
 import random
-import re
-from nltk.stem import WordNetLemmatizer
-from integrations import get_drug_info, get_hospitals
+import admission
+import entities
+from featurizer import FusedFeaturizer
+from integrations import get_drug_info, get_hospitals, cache_stats
+from intent_cache import IntentCache, iter_patterns
+import metrics
+from model_registry import ModelRegistry
+from preprocessing import preprocess_text
+import preprocessing
+import sessions
 
 app = Flask(__name__)
 
-lemmatizer = WordNetLemmatizer()
-model = None
-vectorizer = None
-tag_map = None
+# Confidence tiers for the Smart Fallback
+LOW_CONFIDENCE = 0.15
+SUGGEST_CONFIDENCE = 0.35
+SUGGESTION_MIN_PROB = 0.08
+TOP_K = 3
+MAX_BATCH_SIZE = 5000
 
-def load_artifacts():
-    global model, vectorizer, tag_map
-    if not os.path.exists('chat_model.pkl'):
-        return False
+FALLBACK_MESSAGE = ("I'm not sure I understand. I can help with:<br>"
+                    "💊 **Drugs** (e.g. 'About Aspirin')<br>"
+                    "🏥 **Hospitals** (e.g. 'Hospital near me')<br>"
+                    "🩺 **Symptoms** (e.g. 'I have a fever')")
+# Prefixed to the intent's static reply when admission control skips a lookup
+SHED_NOTE = "⏳ MediBot is very busy right now, so live FDA and hospital lookups are paused.<br>"
 
-    with open('chat_model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    
-    with open('vectorizer.pkl', 'rb') as f:
-        vectorizer = pickle.load(f)
-    
-    with open('tag_map.pkl', 'rb') as f:
-        tag_map = pickle.load(f)
-    return True
+# Serving artifacts; each request reads registry.current once and uses it to the end
+# (prepare_artifacts is defined below)
+registry = ModelRegistry(prepare=lambda artifacts: prepare_artifacts(artifacts))
+MODEL_POLL_SECONDS = float(os.environ.get("MEDIBOT_MODEL_POLL_SECONDS", 5))
+ADMIN_TOKEN = os.environ.get("MEDIBOT_ADMIN_TOKEN")
 
-def preprocess_text(text):
-    tokens = nltk.word_tokenize(text)
-    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
+def load_artifacts(prefer_bundle=True):
+    # A model_bundle/ export starts faster and doesn't need scikit-learn at all
+    registry.prefer_bundle = prefer_bundle
+    registry.reload()
+    return registry.current is not None
+
+def create_app(watch=True):
+    """
+    Loads the model and returns the Flask app, ready for a WSGI server.
+    Pass watch=False when the process will fork; start the watcher in each worker instead.
+    """
+    if load_artifacts():
+        print(f"Model {registry.version} loaded successfully.")
+    else:
+        print("Model not found. Run train.py first.")
+    if watch and MODEL_POLL_SECONDS > 0:
+        registry.start_watching(MODEL_POLL_SECONDS)
+    return app
 
 def extract_drug_name(user_input):
-    # Simple regex to catch common "drug" queries. In a real app, use NER (Spacy/Bert)
-    # Patterns: "side effects of X", "tell me about X", "what is X"
-    match = re.search(r'(?:of|about|is|drug)\s+([a-zA-Z]+)', user_input, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    return None
+    # Canonical name from the drug gazetteer ("is advil safe" -> "Advil", "paracetamol" -> "acetaminophen").
+    # Unknown names return None, so they never cost an OpenFDA round trip.
+    return entities.find_drug(user_input)
 
 def extract_city(user_input):
-    # Simple regex to extract city after "in", "at", or "near"
-    match = re.search(r'(?:in|at|near)\s+([a-zA-Z\s]+)', user_input, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return None
+    # Canonical name from the city gazetteer, tolerating one typo ("hospitals in londn" -> "London")
+    return entities.find_city(user_input)
 
 def get_readable_tag(tag):
     """Converts a tag like 'symptom_flu' to 'Flu Symptoms'."""
     return tag.replace('_', ' ').title()
 
-def get_bot_response(user_input):
-    if not model:
-        return "Error: Brain not loaded."
+def top_k_predictions(probabilities, k=TOP_K):
+    """Returns (indices, probs) of the k most likely classes per row, best first."""
+    k = min(k, probabilities.shape[1])
+    # argpartition avoids sorting every class just to read the top few
+    candidates = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    candidate_probs = np.take_along_axis(probabilities, candidates, axis=1)
+    order = np.argsort(-candidate_probs, axis=1)
+    top_indices = np.take_along_axis(candidates, order, axis=1)
+    top_probs = np.take_along_axis(candidate_probs, order, axis=1)
+    return top_indices, top_probs
 
-    processed_input = preprocess_text(user_input)
-    vectorized_input = vectorizer.transform([processed_input])
-    
-    # Predict probabilities for all classes
-    probabilities = model.predict_proba(vectorized_input)[0]
-    
-    # Get top 3 predictions
-    top_indices = probabilities.argsort()[-3:][::-1]
-    top_probs = probabilities[top_indices]
-    top_tags = model.classes_[top_indices]
-    
+def prepare_artifacts(artifacts):
+    """
+    Gives a model generation its fused featurizer and its own intent cache,
+    pre-scored with the training patterns.
+    """
+    try:
+        artifacts.featurizer = FusedFeaturizer.from_vectorizer(artifacts.vectorizer)
+    except ValueError as e:
+        print(f"Serving with the vectorizer's own transform: {e}")
+    artifacts.intent_cache = IntentCache(artifacts.model, artifacts.vectorizer, featurizer=artifacts.featurizer)
+    artifacts.intent_cache.warm(iter_patterns(), top_k_predictions)
+
+def preprocess_message(user_input, artifacts):
+    """
+    Preprocessed form of a message for classify_processed(): its feature indices
+    when the generation has a fused featurizer, else the lemmatized text.
+    """
+    if artifacts.featurizer is not None:
+        return artifacts.featurizer.features(user_input)
+    return preprocess_text(user_input)
+
+def classify_processed(processed_inputs, artifacts, stage_prefix=""):
+    """
+    Returns (top_tags, top_probs) per preprocess_message() result. Messages whose
+    features are in the generation's intent cache skip the vectorizer and the model.
+    """
+    start = metrics.now()
+    cache = artifacts.intent_cache
+    keys = [cache.key(p) for p in processed_inputs] if cache is not None else [None] * len(processed_inputs)
+    results = [cache.get(key) if cache is not None else None for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+    start = metrics.stage_done(stage_prefix + "intent_cache", start)
+    if misses:
+        # One sparse matrix for all misses keeps sklearn overhead per call, not per message
+        if artifacts.featurizer is not None:
+            vectorized_inputs = artifacts.featurizer.transform_features([processed_inputs[i] for i in misses])
+        else:
+            vectorized_inputs = artifacts.vectorizer.transform([processed_inputs[i] for i in misses])
+        start = metrics.stage_done(stage_prefix + "vectorize", start)
+        probabilities = artifacts.model.predict_proba(vectorized_inputs)
+        top_indices, top_probs = top_k_predictions(probabilities)
+        top_tags = artifacts.model.classes_[top_indices]
+        metrics.stage_done(stage_prefix + "predict", start)
+        for row, i in enumerate(misses):
+            results[i] = (top_tags[row], top_probs[row])
+            if cache is not None:
+                cache.put(keys[i], top_tags[row], top_probs[row])
+    return results
+
+def resolve_intent(user_input, top_tags, top_probs, tag_map):
+    """
+    Applies the Smart Fallback tiers to one classified message.
+    Returns (tag, entity, reply): reply is None when an integration lookup for
+    `entity` is still needed to answer `tag`.
+    """
     max_prob = top_probs[0]
     best_tag = top_tags[0]
+    tier = "low" if max_prob < LOW_CONFIDENCE else "suggest" if max_prob < SUGGEST_CONFIDENCE else "confident"
+    metrics.record_classification(best_tag, float(max_prob), tier)
     
     # Logic for Smart Fallback
     # Case 1: Low confidence (Complete confusion)
-    if max_prob < 0.15: 
-        return ("I'm not sure I understand. I can help with:<br>"
-                "💊 **Drugs** (e.g. 'About Aspirin')<br>"
-                "🏥 **Hospitals** (e.g. 'Hospital near me')<br>"
-                "🩺 **Symptoms** (e.g. 'I have a fever')")
+    if tier == "low": 
+        return None, None, FALLBACK_MESSAGE
     
     # Case 2: Medium confidence (Ambiguity - Suggest options)
     # Lowered threshold to 0.35 because calibrated probabilities are conservative
-    elif max_prob < 0.35:
+    elif tier == "suggest":
         suggestions = ""
         for i in range(len(top_tags)):
             # Only suggest if reasonable probability (> 0.08) to improve relevance
-            if top_probs[i] > 0.08: 
+            if top_probs[i] > SUGGESTION_MIN_PROB: 
                 readable = get_readable_tag(top_tags[i])
                 suggestions += f"- {readable}<br>"
         
         # If no suggestions passed the filter, fallback to generic
         if not suggestions:
-            return ("I'm not sure I understand. I can help with:<br>"
-                "💊 **Drugs** (e.g. 'About Aspirin')<br>"
-                "🏥 **Hospitals** (e.g. 'Hospital near me')<br>"
-                "🩺 **Symptoms** (e.g. 'I have a fever')")
+            return None, None, FALLBACK_MESSAGE
 
-        return (f"I'm not quite sure, but did you mean one of these?<br><br>"
-                f"{suggestions}<br>"
-                f"Please try rephrasing your question.")
+        return None, None, (f"I'm not quite sure, but did you mean one of these?<br><br>"
+                            f"{suggestions}<br>"
+                            f"Please try rephrasing your question.")
 
     # Case 3: High confidence (Proceed as normal)
     tag = best_tag
     
     # INTEGRATION: Check for Drug Lookup
     if tag == "drug_lookup":
+        start = metrics.now()
         drug_name = extract_drug_name(user_input)
+        metrics.stage_done("extract", start)
         if drug_name:
-            info = get_drug_info(drug_name)
-            if info["found"]:
-                return f"**{info['name'].upper()}Info:**<br>Purpose: {info['purpose']}<br><br>⚠️ Warnings: {info['warnings']}"
-            else:
-                return f"I couldn't find specific FDA info for '{drug_name}'. Please check the spelling."
-        else:
-             return "Please specify the drug name (e.g., 'Advise on Aspirin')."
+            return tag, drug_name, None
+        return tag, None, "Please specify the drug name (e.g., 'Advise on Aspirin')."
 
     # INTEGRATION: Check for Hospital Search
     if tag == "hospital_search":
+        start = metrics.now()
         city = extract_city(user_input)
+        metrics.stage_done("extract", start)
         if city:
-            info = get_hospitals(city)
-            if info["found"]:
-                response = f"**Hospitals near {city}:**<br>"
-                for hospital in info['hospitals']:
-                    response += f"🏥 {hospital['name']}<br>"
-                response += f"<a href='https://www.openstreetmap.org/search?query=hospitals+in+{city}' target='_blank'>View on Map</a>"
-                return response
-            else:
-                return f"I couldn't find hospitals in '{city}'."
-        else:
-            return "Please specify the city (e.g., 'Hospitals in Boston')."
+            return tag, city, None
+        return tag, None, "Please specify the city (e.g., 'Hospitals in Boston')."
 
     responses = tag_map.get(tag, ["I'm not sure how to help with that."])
-    return random.choice(responses)
+    return tag, None, random.choice(responses)
+
+def format_lookup(tag, entity, info):
+    """Turns an integration result for `entity` into the chat reply."""
+    if tag == "drug_lookup":
+        if info["found"]:
+            return f"**{info['name'].upper()}Info:**<br>Purpose: {info['purpose']}<br><br>⚠️ Warnings: {info['warnings']}"
+        return f"I couldn't find specific FDA info for '{entity}'. Please check the spelling."
+
+    if info["found"]:
+        response = f"**Hospitals near {entity}:**<br>"
+        for hospital in info['hospitals']:
+            response += f"🏥 {hospital['name']}<br>"
+        response += map_link(entity)
+        return response
+    return f"I couldn't find hospitals in '{entity}'."
+
+def map_link(city):
+    return f"<a href='https://www.openstreetmap.org/search?query=hospitals+in+{city}' target='_blank'>View on Map</a>"
+
+def format_follow_up(entity, info, field):
+    """Answers a follow-up about one part of the session's last lookup result."""
+    if field == "map":
+        return map_link(entity)
+    if field == "warnings":
+        return f"**{info['name'].upper()} Warnings:**<br>⚠️ {info['warnings']}"
+    return f"**{info['name'].upper()} Purpose:**<br>{info['purpose']}"
+
+def lookup_placeholder(tag, entity):
+    """Interim reply streamed while the lookup for `entity` runs."""
+    if tag == "drug_lookup":
+        return f"🔎 Looking up FDA info for **{entity}**..."
+    return f"🔎 Searching for hospitals near **{entity}**..."
+
+def format_sse(event, data):
+    """Encodes one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def intent_event(tag, entity, reply, artifacts):
+    """The first streamed event: the classified intent, plus a placeholder if a lookup is pending."""
+    data = {"tag": tag, "model_version": artifacts.version}
+    if reply is None:
+        data["placeholder"] = lookup_placeholder(tag, entity)
+    return "intent", data
+
+def complete_response(tag, entity, reply, session_id=None):
+    """
+    Runs the pending integration lookup of a resolve_intent() plan, if any,
+    and keeps its result as the session's context for follow-up turns.
+    """
+    if reply is not None:
+        return reply
+    start = metrics.now()
+    info = get_drug_info(entity) if tag == "drug_lookup" else get_hospitals(entity)
+    metrics.stage_done("lookup", start)
+    if session_id:
+        sessions.store.put(session_id, tag, entity, info)
+    return format_lookup(tag, entity, info)
+
+def shed_lookup(plan, artifacts):
+    """Swaps a plan's pending lookup for the intent's static reply while admission control is shedding load."""
+    tag, entity, reply = plan
+    if reply is None and admission.should_shed():
+        responses = artifacts.tag_map.get(tag, ["I'm not sure how to help with that."])
+        return tag, entity, SHED_NOTE + random.choice(responses)
+    return plan
+
+def classify_message(user_input, artifacts):
+    """Runs the CPU-bound part of a reply: preprocessing, scoring and the fallback tiers."""
+    start = metrics.now()
+    processed_input = preprocess_message(user_input, artifacts)
+    metrics.stage_done("preprocess", start)
+    
+    # Top 3 predictions, from the intent cache or the model
+    top_tags, top_probs = classify_processed([processed_input], artifacts)[0]
+    start = metrics.now()
+    plan = resolve_intent(user_input, top_tags, top_probs, artifacts.tag_map)
+    metrics.stage_done("resolve", start)
+    return plan
+
+def classify_turn(user_input, artifacts, session_id=None):
+    """
+    classify_message(), unless the session's context already answers a follow-up turn.
+    Any other turn drops that context; a lookup turn stores its own (complete_response()).
+    """
+    if session_id:
+        start = metrics.now()
+        resolved = sessions.store.resolve(session_id, user_input)
+        metrics.stage_done("session", start)
+        if resolved is not None:
+            (tag, entity, field), session = resolved
+            reply = format_follow_up(entity, session.info, field) if field else None
+            return tag, entity, reply
+        sessions.store.discard(session_id)
+    return classify_message(user_input, artifacts)
+
+def classify_messages(messages, artifacts):
+    """
+    Classifies a list of messages with at most one transform/predict_proba call.
+    Returns one resolve_intent() plan or {"error": ...} dict per message, in input order.
+    """
+    results = [None] * len(messages)
+    rows = []
+    processed = []
+    start = metrics.now()
+    for i, user_input in enumerate(messages):
+        if not isinstance(user_input, str) or not user_input.strip():
+            results[i] = {"error": "Please say something."}
+            continue
+        try:
+            processed.append(preprocess_message(user_input, artifacts))
+            rows.append(i)
+        except Exception as e:
+            results[i] = {"error": str(e)}
+
+    if not rows:
+        return results
+    metrics.stage_done("batch_preprocess", start)
+
+    classified = classify_processed(processed, artifacts, stage_prefix="batch_")
+    start = metrics.now()
+    for (top_tags, top_probs), i in zip(classified, rows):
+        try:
+            results[i] = resolve_intent(messages[i], top_tags, top_probs, artifacts.tag_map)
+        except Exception as e:
+            results[i] = {"error": str(e)}
+    metrics.stage_done("batch_resolve", start)
+    return results
+
+def get_bot_response(user_input, artifacts=None, session_id=None):
+    artifacts = artifacts or registry.current
+    if not artifacts:
+        return "Error: Brain not loaded."
+
+    with metrics.track_request("get_response"):
+        plan = shed_lookup(classify_turn(user_input, artifacts, session_id), artifacts)
+        return complete_response(*plan, session_id)
+
+def get_bot_responses(messages, artifacts=None):
+    """
+    Classifies a list of messages in one vectorized pass, then runs their lookups.
+    Returns one {"response": ...} or {"error": ...} dict per message, in input order.
+    """
+    artifacts = artifacts or registry.current
+    if not artifacts:
+        return [{"error": "Brain not loaded."} for _ in messages]
+
+    results = []
+    with metrics.track_request("get_responses"):
+        for plan in classify_messages(messages, artifacts):
+            if isinstance(plan, dict):
+                results.append(plan)
+                continue
+            try:
+                results.append({"response": complete_response(*shed_lookup(plan, artifacts))})
+            except Exception as e:
+                results.append({"error": str(e)})
+    return results
 
 @app.route("/")
 def home():
     return render_template("index.html")
 
+@app.errorhandler(admission.Rejected)
+def rejected(e):
+    return jsonify({"error": e.reason}), e.status, {"Retry-After": str(e.retry_after)}
+
+def admit(route):
+    # Raises admission.Rejected, answered by rejected() above
+    return admission.admit(route, request.remote_addr, request.headers.get("X-Request-Timeout"))
+
 @app.route("/get_response", methods=["POST"])
 def chat_api():
     user_input = request.json.get("message")
     if not user_input:
         return jsonify({"response": "Please say something."})
     
-    response = get_bot_response(user_input)
-    return jsonify({"response": response})
+    with admit("get_response"):
+        artifacts = registry.current
+        response = get_bot_response(user_input, artifacts, sessions.session_key(request.json.get("session_id")))
+    return jsonify({"response": response, "model_version": artifacts and artifacts.version})
 
-if __name__ == "__main__":
-    if load_artifacts():
-        print("Model loaded successfully.")
+def stream_bot_response(user_input, artifacts=None, session_id=None):
+    """
+    Yields (event, data) pairs for one message: "intent" as soon as it is
+    classified, then "response" with the full reply once any lookup finishes,
+    then "done". Failures are reported as an "error" event.
+    """
+    artifacts = artifacts or registry.current
+    if not artifacts:
+        yield "error", {"error": "Brain not loaded."}
     else:
-        print("Model not found. Run train.py first.")
-    
+        with metrics.track_request("stream_response"):
+            try:
+                plan = shed_lookup(classify_turn(user_input, artifacts, session_id), artifacts)
+                yield intent_event(*plan, artifacts)
+                yield "response", {"response": complete_response(*plan, session_id)}
+            except Exception as e:
+                yield "error", {"error": str(e)}
+    yield "done", {}
+
+@app.route("/stream_response", methods=["POST"])
+def chat_stream_api():
+    payload = request.get_json(silent=True)
+    user_input = payload.get("message") if isinstance(payload, dict) else None
+    ticket = None
+    if not user_input:
+        events = iter([("response", {"response": "Please say something."}), ("done", {})])
+    else:
+        # The slot is held until the stream ends, or until the response is closed unread
+        ticket = admit("stream_response")
+        events = ticket.hold(stream_bot_response(user_input, registry.current,
+                                                 sessions.session_key(payload.get("session_id"))))
+    # Each event is flushed as it is yielded; X-Accel-Buffering stops nginx from holding it back
+    response = Response((format_sse(event, data) for event, data in events), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if ticket is not None:
+        response.call_on_close(ticket.release)
+    return response
+
+@app.route("/get_responses", methods=["POST"])
+def chat_batch_api():
+    payload = request.get_json(silent=True)
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    if not isinstance(messages, list):
+        return jsonify({"error": "Expected a JSON body like {\"messages\": [...]}."}), 400
+    if len(messages) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE} messages)."}), 413
+
+    with admit("get_responses"):
+        artifacts = registry.current
+        responses = get_bot_responses(messages, artifacts)
+    return jsonify({"responses": responses, "model_version": artifacts and artifacts.version})
+
+@app.route("/cache_stats")
+def cache_stats_api():
+    artifacts = registry.current
+    intents = artifacts.intent_cache.stats() if artifacts and artifacts.intent_cache else None
+    featurizer = artifacts.featurizer.cache_stats() if artifacts and artifacts.featurizer else None
+    return jsonify({"integrations": cache_stats(), "preprocessing": preprocessing.cache_stats(), "intents": intents,
+                    "featurizer": featurizer, "sessions": sessions.store.stats(), "admission": admission.stats()})
+
+@app.route("/metrics")
+def metrics_api():
+    # Prometheus scrape target; counters are per process
+    text = metrics.render({"model_version": registry.version or "none"})
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
+@app.route("/admin/reload", methods=["POST"])
+def reload_api():
+    # Without a configured token, only allow reloads from the same host
+    if ADMIN_TOKEN:
+        if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+            return jsonify({"error": "Forbidden"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Forbidden"}), 403
+
+    payload = request.get_json(silent=True)
+    version = payload.get("version") if isinstance(payload, dict) else None
+    previous = registry.version
+    swapped = registry.reload(version)
+    status = 200 if swapped or registry.last_error is None else 500
+    return jsonify({"reloaded": swapped, "previous_version": previous,
+                    "model_version": registry.version, "error": registry.last_error}), status
+
+if __name__ == "__main__":
+    # Development server only; see wsgi.py / gunicorn.conf.py for production
+    create_app()
     app.run(debug=True, port=5000)
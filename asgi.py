@@ -0,0 +1,204 @@
+"""
+asyncio-native serving mode for the chat API.
+
+    uvicorn asgi:app --port 5000
+
+Classification (CPU-bound) runs in a bounded thread pool while OpenFDA and
+Nominatim lookups are awaited on the event loop with an async HTTP client, so
+a slow upstream never holds a worker that greeting or symptom requests need.
+Routes and JSON shapes match app.py.
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import admission
+import app as chat
+import integrations
+import metrics
+import preprocessing
+import sessions
+
+CLASSIFY_THREADS = int(os.environ.get("MEDIBOT_CLASSIFY_THREADS", os.cpu_count() or 1))
+classify_executor = ThreadPoolExecutor(max_workers=CLASSIFY_THREADS, thread_name_prefix="classify")
+
+def run_classifier(fn, *args):
+    # copy_context() carries a sampled request's trace into the pool thread
+    return asyncio.get_running_loop().run_in_executor(classify_executor, contextvars.copy_context().run, fn, *args)
+
+async def run_lookup(tag, entity):
+    if tag == "drug_lookup":
+        return await integrations.get_drug_info_async(entity)
+    return await integrations.get_hospitals_async(entity)
+
+async def complete_response_async(tag, entity, reply, session_id=None):
+    """Async counterpart of app.complete_response()."""
+    if reply is not None:
+        return reply
+    start = metrics.now()
+    info = await run_lookup(tag, entity)
+    metrics.stage_done("lookup", start)
+    if session_id:
+        sessions.store.put(session_id, tag, entity, info)
+    return chat.format_lookup(tag, entity, info)
+
+async def get_bot_response_async(user_input, artifacts, session_id=None):
+    if not artifacts:
+        return "Error: Brain not loaded."
+
+    with metrics.track_request("get_response"):
+        plan = await run_classifier(chat.classify_turn, user_input, artifacts, session_id)
+        return await complete_response_async(*chat.shed_lookup(plan, artifacts), session_id)
+
+async def stream_bot_response_async(user_input, artifacts, session_id=None):
+    """Async counterpart of app.stream_bot_response(), yielding encoded events."""
+    if not artifacts:
+        yield chat.format_sse("error", {"error": "Brain not loaded."})
+    else:
+        with metrics.track_request("stream_response"):
+            try:
+                plan = await run_classifier(chat.classify_turn, user_input, artifacts, session_id)
+                plan = chat.shed_lookup(plan, artifacts)
+                yield chat.format_sse(*chat.intent_event(*plan, artifacts))
+                yield chat.format_sse("response", {"response": await complete_response_async(*plan, session_id)})
+            except Exception as e:
+                yield chat.format_sse("error", {"error": str(e)})
+    yield chat.format_sse("done", {})
+
+async def get_bot_responses_async(messages, artifacts):
+    if not artifacts:
+        return [{"error": "Brain not loaded."} for _ in messages]
+
+    async def answer(plan):
+        if isinstance(plan, dict):
+            return plan
+        try:
+            return {"response": await complete_response_async(*chat.shed_lookup(plan, artifacts))}
+        except Exception as e:
+            return {"error": str(e)}
+
+    with metrics.track_request("get_responses"):
+        plans = await run_classifier(chat.classify_messages, messages, artifacts)
+        # Lookups for the whole batch run concurrently
+        return await asyncio.gather(*(answer(plan) for plan in plans))
+
+def admit(request, route):
+    client = request.client.host if request.client else None
+    return admission.admit_async(route, client, request.headers.get("x-request-timeout"))
+
+async def rejected(request, e):
+    return JSONResponse({"error": e.reason}, status_code=e.status, headers={"Retry-After": str(e.retry_after)})
+
+async def home(request):
+    return FileResponse(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html"))
+
+async def chat_api(request):
+    payload = await request.json()
+    user_input = payload.get("message")
+    if not user_input:
+        return JSONResponse({"response": "Please say something."})
+
+    with await admit(request, "get_response"):
+        artifacts = chat.registry.current
+        response = await get_bot_response_async(user_input, artifacts, sessions.session_key(payload.get("session_id")))
+    return JSONResponse({"response": response, "model_version": artifacts and artifacts.version})
+
+async def chat_stream_api(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    user_input = payload.get("message") if isinstance(payload, dict) else None
+    ticket = None
+    if not user_input:
+        events = [chat.format_sse("response", {"response": "Please say something."}), chat.format_sse("done", {})]
+    else:
+        # Same slot handling as app.py: held for the whole stream, released if it ends early
+        ticket = await admit(request, "stream_response")
+        events = ticket.hold_async(stream_bot_response_async(user_input, chat.registry.current,
+                                                             sessions.session_key(payload.get("session_id"))))
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                             background=BackgroundTask(ticket.release) if ticket else None)
+
+async def chat_batch_api(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    if not isinstance(messages, list):
+        return JSONResponse({"error": "Expected a JSON body like {\"messages\": [...]}."}, status_code=400)
+    if len(messages) > chat.MAX_BATCH_SIZE:
+        return JSONResponse({"error": f"Batch too large (max {chat.MAX_BATCH_SIZE} messages)."}, status_code=413)
+
+    with await admit(request, "get_responses"):
+        artifacts = chat.registry.current
+        responses = await get_bot_responses_async(messages, artifacts)
+    return JSONResponse({"responses": responses, "model_version": artifacts and artifacts.version})
+
+async def cache_stats_api(request):
+    artifacts = chat.registry.current
+    intents = artifacts.intent_cache.stats() if artifacts and artifacts.intent_cache else None
+    featurizer = artifacts.featurizer.cache_stats() if artifacts and artifacts.featurizer else None
+    return JSONResponse({"integrations": integrations.cache_stats(), "preprocessing": preprocessing.cache_stats(),
+                         "intents": intents, "featurizer": featurizer, "sessions": sessions.store.stats(),
+                         "admission": admission.stats()})
+
+async def metrics_api(request):
+    return PlainTextResponse(metrics.render({"model_version": chat.registry.version or "none"}),
+                             media_type="text/plain; version=0.0.4")
+
+async def reload_api(request):
+    # Same access rules as app.py's /admin/reload
+    if chat.ADMIN_TOKEN:
+        if request.headers.get("x-admin-token") != chat.ADMIN_TOKEN:
+            return JSONResponse({"error": "Forbidden"}, status_code=403)
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    version = payload.get("version") if isinstance(payload, dict) else None
+    previous = chat.registry.version
+    # Loading and validating happen off the event loop
+    swapped = await asyncio.get_running_loop().run_in_executor(None, chat.registry.reload, version)
+    status = 200 if swapped or chat.registry.last_error is None else 500
+    return JSONResponse({"reloaded": swapped, "previous_version": previous,
+                         "model_version": chat.registry.version, "error": chat.registry.last_error},
+                        status_code=status)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if chat.load_artifacts():
+        print(f"Model {chat.registry.version} loaded successfully.")
+    else:
+        print("Model not found. Run train.py first.")
+    if chat.MODEL_POLL_SECONDS > 0:
+        chat.registry.start_watching(chat.MODEL_POLL_SECONDS)
+    yield
+    chat.registry.stop_watching()
+    await integrations.close_async_clients()
+    classify_executor.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route("/", home),
+        Route("/get_response", chat_api, methods=["POST"]),
+        Route("/stream_response", chat_stream_api, methods=["POST"]),
+        Route("/get_responses", chat_batch_api, methods=["POST"]),
+        Route("/cache_stats", cache_stats_api),
+        Route("/metrics", metrics_api),
+        Route("/admin/reload", reload_api, methods=["POST"]),
+    ],
+    exception_handlers={admission.Rejected: rejected},
+    lifespan=lifespan,
+)
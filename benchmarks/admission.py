@@ -0,0 +1,131 @@
+"""
+Overload test: open-loop load past capacity, with admission control off and on.
+
+    python -m benchmarks.admission --rates 20 40 80 --duration 20 --upstream-delay 0.2 --upstream-capacity 4
+
+The server runs against a stub upstream that serves --upstream-capacity
+requests at a time, each taking --upstream-delay seconds, so lookups top out
+at capacity / delay per second. Requests arrive at a fixed rate whether or not
+earlier ones have been answered (latency counts from the scheduled send time).
+The mix is --lookup-ratio hospital searches for unique cities (always a cache
+miss) and classify-only messages. Each rate is run with admission control off
+(MEDIBOT_ADMISSION_LIMIT=0) and on. Goodput counts 200 replies that arrived
+within --budget seconds.
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.async_serving import CLASSIFY_MESSAGES, integration_message, write_gazetteers
+from benchmarks.common import (UNLIMITED_UPSTREAMS, free_port, post_json, python_command, spawn_server, summarize,
+                               write_results)
+from stub_upstream import StubUpstream
+
+MAX_IN_FLIGHT = 512
+
+# Flask gets a thread per connection and uvicorn a task, so only admission control bounds the requests in flight
+SERVERS = {
+    "flask": lambda port: python_command(
+        "-c", f"import app; app.load_artifacts(); app.app.run(port={port}, threaded=True)"),
+    "asgi": lambda port: python_command(
+        "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"),
+}
+
+def next_request(lookup_ratio):
+    if random.random() < lookup_ratio:
+        return "lookup", {"message": integration_message()}
+    return "classify", {"message": random.choice(CLASSIFY_MESSAGES)}
+
+def run_open_loop(url, rate, duration, lookup_ratio, timeout):
+    """Sends rate * duration requests on a fixed schedule; returns [(kind, status, seconds since scheduled)]."""
+    records = []
+    lock = threading.Lock()
+
+    def send(scheduled, kind, payload):
+        status, body, _ = post_json(url, payload, timeout=timeout)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            records.append((kind, status if body is not None else 0, latency))
+
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as pool:
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled, *next_request(lookup_ratio))
+    return records
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+def summarize_run(records, duration, budget):
+    ok = [latency for _, status, latency in records if status == 200]
+    statuses = Counter(status for _, status, _ in records)
+    return dict(summarize(ok), sent=len(records), ok=len(ok), rejected_503=statuses[503], rejected_429=statuses[429],
+                failed=len(records) - len(ok) - statuses[503] - statuses[429],
+                goodput_rps=sum(latency <= budget for latency in ok) / duration)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="flask", choices=sorted(SERVERS))
+    parser.add_argument("--rates", type=float, nargs="+", default=[20, 40, 80], help="Offered requests per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--lookup-ratio", type=float, default=0.5)
+    parser.add_argument("--upstream-delay", type=float, default=0.2)
+    parser.add_argument("--upstream-capacity", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=8, help="MEDIBOT_ADMISSION_LIMIT when admission is on")
+    parser.add_argument("--queue", type=int, default=16, help="MEDIBOT_ADMISSION_QUEUE when admission is on")
+    parser.add_argument("--budget", type=float, default=2.0, help="MEDIBOT_REQUEST_BUDGET, also the goodput cutoff")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Client-side timeout per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    gazetteer_dir = tempfile.mkdtemp()
+    write_gazetteers(gazetteer_dir)
+    modes = {
+        "off": {"MEDIBOT_ADMISSION_LIMIT": "0"},
+        "on": {"MEDIBOT_ADMISSION_LIMIT": str(args.limit), "MEDIBOT_ADMISSION_QUEUE": str(args.queue)},
+    }
+    results = {}
+    with StubUpstream(delay=args.upstream_delay, capacity=args.upstream_capacity) as stub:
+        env = {"MEDIBOT_OPENFDA_URL": stub.openfda_url, "MEDIBOT_NOMINATIM_URL": stub.nominatim_url,
+               "MEDIBOT_GAZETTEER_DIR": gazetteer_dir, "MEDIBOT_DATA_MODE": "live", "MEDIBOT_CLIENT_RATE": "0",
+               "MEDIBOT_REQUEST_BUDGET": str(args.budget), **UNLIMITED_UPSTREAMS}
+        for mode, settings in modes.items():
+            for rate in args.rates:
+                # A fresh server per run, so a backlog from the previous rate can't leak into this one
+                port = free_port()
+                with spawn_server(SERVERS[args.server](port), port, dict(env, **settings)):
+                    url = f"http://127.0.0.1:{port}"
+                    post_json(f"{url}/get_response", {"message": "warm up"})
+                    records = run_open_loop(f"{url}/get_response", rate, args.duration, args.lookup_ratio,
+                                            args.timeout)
+                    run = summarize_run(records, args.duration, args.budget)
+                    run["admission"] = get_json(f"{url}/cache_stats").get("admission")
+                results[f"{mode}@{rate:g}"] = run
+
+    print(f"capacity ≈ {args.upstream_capacity / args.upstream_delay / args.lookup_ratio:.0f} rps at this lookup mix\n")
+    print(f"{'admission':<10} | {'rps':>5} | {'sent':>6} | {'200':>6} | {'503':>5} | {'429':>4} | {'fail':>5} | "
+          f"{'goodput/s':>9} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 92)
+    for label, s in results.items():
+        mode, rate = label.split("@")
+        print(f"{mode:<10} | {rate:>5} | {s['sent']:>6} | {s['ok']:>6} | {s['rejected_503']:>5} | {s['rejected_429']:>4} | "
+              f"{s['failed']:>5} | {s['goodput_rps']:>9.1f} | {s['p50_ms']:>8.1f} | {s['p99_ms']:>8.1f}")
+
+    if args.output:
+        write_results(args.output, "admission", args, results)
+
+if __name__ == "__main__":
+    main()
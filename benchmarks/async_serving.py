@@ -0,0 +1,89 @@
+"""
+Load benchmark: classify-only vs integration requests against a delayed local upstream.
+
+    python -m benchmarks.async_serving --concurrency 32 --duration 20 --upstream-delay 0.5
+
+Runs the same request mix against the Flask dev server (one request at a time,
+like a single sync worker) and the asyncio ASGI mode, and reports p50/p99 per
+request kind. Integration requests use unique cities so every one misses the
+cache and waits on the stub for `--upstream-delay` seconds. The cities are
+random names added to a temporary copy of the gazetteers, so entity extraction
+still recognizes them.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import (NO_ADMISSION, REPO_ROOT, UNLIMITED_UPSTREAMS, free_port, post_json, python_command,
+                               run_closed_loop, spawn_server, write_results)
+from stub_upstream import StubUpstream
+
+CLASSIFY_MESSAGES = [
+    "Hello", "I have a fever", "my head hurts a lot", "I feel very sad",
+    "thanks", "chest pain", "rash on leg", "who created you?",
+]
+
+SERVERS = {
+    "flask": lambda port: python_command(
+        "-c", f"import app; app.load_artifacts(); app.app.run(port={port}, threaded=False)"),
+    "asgi": lambda port: python_command(
+        "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"),
+}
+
+UNIQUE_CITIES = 200000
+cities = []
+
+def write_gazetteers(directory):
+    """Copies the gazetteers into `directory`, with UNIQUE_CITIES random city names added."""
+    for name in ("drugs.txt", "cities.txt"):
+        shutil.copy(os.path.join(REPO_ROOT, "gazetteers", name), directory)
+    rng = random.Random(0)
+    cities[:] = [''.join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(10)) for _ in range(UNIQUE_CITIES)]
+    with open(os.path.join(directory, "cities.txt"), "a", encoding="utf-8") as f:
+        f.write("\n".join(cities) + "\n")
+
+def integration_message():
+    return f"Find hospitals in {random.choice(cities)}"
+
+def next_request(integration_ratio):
+    if random.random() < integration_ratio:
+        return "integration", {"message": integration_message()}
+    return "classify", {"message": random.choice(CLASSIFY_MESSAGES)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["flask", "asgi"], choices=sorted(SERVERS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--integration-ratio", type=float, default=0.2)
+    parser.add_argument("--upstream-delay", type=float, default=0.5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    gazetteer_dir = tempfile.mkdtemp()
+    write_gazetteers(gazetteer_dir)
+    with StubUpstream(delay=args.upstream_delay) as stub:
+        env = {"MEDIBOT_OPENFDA_URL": stub.openfda_url, "MEDIBOT_NOMINATIM_URL": stub.nominatim_url,
+               "MEDIBOT_GAZETTEER_DIR": gazetteer_dir, **UNLIMITED_UPSTREAMS, **NO_ADMISSION}
+        for mode in args.modes:
+            port = free_port()
+            with spawn_server(SERVERS[mode](port), port, env):
+                url = f"http://127.0.0.1:{port}/get_response"
+                post_json(url, {"message": "warm up"})
+                results[mode] = run_closed_loop(
+                    url, args.concurrency, args.duration, lambda: next_request(args.integration_ratio))["kinds"]
+
+    print(f"{'Mode':<7} | {'Kind':<12} | {'Requests':>8} | {'Errors':>6} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 64)
+    for mode, kinds in results.items():
+        for kind, s in kinds.items():
+            print(f"{mode:<7} | {kind:<12} | {s['count']:>8} | {s['errors']:>6} | {s['p50_ms']:>8.1f} | {s['p99_ms']:>8.1f}")
+
+    if args.output:
+        write_results(args.output, "async_serving", args, results)
+
+if __name__ == "__main__":
+    main()
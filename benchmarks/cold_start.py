@@ -0,0 +1,55 @@
+"""
+Time-to-first-response of a fresh process: pickled artifacts vs the model bundle.
+
+    python model_bundle.py            # export the current pickles once
+    python -m benchmarks.cold_start --runs 5
+
+Each run starts a new interpreter that imports app.py, loads the artifacts and
+answers one (non-integration) message. Both formats pay for the scikit-learn
+import: app.py imports NLTK, and NLTK's package import pulls it in.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+
+from benchmarks.common import REPO_ROOT, python_command, write_results
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import app
+app.load_artifacts(prefer_bundle={prefer_bundle})
+app.get_bot_response("I have a fever")
+print(json.dumps({{"seconds": time.perf_counter() - start, "sklearn_imported": "sklearn" in sys.modules}}))
+"""
+
+def time_first_response(prefer_bundle):
+    output = subprocess.run(
+        python_command("-c", SNIPPET.format(prefer_bundle=prefer_bundle)),
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    for label, prefer_bundle in (("pickles", False), ("bundle", True)):
+        runs = [time_first_response(prefer_bundle) for _ in range(args.runs)]
+        results[label] = {
+            "median_ms": statistics.median(r["seconds"] for r in runs) * 1e3,
+            "min_ms": min(r["seconds"] for r in runs) * 1e3,
+            "sklearn_imported": runs[0]["sklearn_imported"],
+        }
+        print(f"{label:<8} time-to-first-response: median {results[label]['median_ms']:.0f} ms, "
+              f"min {results[label]['min_ms']:.0f} ms (sklearn imported: {results[label]['sklearn_imported']})")
+
+    if args.output:
+        write_results(args.output, "cold_start", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Drug and city names the stub upstream has canned answers for
+STUB_DRUGS = ("advil", "aspirin", "tylenol")
+STUB_CITIES = ("Boston", "Paris", "London")
+# Patterns ending in one of these expect an entity after them ("Hospitals in", "side effects of")
+TRAILING_WORDS = {"of", "for", "in", "near", "about", "up", "take", "drug", "medication", "medicine", "around"}
+
+# The stub upstream isn't rate limited like the real APIs, so servers under test don't throttle it either
+UNLIMITED_UPSTREAMS = {"MEDIBOT_RATE_LIMIT_OPENFDA": "0", "MEDIBOT_RATE_LIMIT_NOMINATIM": "0"}
+# Closed-loop runs from one address measure the server, not admission control (see benchmarks/admission.py)
+NO_ADMISSION = {"MEDIBOT_ADMISSION_LIMIT": "0", "MEDIBOT_CLIENT_RATE": "0"}
+
+def load_patterns(path=os.path.join(REPO_ROOT, "intents.json")):
+    """Returns (tag, pattern) pairs from intents.json, in file order."""
+    with open(path, encoding="utf-8") as f:
+        intents = json.load(f)["intents"]
+    return [(intent["tag"], pattern) for intent in intents for pattern in intent["patterns"]]
+
+def with_entity(tag, pattern, rng=random):
+    """Completes open-ended lookup patterns with a name the stub upstream knows."""
+    words = pattern.lower().split()
+    if not words or words[-1] not in TRAILING_WORDS:
+        return pattern
+    if tag == "drug_lookup":
+        return f"{pattern} {rng.choice(STUB_DRUGS)}"
+    if tag == "hospital_search":
+        return f"{pattern} {rng.choice(STUB_CITIES)}"
+    return pattern
+
+def percentile(values, p):
+    """Nearest-rank percentile of `values` (p in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize(latencies):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1e3 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p95_ms": percentile(latencies, 95) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(path, benchmark, args, results):
+    """
+    Writes a benchmark run as JSON, with enough context to compare it later:
+    python -m benchmarks.compare baseline.json candidate.json
+    """
+    report = {
+        "benchmark": benchmark,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"Server on port {port} did not start within {timeout}s")
+
+@contextlib.contextmanager
+def spawn_server(command, port, env=None):
+    """Runs a server subprocess from the repo root until the block exits."""
+    process = subprocess.Popen(
+        command, cwd=REPO_ROOT, env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def post_json(url, payload, timeout=30.0):
+    """POSTs JSON and returns (status, decoded body or None, elapsed seconds)."""
+    data = json.dumps(payload).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+    except OSError:
+        return 0, None, time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    try:
+        return status, json.loads(body), elapsed
+    except ValueError:
+        return status, None, elapsed
+
+def python_command(*args):
+    return [sys.executable, *args]
+
+def run_closed_loop(url, concurrency, duration, next_request, timeout=60.0):
+    """
+    Runs `concurrency` users that POST back-to-back for `duration` seconds.
+    `next_request()` returns (kind, payload). Returns per-kind latency summaries,
+    error counts and overall requests per second.
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user():
+        while time.monotonic() < deadline:
+            kind, payload = next_request()
+            status, body, elapsed = post_json(url, payload, timeout=timeout)
+            with lock:
+                if status == 200 and body is not None:
+                    latencies[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - start
+
+    kinds = sorted(set(latencies) | set(errors))
+    everything = [latency for kind in kinds for latency in latencies[kind]]
+    return {
+        "rps": len(everything) / wall,
+        "overall": dict(summarize(everything), errors=sum(errors.values())),
+        "kinds": {kind: dict(summarize(latencies[kind]), errors=errors[kind]) for kind in kinds},
+    }
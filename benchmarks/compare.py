@@ -0,0 +1,70 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Latency metrics (*_ms) regress when they grow, throughput (rps) when it
+drops, by more than --threshold percent. Exits with status 1 on a regression,
+so it can gate CI.
+"""
+import argparse
+import json
+
+def flatten(results, prefix=""):
+    """{"kinds": {"greeting": {"p99_ms": 3.1}}} -> {"kinds.greeting.p99_ms": 3.1}"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def direction(metric):
+    """+1 if bigger is better, -1 if smaller is better, 0 if not compared."""
+    name = metric.rsplit(".", 1)[-1]
+    if name == "rps":
+        return 1
+    if name.endswith("_ms"):
+        return -1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get("benchmark") != candidate.get("benchmark"):
+        raise SystemExit(f"Can't compare a '{baseline.get('benchmark')}' run with a '{candidate.get('benchmark')}' run.")
+
+    before = flatten(baseline["results"])
+    after = flatten(candidate["results"])
+    print(f"{baseline.get('benchmark')}: {baseline.get('git_revision')} -> {candidate.get('git_revision')}\n")
+    print(f"{'Metric':<50} | {'Baseline':>10} | {'Candidate':>10} | {'Change':>8}")
+    print("-" * 88)
+
+    regressions = []
+    for metric in sorted(set(before) & set(after)):
+        sign = direction(metric)
+        if sign == 0 or before[metric] == 0:
+            continue
+        change = (after[metric] - before[metric]) / before[metric] * 100
+        regressed = sign * change < -args.threshold
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<50} | {before[metric]:>10.2f} | {after[metric]:>10.2f} | {change:>+7.1f}%{'  <-- REGRESSION' if regressed else ''}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:g}%.")
+        raise SystemExit(1)
+    print(f"\nNo regressions beyond {args.threshold:g}%.")
+
+if __name__ == "__main__":
+    main()
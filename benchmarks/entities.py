@@ -0,0 +1,107 @@
+"""
+Entity extraction: the old single-group regexes vs the gazetteer tries.
+
+    python -m benchmarks.entities --messages 20000
+
+Drug and hospital messages are generated from templates filled with gazetteer
+names (some with a typo or odd casing) or with no usable name at all. For each
+extractor the report gives throughput and the upstream calls it would trigger:
+wasted calls (no real entity, or the wrong one) and the number of distinct
+cache keys, which canonical names keep low.
+"""
+import argparse
+import os
+import random
+import re
+import time
+
+from benchmarks.common import write_results
+from cache import normalize_key
+import entities
+
+DRUG_TEMPLATES = ["tell me about {}", "is {} safe", "side effects of {}", "what is {} used for",
+                  "can I take {} with food", "{} dosage please", "info on {} for my mom"]
+CITY_TEMPLATES = ["hospitals in {}", "find a hospital near {}", "clinics in {} please", "I need a doctor in {} now",
+                  "{} hospitals", "emergency room at {} downtown"]
+NO_DRUG = ["tell me about side effects", "is it safe to take this", "what is the dose for kids", "drug interactions",
+           "about my medication", "side effects of the pills my doctor gave me"]
+NO_CITY = ["hospitals near me", "find a hospital", "where is the nearest clinic", "hospital in my area",
+           "I need a doctor at home", "clinics near here please"]
+
+def legacy_drug(text):
+    match = re.search(r'(?:of|about|is|drug)\s+([a-zA-Z]+)', text, re.IGNORECASE)
+    return match.group(1) if match else None
+
+def legacy_city(text):
+    match = re.search(r'(?:in|at|near)\s+([a-zA-Z\s]+)', text, re.IGNORECASE)
+    return match.group(1).strip() if match else None
+
+def typo(name, rng):
+    # Swap two neighbouring letters away from the first one
+    if len(name) < 6:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+def synthesize(kind, n, missing_ratio, typo_ratio, rng):
+    """Returns (message, canonical entity or None) pairs."""
+    path = os.path.join(entities.GAZETTEER_DIR, f"{kind}.txt")
+    names = list(entities.read_entries(path))
+    templates, missing = (DRUG_TEMPLATES, NO_DRUG) if kind == "drugs" else (CITY_TEMPLATES, NO_CITY)
+    samples = []
+    for _ in range(n):
+        if rng.random() < missing_ratio:
+            samples.append((rng.choice(missing), None))
+            continue
+        alias, canonical = rng.choice(names)
+        if rng.random() < typo_ratio:
+            alias = typo(alias, rng)
+        alias = rng.choice([alias, alias.lower(), alias.title(), alias.upper()])
+        samples.append((rng.choice(templates).format(alias), canonical))
+    return samples
+
+def evaluate(extract, samples):
+    start = time.perf_counter()
+    found = [extract(message) for message, _ in samples]
+    elapsed = time.perf_counter() - start
+    calls = [(result, truth) for result, (_, truth) in zip(found, samples) if result]
+    wasted = sum(1 for result, truth in calls if truth is None or normalize_key(result) != normalize_key(truth))
+    recognized = sum(1 for result, (_, truth) in zip(found, samples)
+                     if truth and result and normalize_key(result) == normalize_key(truth))
+    return {
+        "messages_per_s": len(samples) / elapsed,
+        "upstream_calls": len(calls),
+        "wasted_calls": wasted,
+        "recall": recognized / max(1, sum(1 for _, truth in samples if truth)),
+        "distinct_cache_keys": len({normalize_key(result) for result, _ in calls}),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000, help="Messages per entity kind")
+    parser.add_argument("--missing-ratio", type=float, default=0.2, help="Share of messages without an entity")
+    parser.add_argument("--typo-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    extractors = {"drugs": (legacy_drug, entities.find_drug), "cities": (legacy_city, entities.find_city)}
+    entities.find_drug("warm up"), entities.find_city("warm up")  # load both gazetteers before timing
+
+    print(f"{'kind':<6} | {'extractor':<9} | {'msgs/s':>9} | {'calls':>6} | {'wasted':>6} | {'recall':>6} | {'keys':>5}")
+    print("-" * 64)
+    results = {}
+    for kind, (legacy, gazetteer) in extractors.items():
+        samples = synthesize(kind, args.messages, args.missing_ratio, args.typo_ratio, rng)
+        results[kind] = {}
+        for label, extract in (("regex", legacy), ("gazetteer", gazetteer)):
+            r = results[kind][label] = evaluate(extract, samples)
+            print(f"{kind:<6} | {label:<9} | {r['messages_per_s']:>9.0f} | {r['upstream_calls']:>6} | "
+                  f"{r['wasted_calls']:>6} | {r['recall']:>6.1%} | {r['distinct_cache_keys']:>5}")
+
+    if args.output:
+        write_results(args.output, "entities", args, results)
+
+if __name__ == "__main__":
+    main()
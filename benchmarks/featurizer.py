@@ -0,0 +1,69 @@
+"""
+Per-message featurization latency: preprocess_text + vectorizer.transform vs the fused featurizer.
+
+    python -m benchmarks.featurizer --rounds 20 --output featurizer.json
+
+Every intents.json pattern (completed with a drug or city name) is featurized
+one message per call, like a live request, with the per-message caches
+bypassed so each call does the full work. Lemmas stay cached in both
+pipelines, as they are in a running server. nltk.word_tokenize alone is
+reported as the floor both pipelines share.
+"""
+import argparse
+import os
+import pickle
+import random
+import time
+
+import nltk
+from benchmarks.common import REPO_ROOT, load_patterns, summarize, with_entity, write_results
+from featurizer import FusedFeaturizer
+import preprocessing
+
+def time_each(fn, inputs, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for x in inputs:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over all patterns per pipeline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "vectorizer.pkl"), "rb") as f:
+        vectorizer = pickle.load(f)
+    featurizer = FusedFeaturizer.from_vectorizer(vectorizer)
+    rng = random.Random(args.seed)
+    messages = [with_entity(tag, pattern, rng) for tag, pattern in load_patterns()]
+
+    # __wrapped__ skips the per-message LRUs; the lemma caches are warmed by this first pass
+    preprocess = preprocessing.preprocess_text.__wrapped__
+    uncached_features = featurizer.features.__wrapped__
+    for message in messages:
+        vectorizer.transform([preprocess(message)])
+        featurizer.transform_features([uncached_features(message)])
+
+    pipelines = {
+        "nltk.word_tokenize": nltk.word_tokenize,
+        "preprocess + transform": lambda m: vectorizer.transform([preprocess(m)]),
+        "fused featurizer": lambda m: featurizer.transform_features([uncached_features(m)]),
+    }
+    results = {name: summarize(time_each(fn, messages, args.rounds)) for name, fn in pipelines.items()}
+
+    print(f"{len(messages)} messages x {args.rounds} rounds\n")
+    print(f"{'Pipeline':<24} | {'mean µs':>9} | {'p50 µs':>9} | {'p99 µs':>9}")
+    print("-" * 60)
+    for name, s in results.items():
+        print(f"{name:<24} | {s['mean_ms'] * 1e3:>9.1f} | {s['p50_ms'] * 1e3:>9.1f} | {s['p99_ms'] * 1e3:>9.1f}")
+
+    if args.output:
+        write_results(args.output, "featurizer", args, results)
+
+if __name__ == "__main__":
+    main()
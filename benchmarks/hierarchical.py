@@ -0,0 +1,104 @@
+"""
+Flat vs hierarchical (family -> tag) classifier as the number of intents grows.
+
+    python -m benchmarks.hierarchical --scales 1 4 16 32
+
+Each intents.json intent is cloned `scale` times. Every clone keeps the words of
+the original intent's patterns, plus a few marker words of its own, and stays in
+the original's family. Both models are trained on the same TF-IDF features and
+compiled as they would be for serving. The report gives held-out accuracy and
+latency: single-message p50/p99 (predict_proba + top-k) and a 1000-message batch.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+
+from app import top_k_predictions
+from benchmarks.common import REPO_ROOT, summarize, write_results
+from compiled_model import compile_model
+import hierarchical
+
+def synthesize(scale, per_tag, seed):
+    with open(os.path.join(REPO_ROOT, "intents.json"), encoding="utf-8") as f:
+        intents = json.load(f)["intents"]
+    rng = random.Random(seed)
+    texts, tags = [], []
+    for intent in intents:
+        words = [word.lower() for pattern in intent["patterns"] for word in pattern.split()]
+        for clone in range(scale):
+            tag = f"{intent['tag']}__{clone}"
+            markers = [f"m{rng.randrange(10 ** 6)}" for _ in range(3)]
+            for _ in range(per_tag):
+                sample = [rng.choice(words) for _ in range(rng.randint(2, 6))] + rng.sample(markers, 2)
+                rng.shuffle(sample)
+                texts.append(" ".join(sample))
+                tags.append(tag)
+    return texts, tags
+
+def clone_family(tag):
+    return hierarchical.family_of(tag.rsplit("__", 1)[0])
+
+def time_model(model, X, rounds):
+    latencies = []
+    for i in range(min(rounds, X.shape[0])):
+        row = X[i]
+        start = time.perf_counter()
+        top_k_predictions(model.predict_proba(row))
+        latencies.append(time.perf_counter() - start)
+    batch = X[:1000]
+    start = time.perf_counter()
+    top_k_predictions(model.predict_proba(batch))
+    result = summarize(latencies)
+    result["batch_ms"] = (time.perf_counter() - start) * 1e3
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--per-tag", type=int, default=30, help="Synthetic patterns per intent (80%% train)")
+    parser.add_argument("--rounds", type=int, default=500, help="Single-message predictions to time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    print(f"{'tags':>5} | {'model':<12} | {'accuracy':>8} | {'p50 µs':>8} | {'p99 µs':>8} | {'batch ms':>8}")
+    print("-" * 65)
+    results = {}
+    for scale in args.scales:
+        texts, tags = synthesize(scale, args.per_tag, args.seed)
+        rng = np.random.default_rng(args.seed)
+        held_out = rng.random(len(texts)) < 0.2
+        train_idx, test_idx = np.flatnonzero(~held_out), np.flatnonzero(held_out)
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+        X_train = vectorizer.fit_transform([texts[i] for i in train_idx])
+        X_test = vectorizer.transform([texts[i] for i in test_idx])
+        y_train = np.asarray(tags)[train_idx]
+        y_test = np.asarray(tags)[test_idx]
+
+        flat = CalibratedClassifierCV(LinearSVC(random_state=0), method="sigmoid").fit(X_train, y_train)
+        two_stage = hierarchical.fit(
+            X_train, y_train, lambda: CalibratedClassifierCV(LinearSVC(random_state=0), method="sigmoid"),
+            family=clone_family)
+
+        n_tags = len(set(tags))
+        results[str(n_tags)] = {}
+        for name, model in (("flat", flat), ("hierarchical", two_stage)):
+            compiled = compile_model(model)
+            result = time_model(compiled, X_test, args.rounds)
+            result["accuracy"] = float(np.mean(compiled.predict(X_test) == y_test))
+            results[str(n_tags)][name] = result
+            print(f"{n_tags:>5} | {name:<12} | {result['accuracy']:>8.3f} | {result['p50_ms'] * 1e3:>8.1f} | "
+                  f"{result['p99_ms'] * 1e3:>8.1f} | {result['batch_ms']:>8.1f}")
+
+    if args.output:
+        write_results(args.output, "hierarchical", args, results)
+
+if __name__ == "__main__":
+    main()
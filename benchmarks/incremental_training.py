@@ -0,0 +1,88 @@
+"""
+Incremental training vs full retrain: wall-clock time and held-out accuracy.
+
+    python -m benchmarks.incremental_training --diff-sizes 1 5 20 --scale 10
+
+Patterns are split per intent into train/test. For each diff size, that many
+training patterns are held back, a base incremental model is trained on the
+rest, then the diff is applied with `train.py --incremental` logic. This is
+compared with a full TF-IDF + calibrated LinearSVC retrain (train.py's default)
+and a full refit of the incremental model. --scale grows the catalogue with
+suffixed copies of every pattern to see how each mode scales.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+import incremental
+from benchmarks.common import load_patterns, write_results
+from preprocessing import preprocess_text
+from train import train_full
+
+def split(corpus, test_ratio, rng):
+    by_tag = defaultdict(list)
+    for tag, pattern in corpus:
+        by_tag[tag].append(pattern)
+    train, test = [], []
+    for tag, patterns in by_tag.items():
+        rng.shuffle(patterns)
+        n_test = int(len(patterns) * test_ratio)
+        test += [(tag, p) for p in patterns[:n_test]]
+        train += [(tag, p) for p in patterns[n_test:]]
+    return train, test
+
+def accuracy(model, vectorizer, test):
+    return model.score(vectorizer.transform([p for _, p in test]), [tag for tag, _ in test])
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diff-sizes", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--scale", type=int, default=1, help="Copies of every pattern in the catalogue")
+    parser.add_argument("--test-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [(tag, preprocess_text(pattern)) for tag, pattern in load_patterns()]
+    corpus += [(tag, f"{pattern} variant{i}") for i in range(1, args.scale) for tag, pattern in corpus]
+    train, test = split(corpus, args.test_ratio, rng)
+    patterns, tags = [p for _, p in train], [t for t, _ in train]
+
+    (svc, tfidf), full_seconds = timed(train_full, patterns, tags)
+    (sgd, hashing, _, _), sgd_seconds = timed(incremental.train, patterns, tags)
+    results = {
+        "catalogue": {"train": len(train), "test": len(test)},
+        "full_retrain": {"seconds": full_seconds, "accuracy": accuracy(svc, tfidf, test)},
+        "incremental_refit": {"seconds": sgd_seconds, "accuracy": accuracy(sgd, hashing, test)},
+        "updates": {},
+    }
+
+    for diff in args.diff_sizes:
+        held_back = set(rng.sample(range(len(train)), min(diff, len(train) - 1)))
+        base = [i for i in range(len(train)) if i not in held_back]
+        _, _, state, _ = incremental.train([patterns[i] for i in base], [tags[i] for i in base])
+        (model, vectorizer, _, report), seconds = timed(incremental.train, patterns, tags, state)
+        results["updates"][str(diff)] = {"seconds": seconds, "accuracy": accuracy(model, vectorizer, test),
+                                         "mode": report["mode"], "trained_on": report["trained_on"]}
+
+    print(f"{len(train)} training / {len(test)} held-out patterns\n")
+    print(f"{'Mode':<28} | {'seconds':>8} | {'accuracy':>8}")
+    print("-" * 52)
+    print(f"{'full retrain (TF-IDF + SVC)':<28} | {full_seconds:>8.3f} | {results['full_retrain']['accuracy']:>8.3f}")
+    print(f"{'incremental: full refit':<28} | {sgd_seconds:>8.3f} | {results['incremental_refit']['accuracy']:>8.3f}")
+    for diff, r in results["updates"].items():
+        label = f"incremental: +{diff} ({r['mode']})"
+        print(f"{label:<28} | {r['seconds']:>8.3f} | {r['accuracy']:>8.3f}")
+
+    if args.output:
+        write_results(args.output, "incremental_training", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Intent cache hit ratio and classification latency on replayed traffic.
+
+    python -m benchmarks.intent_cache --messages 20000
+    python -m benchmarks.intent_cache --replay messages.txt
+
+Without --replay, traffic is synthesized Zipf-style from intents.json patterns
+(with case/whitespace variations) plus a share of unseen messages. Each message
+is classified with and without the model generation's intent cache.
+"""
+import argparse
+import json
+import random
+import time
+
+import app
+from benchmarks.common import load_patterns, summarize, write_results
+from model_registry import LoadedModel
+
+UNSEEN = [
+    "I twisted my ankle", "my kid has a high temp", "rash on leg", "I ate something bad",
+    "my blood pressure is high", "can I book an appointment?", "what are your hours?",
+]
+
+def synthesize(n, unseen_ratio, rng):
+    patterns = [pattern for _, pattern in load_patterns()]
+    rng.shuffle(patterns)
+    weights = [1 / (rank + 1) for rank in range(len(patterns))]
+    messages = []
+    for _ in range(n):
+        if rng.random() < unseen_ratio:
+            # Unique tail traffic: a known phrase plus a random word
+            messages.append(f"{rng.choice(UNSEEN)} {rng.randrange(10 ** 6)}")
+            continue
+        message = rng.choices(patterns, weights)[0]
+        variant = rng.random()
+        if variant < 0.2:
+            message = message.lower()
+        elif variant < 0.3:
+            message = f"  {message.upper()} "
+        messages.append(message)
+    return messages
+
+def read_replay(path):
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["message"] for line in lines]
+    return lines
+
+def replay(messages, artifacts):
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        app.classify_message(message, artifacts)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replay", help="Text file (one message per line) or JSONL with a 'message' field")
+    parser.add_argument("--messages", type=int, default=20000, help="Synthetic messages to generate")
+    parser.add_argument("--unseen-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    cached = app.registry.current
+    uncached = LoadedModel(cached.model, cached.vectorizer, cached.tag_map, cached.version)
+    uncached.featurizer = cached.featurizer
+    messages = read_replay(args.replay) if args.replay else synthesize(
+        args.messages, args.unseen_ratio, random.Random(args.seed))
+
+    for message in set(messages):
+        app.preprocess_message(message, cached)  # same warm preprocessing cache for both runs
+    results = {"without_cache": replay(messages, uncached), "with_cache": replay(messages, cached)}
+    results["intent_cache"] = cached.intent_cache.stats()
+
+    stats = results["intent_cache"]
+    print(f"{len(messages)} messages, {len(set(messages))} distinct")
+    print(f"Hit ratio {stats['hit_ratio']:.1%} (precomputed {stats['hits']['precomputed']}, "
+          f"runtime {stats['hits']['runtime']}, misses {stats['misses']})\n")
+    print(f"{'classify_message':<16} | {'mean µs':>9} | {'p50 µs':>9} | {'p99 µs':>9}")
+    print("-" * 52)
+    for label in ("without_cache", "with_cache"):
+        s = results[label]
+        print(f"{label:<16} | {s['mean_ms'] * 1e3:>9.1f} | {s['p50_ms'] * 1e3:>9.1f} | {s['p99_ms'] * 1e3:>9.1f}")
+
+    if args.output:
+        write_results(args.output, "intent_cache", args, results)
+
+if __name__ == "__main__":
+    main()
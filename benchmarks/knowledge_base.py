@@ -0,0 +1,108 @@
+"""
+Per-worker memory and response lookup latency: responses held in a dict vs the SQLite store.
+
+    python -m benchmarks.knowledge_base --intents 50000
+
+A synthetic catalogue is written as JSON Lines and built into a responses.db.
+Each mode runs in a fresh subprocess that loads the responses the way a server
+worker would, then looks up Zipf-distributed tags; the report compares peak RSS
+and per-lookup latency.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import REPO_ROOT, summarize, write_results
+from knowledge_base import ResponseStore, build_store, iter_intents
+
+WORDS = ("please", "rest", "drink", "water", "see", "a", "doctor", "if", "symptoms", "persist",
+         "take", "medication", "as", "directed", "avoid", "strain", "monitor", "your", "temperature")
+
+def write_catalogue(path, n_intents, responses_per_intent, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_intents):
+            intent = {
+                "tag": f"intent_{i:06d}",
+                "patterns": [f"pattern {i} {rng.choice(WORDS)}"],
+                "responses": [" ".join(rng.choices(WORDS, k=30)) for _ in range(responses_per_intent)],
+            }
+            f.write(json.dumps(intent) + "\n")
+
+def run_worker(mode, catalogue, database, lookups, seed):
+    """Loads responses like a server worker, then times lookups. Prints a JSON result line."""
+    start = time.perf_counter()
+    if mode == "dict":
+        tag_map = {intent["tag"]: intent["responses"] for intent in iter_intents(catalogue)}
+    else:
+        tag_map = ResponseStore(database)
+    load_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    n = len(tag_map)
+    weights = [1 / (rank + 1) for rank in range(n)]
+    tags = [f"intent_{i:06d}" for i in rng.choices(range(n), weights, k=lookups)]
+    latencies = []
+    for tag in tags:
+        start = time.perf_counter()
+        tag_map.get(tag)
+        latencies.append(time.perf_counter() - start)
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    result = {"load_s": load_seconds, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20}
+    result.update(summarize(latencies))
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intents", type=int, default=50000, help="Synthetic intents in the catalogue")
+    parser.add_argument("--responses", type=int, default=5, help="Responses per intent")
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--worker", choices=("dict", "store"), help=argparse.SUPPRESS)
+    parser.add_argument("--catalogue", help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.catalogue, args.database, args.lookups, args.seed)
+        return
+
+    tmp = tempfile.mkdtemp()
+    catalogue = os.path.join(tmp, "intents.jsonl")
+    database = os.path.join(tmp, "responses.db")
+    write_catalogue(catalogue, args.intents, args.responses, random.Random(args.seed))
+    start = time.perf_counter()
+    build_store(iter_intents(catalogue), database)
+    results = {"build_s": time.perf_counter() - start,
+               "catalogue_mb": os.path.getsize(catalogue) / 2 ** 20,
+               "database_mb": os.path.getsize(database) / 2 ** 20}
+
+    for mode in ("dict", "store"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.knowledge_base", "--worker", mode, "--catalogue", catalogue,
+             "--database", database, "--lookups", str(args.lookups), "--seed", str(args.seed)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.intents} intents x {args.responses} responses: catalogue {results['catalogue_mb']:.1f} MB, "
+          f"responses.db {results['database_mb']:.1f} MB (built in {results['build_s']:.1f}s)\n")
+    print(f"{'mode':<6} | {'load s':>7} | {'peak RSS MB':>11} | {'p50 µs':>8} | {'p99 µs':>8}")
+    print("-" * 53)
+    for mode in ("dict", "store"):
+        r = results[mode]
+        print(f"{mode:<6} | {r['load_s']:>7.2f} | {r['peak_rss_mb']:>11.1f} | "
+              f"{r['p50_ms'] * 1e3:>8.1f} | {r['p99_ms'] * 1e3:>8.1f}")
+
+    if args.output:
+        write_results(args.output, "knowledge_base", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Concurrent HTTP load generator for /get_response.
+
+    python -m benchmarks.load --server gunicorn --concurrency 32 --duration 30 --output load.json
+    python -m benchmarks.load --url http://127.0.0.1:5000 --concurrency 8
+
+Each virtual user picks a random intents.json pattern and sends it back to
+back (closed loop). Drug and hospital patterns are completed with names the
+local stub upstream knows, and spawned servers talk to that stub, so no real
+API is called. Reports RPS and p50/p95/p99 overall and per intent.
+"""
+import argparse
+import random
+
+from benchmarks.common import (NO_ADMISSION, UNLIMITED_UPSTREAMS, free_port, load_patterns, post_json, python_command,
+                               run_closed_loop, spawn_server, with_entity, write_results)
+from stub_upstream import StubUpstream
+
+SERVERS = {
+    "flask": lambda port: python_command(
+        "-c", f"import app; app.create_app(watch=False).run(port={port}, threaded=True)"),
+    "gunicorn": lambda port: python_command("-m", "gunicorn", "wsgi:app", "--bind", f"127.0.0.1:{port}"),
+    "asgi": lambda port: python_command(
+        "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"),
+}
+
+def request_mix(seed):
+    patterns = load_patterns()
+    rng = random.Random(seed)
+
+    def next_request():
+        tag, pattern = rng.choice(patterns)
+        return tag, {"message": with_entity(tag, pattern, rng)}
+    return next_request
+
+def run(url, args):
+    post_json(url, {"message": "warm up"})
+    return run_closed_loop(url, args.concurrency, args.duration, request_mix(args.seed))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", choices=sorted(SERVERS), default="gunicorn", help="Server to spawn")
+    target.add_argument("--url", help="Base URL of an already running server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--upstream-delay", type=float, default=0.0, help="Stub upstream latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.url:
+        results = run(args.url.rstrip("/") + "/get_response", args)
+    else:
+        with StubUpstream(delay=args.upstream_delay) as stub:
+            env = {"MEDIBOT_OPENFDA_URL": stub.openfda_url, "MEDIBOT_NOMINATIM_URL": stub.nominatim_url,
+                   "MEDIBOT_MODEL_POLL_SECONDS": "0", **UNLIMITED_UPSTREAMS, **NO_ADMISSION}
+            port = free_port()
+            with spawn_server(SERVERS[args.server](port), port, env):
+                results = run(f"http://127.0.0.1:{port}/get_response", args)
+
+    print(f"{'Intent':<22} | {'Requests':>8} | {'Errors':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 75)
+    for kind, s in sorted(results["kinds"].items()) + [("(all)", results["overall"])]:
+        print(f"{kind:<22} | {s['count']:>8} | {s['errors']:>6} | {s['p50_ms']:>8.1f} | {s['p95_ms']:>8.1f} | {s['p99_ms']:>8.1f}")
+    print(f"\n{results['rps']:.1f} requests/s with {args.concurrency} concurrent users")
+
+    if args.output:
+        write_results(args.output, "load", args, results)
+
+if __name__ == "__main__":
+    main()
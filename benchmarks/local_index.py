@@ -0,0 +1,97 @@
+"""
+Drug and hospital lookups from the offline index vs the live APIs (stubbed).
+
+    python -m benchmarks.local_index --labels 50000 --hospitals 20000 --upstream-delay 0.2
+
+Builds an index from a synthetic openFDA label dump and Overpass extract of the
+given size, then times uncached lookups: LocalIndex.drug_info/hospitals against
+fetch_drug_info/fetch_hospitals over HTTP to the local stub (whose --upstream-delay
+stands in for the real round trip; Nominatim also allows only 1 request/s).
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import summarize, write_results
+import integrations
+from local_index import LocalIndex, build_index
+from stub_upstream import DRUG_LABELS, HOSPITALS, StubUpstream
+
+def write_dumps(directory, n_labels, n_hospitals, rng):
+    labels = [{"openfda": {"brand_name": [name.title()], "generic_name": [f"generic {name}"]}, **label}
+              for name, label in DRUG_LABELS.items()]
+    labels += [{"openfda": {"brand_name": [f"brand{i}"], "generic_name": [f"generic{i}"]},
+                "purpose": [f"Purpose {i}"], "warnings": ["Warning text " * 20]} for i in range(n_labels)]
+    elements = []
+    cities = list(HOSPITALS) + [f"city{i}" for i in range(max(1, n_hospitals // 10))]
+    for c, city in enumerate(cities):
+        lat, lon = rng.uniform(-60, 60), rng.uniform(-170, 170)
+        elements.append({"type": "node", "id": c, "lat": lat, "lon": lon, "tags": {"place": "city", "name": city}})
+        names = HOSPITALS.get(city) or [f"{city} hospital {j}" for j in range(10)]
+        for j, name in enumerate(names):
+            elements.append({"type": "node", "id": 10 ** 7 + c * 10 + j, "lat": lat + rng.uniform(-0.05, 0.05),
+                             "lon": lon + rng.uniform(-0.05, 0.05),
+                             "tags": {"amenity": "hospital", "name": name, "addr:city": city}})
+    drugs_path = os.path.join(directory, "drug-label.json")
+    osm_path = os.path.join(directory, "hospitals.json")
+    with open(drugs_path, "w", encoding="utf-8") as f:
+        json.dump({"results": labels}, f)
+    with open(osm_path, "w", encoding="utf-8") as f:
+        json.dump({"elements": elements}, f)
+    return drugs_path, osm_path
+
+def time_calls(fn, keys):
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        fn(key)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=50000)
+    parser.add_argument("--hospitals", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=5000, help="Local lookups to time")
+    parser.add_argument("--live-lookups", type=int, default=50, help="Live (stub) lookups to time")
+    parser.add_argument("--upstream-delay", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    directory = tempfile.mkdtemp()
+    drugs_path, osm_path = write_dumps(directory, args.labels, args.hospitals, rng)
+    path = os.path.join(directory, "local_data.db")
+    start = time.perf_counter()
+    counts = build_index([drugs_path], [osm_path], path)
+    results = {"build_s": time.perf_counter() - start, "index_mb": os.path.getsize(path) / 2 ** 20, "counts": counts}
+    print(f"Indexed {counts} in {results['build_s']:.1f}s ({results['index_mb']:.1f} MB)\n")
+
+    index = LocalIndex(path)
+    drug_keys = [rng.choice(list(DRUG_LABELS)) for _ in range(args.lookups)]
+    city_keys = [rng.choice(list(HOSPITALS)) for _ in range(args.lookups)]
+    results["local_drugs"] = time_calls(index.drug_info, drug_keys)
+    results["local_hospitals"] = time_calls(index.hospitals, city_keys)
+
+    with StubUpstream(delay=args.upstream_delay) as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_clients(limiter=False)
+        results["live_drugs"] = time_calls(integrations.fetch_drug_info, drug_keys[:args.live_lookups])
+        results["live_hospitals"] = time_calls(integrations.fetch_hospitals, city_keys[:args.live_lookups])
+
+    print(f"{'lookup':<16} | {'p50 µs':>10} | {'p99 µs':>10}")
+    print("-" * 42)
+    for label in ("local_drugs", "live_drugs", "local_hospitals", "live_hospitals"):
+        s = results[label]
+        print(f"{label:<16} | {s['p50_ms'] * 1e3:>10.1f} | {s['p99_ms'] * 1e3:>10.1f}")
+
+    if args.output:
+        write_results(args.output, "local_index", args, results)
+
+if __name__ == "__main__":
+    main()
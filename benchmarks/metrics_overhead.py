@@ -0,0 +1,53 @@
+"""
+Cost of the metrics instrumentation on the classification hot path.
+
+    python -m benchmarks.metrics_overhead --rounds 50
+
+Times app.classify_message over every intents.json pattern with metrics
+disabled, enabled, and enabled with every request profiled.
+"""
+import argparse
+import os
+import tempfile
+
+import app
+import metrics
+from benchmarks.common import load_patterns, summarize, write_results
+from benchmarks.micro import time_each
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    artifacts = app.registry.current
+    messages = [pattern for _, pattern in load_patterns()]
+
+    def classify(message):
+        with metrics.track_request("get_response"):
+            app.classify_message(message, artifacts)
+
+    modes = {"disabled": (False, 0.0), "enabled": (True, 0.0), "enabled + profiling": (True, 1.0)}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics.PROFILE_PATH = os.path.join(tmp, "profile.jsonl")
+        time_each(classify, messages, 2)  # warm the preprocessing caches first
+        for mode, (enabled, sample_rate) in modes.items():
+            metrics.ENABLED, metrics.PROFILE_SAMPLE_RATE = enabled, sample_rate
+            results[mode] = summarize(time_each(classify, messages, args.rounds))
+
+    baseline = results["disabled"]["mean_ms"]
+    print(f"{'Metrics':<20} | {'mean µs':>9} | {'p99 µs':>9} | {'overhead':>8}")
+    print("-" * 55)
+    for mode, s in results.items():
+        print(f"{mode:<20} | {s['mean_ms'] * 1e3:>9.1f} | {s['p99_ms'] * 1e3:>9.1f} | "
+              f"{(s['mean_ms'] / baseline - 1) * 100:>+7.1f}%")
+
+    if args.output:
+        write_results(args.output, "metrics_overhead", args, results)
+
+if __name__ == "__main__":
+    main()
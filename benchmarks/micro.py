@@ -0,0 +1,88 @@
+"""
+In-process microbenchmarks of each stage of a reply.
+
+    python -m benchmarks.micro --rounds 20 --output micro.json
+
+Every intents.json pattern goes through preprocess_text (cold and warm
+cache), vectorizer.transform, predict_proba and the whole get_bot_response,
+one message per call like a live request, plus the batched transform/predict
+used by /get_responses. Integrations answer from the local stub.
+"""
+import argparse
+import random
+import time
+
+import app
+import integrations
+import preprocessing
+from benchmarks.common import load_patterns, summarize, with_entity, write_results
+from stub_upstream import StubUpstream
+
+def time_each(fn, inputs, rounds, before_round=None):
+    """Per-call latencies of fn(x) for every input, repeated `rounds` times."""
+    latencies = []
+    for _ in range(rounds):
+        if before_round is not None:
+            before_round()
+        for x in inputs:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def time_batch(fn, batch, rounds):
+    """Per-message latencies of fn(batch), one sample per round."""
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - start) / len(batch))
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over all patterns per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    artifacts = app.registry.current
+    rng = random.Random(args.seed)
+    messages = [with_entity(tag, pattern, rng) for tag, pattern in load_patterns()]
+    processed = [preprocessing.preprocess_text(m) for m in messages]
+    vectors = [artifacts.vectorizer.transform([p]) for p in processed]
+    batch = artifacts.vectorizer.transform(processed)
+
+    stages = {
+        "preprocess_text (cold)": lambda: time_each(
+            preprocessing.preprocess_text, messages, args.rounds, before_round=preprocessing.clear_caches),
+        "preprocess_text (warm)": lambda: time_each(preprocessing.preprocess_text, messages, args.rounds),
+        "vectorizer.transform": lambda: time_each(
+            lambda p: artifacts.vectorizer.transform([p]), processed, args.rounds),
+        "predict_proba": lambda: time_each(artifacts.model.predict_proba, vectors, args.rounds),
+        "vectorizer.transform (batch)": lambda: time_batch(artifacts.vectorizer.transform, processed, args.rounds),
+        "predict_proba (batch)": lambda: time_batch(artifacts.model.predict_proba, batch, args.rounds),
+        "get_bot_response": lambda: time_each(app.get_bot_response, messages, args.rounds),
+    }
+
+    results = {}
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_clients(limiter=False)
+        print(f"Model {artifacts.version}, {len(messages)} patterns x {args.rounds} rounds\n")
+        print(f"{'Stage':<30} | {'mean µs':>9} | {'p50 µs':>9} | {'p95 µs':>9} | {'p99 µs':>9}")
+        print("-" * 78)
+        for name, run in stages.items():
+            results[name] = summarize(run())
+            s = results[name]
+            print(f"{name:<30} | {s['mean_ms'] * 1e3:>9.1f} | {s['p50_ms'] * 1e3:>9.1f} | "
+                  f"{s['p95_ms'] * 1e3:>9.1f} | {s['p99_ms'] * 1e3:>9.1f}")
+
+    if args.output:
+        write_results(args.output, "micro", args, results)
+
+if __name__ == "__main__":
+    main()
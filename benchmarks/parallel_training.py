@@ -0,0 +1,72 @@
+"""
+Training time from 1 to N cores on a synthetic large intents corpus.
+
+    python -m benchmarks.parallel_training --patterns-per-intent 2000 --jobs 1 2 4 8
+
+Patterns are synthesized by recombining the words of each intent's real
+patterns, so every one is a distinct preprocessing cache miss. Times
+preprocessing (process pool) and the calibrated LinearSVC fit (parallel
+folds) separately, and checks every run matches the single-core result.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+from benchmarks.common import REPO_ROOT, write_results
+from preprocessing import clear_caches, preprocess_many
+from train import train_full
+
+def synthesize(patterns_per_intent, seed):
+    with open(os.path.join(REPO_ROOT, "intents.json"), encoding="utf-8") as f:
+        intents = json.load(f)["intents"]
+    rng = random.Random(seed)
+    texts, tags = [], []
+    for intent in intents:
+        words = [word for pattern in intent["patterns"] for word in pattern.split()]
+        for _ in range(patterns_per_intent):
+            texts.append(" ".join(rng.choice(words) for _ in range(rng.randint(2, 8))))
+            tags.append(intent["tag"])
+    return texts, tags
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patterns-per-intent", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    texts, tags = synthesize(args.patterns_per_intent, args.seed)
+    print(f"{len(texts)} synthetic patterns, {len(set(tags))} intents, {os.cpu_count()} CPUs\n")
+    print(f"{'Jobs':>4} | {'preprocess s':>12} | {'fit s':>8} | {'speedup':>7} | identical")
+    print("-" * 55)
+
+    results = {}
+    reference = None
+    for jobs in sorted(set(args.jobs)):
+        clear_caches()
+        start = time.perf_counter()
+        processed = preprocess_many(texts, jobs)
+        preprocess_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model, vectorizer = train_full(processed, tags, jobs)
+        fit_seconds = time.perf_counter() - start
+
+        probabilities = model.predict_proba(vectorizer.transform(processed[:2000]))
+        if reference is None:
+            reference = (processed, probabilities, preprocess_seconds + fit_seconds)
+        identical = processed == reference[0] and np.array_equal(probabilities, reference[1])
+        speedup = reference[2] / (preprocess_seconds + fit_seconds)
+        results[str(jobs)] = {"preprocess_seconds": preprocess_seconds, "fit_seconds": fit_seconds,
+                              "speedup": speedup, "identical": identical}
+        print(f"{jobs:>4} | {preprocess_seconds:>12.2f} | {fit_seconds:>8.2f} | {speedup:>6.2f}x | {identical}")
+
+    if args.output:
+        write_results(args.output, "parallel_training", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Bulk replay throughput from 1 to N worker processes on a synthetic transcript.
+
+    python -m benchmarks.replay --lines 1000000 --jobs 1 2 4 8
+
+Writes a JSONL transcript of intents.json patterns with case, whitespace and
+random-word variations, so most lines are distinct messages. The transcript
+is then scored with replay.py at each --jobs value. Reports lines/s, speedup
+and parallel efficiency, and checks every run writes the same output as the
+single-process run.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import load_patterns, write_results
+import replay
+
+WORDS = ["please", "today", "again", "really", "now", "badly", "since", "yesterday", "doctor", "help"]
+
+def write_transcript(path, n, rng):
+    patterns = load_patterns()
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(n):
+            tag, message = rng.choice(patterns)
+            if rng.random() < 0.5:
+                message = f"{message} {rng.choice(WORDS)} {rng.randrange(10 ** 6)}"
+            if rng.random() < 0.2:
+                message = message.upper()
+            f.write(json.dumps({"message": message, "tag": tag}) + "\n")
+
+def run(transcript, output_path, jobs, chunk_size):
+    rows = replay.read_messages(transcript, label_field="tag")
+    start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as output:
+        totals = replay.replay(rows, output, jobs, chunk_size)
+    elapsed = time.perf_counter() - start
+    with open(output_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"lines": totals["rows"], "seconds": elapsed, "lines_per_s": totals["rows"] / elapsed}, digest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--chunk-size", type=int, default=replay.CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    replay.load_artifacts()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        transcript = os.path.join(directory, "transcript.jsonl")
+        write_transcript(transcript, args.lines, random.Random(args.seed))
+        reference = None
+        for jobs in sorted(set(args.jobs)):
+            result, digest = run(transcript, os.path.join(directory, f"scored-{jobs}.jsonl"), jobs, args.chunk_size)
+            reference = reference or digest
+            result["matches_single_process"] = digest == reference
+            results[jobs] = result
+
+    base = results[min(results)]["lines_per_s"]
+    print(f"{args.lines} lines, {os.cpu_count()} CPUs\n")
+    print(f"{'Jobs':>4} | {'lines/s':>9} | {'speedup':>7} | {'efficiency':>10} | {'same output':>11}")
+    print("-" * 55)
+    for jobs, r in results.items():
+        speedup = r["lines_per_s"] / base
+        print(f"{jobs:>4} | {r['lines_per_s']:>9.0f} | {speedup:>6.2f}x | {speedup / jobs:>10.0%} | "
+              f"{'yes' if r['matches_single_process'] else 'NO':>11}")
+
+    if args.output:
+        write_results(args.output, "replay", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Session store memory and follow-up turn latency.
+
+    python -m benchmarks.sessions --sessions 100000 --turns 2000 --upstream-delay 0.2
+
+Fills a SessionStore with --sessions distinct lookup results (half drug labels
+with a 300-character warning, half three-hospital searches) and reports the
+memory tracemalloc sees next to the store's own estimate. Then times
+get_bot_response for a full turn ("Tell me about aspirin", classifier plus an
+uncached lookup at the stub upstream) against its follow-up ("what about its
+warnings?"), each in a fresh session.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.common import summarize, write_results
+import app
+import integrations
+import sessions
+from stub_upstream import StubUpstream
+
+def session_info(i):
+    if i % 2:
+        return "hospital_search", f"city{i}", {"found": True, "hospitals": [
+            {"name": f"City {i} Hospital {j}", "lat": f"{40 + j / 100:.7f}", "lon": f"{-71 - i / 1e6:.7f}"}
+            for j in range(3)]}
+    return "drug_lookup", f"drug{i}", {"found": True, "name": f"drug{i}", "purpose": f"Pain reliever {i}",
+                                       "warnings": (f"Warning {i} " * 40)[:300] + "..."}
+
+def measure_memory(n):
+    # Traces the payloads too: a session keeps its lookup result alive after the request ends
+    store = sessions.SessionStore(max_sessions=n, max_bytes=2 ** 40)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        store.put(f"{i:032x}", *session_info(i))
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {"sessions": len(store), "traced_mb": traced / 2 ** 20, "estimated_mb": store.bytes / 2 ** 20,
+            "bytes_per_session": traced / n, "mb_per_100k": traced / n * 1e5 / 2 ** 20}
+
+def time_turns(turns):
+    full, follow_up = [], []
+    for i in range(turns):
+        session_id = f"bench-{i:08d}"
+        start = time.perf_counter()
+        app.get_bot_response("Tell me about aspirin", session_id=session_id)
+        full.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        app.get_bot_response("what about its warnings?", session_id=session_id)
+        follow_up.append(time.perf_counter() - start)
+    return {"full_turn": summarize(full), "follow_up": summarize(follow_up)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=2000, help="Full turn + follow-up pairs to time")
+    parser.add_argument("--upstream-delay", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {"memory": measure_memory(args.sessions)}
+    m = results["memory"]
+    print(f"{m['sessions']} sessions: {m['traced_mb']:.1f} MB traced, {m['estimated_mb']:.1f} MB estimated "
+          f"({m['bytes_per_session']:.0f} bytes/session, {m['mb_per_100k']:.1f} MB per 100k)\n")
+
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    with StubUpstream(delay=args.upstream_delay) as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_local_index(mode="live")
+        integrations.configure_clients(limiter=False)
+        integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+        results.update(time_turns(args.turns))
+        results["upstream_requests"] = stub.requests["/drug/label.json"]
+
+    print(f"{'turn':<10} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 32)
+    for label in ("full_turn", "follow_up"):
+        s = results[label]
+        print(f"{label:<10} | {s['p50_ms']:>8.3f} | {s['p99_ms']:>8.3f}")
+    print(f"\n{results['upstream_requests']} OpenFDA requests for {args.turns} full turns + {args.turns} follow-ups")
+
+    if args.output:
+        write_results(args.output, "sessions", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Time to first byte: /get_response vs the /stream_response Server-Sent Events.
+
+    python -m benchmarks.streaming --upstream-delay 1.0 --requests 20
+    python -m benchmarks.streaming --servers flask asgi
+
+Sends hospital and drug lookups one at a time to a spawned server whose
+upstreams are the local stub delayed by `--upstream-delay` seconds, with the
+integration cache disabled so every lookup waits on the stub. For each
+endpoint it reports when the first body byte arrived (for the stream, the
+intent and placeholder) and when the reply was complete.
+"""
+import argparse
+import http.client
+import json
+import time
+
+from benchmarks.common import (NO_ADMISSION, UNLIMITED_UPSTREAMS, free_port, python_command, spawn_server, summarize,
+                               write_results)
+from stub_upstream import StubUpstream
+
+NO_CACHE = "import integrations; integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)"
+
+SERVERS = {
+    "flask": lambda port: python_command(
+        "-c", f"{NO_CACHE}; import app; app.create_app(watch=False).run(port={port}, threaded=True)"),
+    "asgi": lambda port: python_command(
+        "-c", f"{NO_CACHE}; import uvicorn; uvicorn.run('asgi:app', port={port}, log_level='warning')"),
+}
+
+MESSAGES = ["Find hospitals in Boston", "hospitals near London", "Tell me about Advil", "Is aspirin safe?"]
+
+def time_request(port, path, message):
+    """POSTs one message; returns (seconds to the first body byte, seconds to the end of the body)."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        start = time.perf_counter()
+        connection.request("POST", path, json.dumps({"message": message}), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read(1)
+        first_byte = time.perf_counter() - start
+        response.read()
+        return first_byte, time.perf_counter() - start
+    finally:
+        connection.close()
+
+def run(port, path, n):
+    timings = [time_request(port, path, MESSAGES[i % len(MESSAGES)]) for i in range(n)]
+    return {"first_byte": summarize([t[0] for t in timings]), "complete": summarize([t[1] for t in timings])}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", default=["flask"], choices=sorted(SERVERS))
+    parser.add_argument("--requests", type=int, default=20, help="Requests per endpoint")
+    parser.add_argument("--upstream-delay", type=float, default=1.0, help="Stub upstream latency in seconds")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    with StubUpstream(delay=args.upstream_delay) as stub:
+        env = {"MEDIBOT_OPENFDA_URL": stub.openfda_url, "MEDIBOT_NOMINATIM_URL": stub.nominatim_url,
+               "MEDIBOT_MODEL_POLL_SECONDS": "0", "MEDIBOT_DATA_MODE": "live", **UNLIMITED_UPSTREAMS, **NO_ADMISSION}
+        for server in args.servers:
+            port = free_port()
+            with spawn_server(SERVERS[server](port), port, env):
+                time_request(port, "/get_response", "warm up")
+                for path in ("/get_response", "/stream_response"):
+                    results[f"{server} {path}"] = run(port, path, args.requests)
+
+    print(f"{'Endpoint':<24} | {'TTFB p50 ms':>11} | {'TTFB p99 ms':>11} | {'done p50 ms':>11}")
+    print("-" * 66)
+    for name, r in results.items():
+        print(f"{name:<24} | {r['first_byte']['p50_ms']:>11.1f} | {r['first_byte']['p99_ms']:>11.1f} | "
+              f"{r['complete']['p50_ms']:>11.1f}")
+
+    if args.output:
+        write_results(args.output, "streaming", args, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput of the production server (gunicorn + wsgi.py) across worker counts.
+
+    python -m benchmarks.workers --workers 1 2 4 8 --concurrency 64 --duration 15
+
+Classify-only traffic (no integration calls), so the numbers show how far
+CPU-bound classification scales with processes on this box.
+"""
+import argparse
+import os
+import random
+
+from benchmarks.common import (NO_ADMISSION, free_port, post_json, python_command, run_closed_loop, spawn_server,
+                               write_results)
+
+MESSAGES = [
+    "Hello", "I have a fever", "my head hurts a lot", "I feel very sad", "thanks",
+    "chest pain", "rash on leg", "who created you?", "stomach pain severe", "panicking right now",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'Workers':>7} | {'RPS':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'Errors':>6}")
+    print("-" * 50)
+
+    results = {}
+    for workers in args.workers:
+        port = free_port()
+        env = {
+            "MEDIBOT_BIND": f"127.0.0.1:{port}",
+            "MEDIBOT_WORKERS": str(workers),
+            "MEDIBOT_THREADS": str(args.threads),
+            "MEDIBOT_MODEL_POLL_SECONDS": "0",
+            **NO_ADMISSION,
+        }
+        with spawn_server(python_command("-m", "gunicorn", "wsgi:app"), port, env):
+            url = f"http://127.0.0.1:{port}/get_response"
+            for _ in range(workers * 4):
+                post_json(url, {"message": "warm up"})
+            run = run_closed_loop(url, args.concurrency, args.duration,
+                                  lambda: ("classify", {"message": random.choice(MESSAGES)}))
+
+        overall = run["overall"]
+        results[workers] = dict(overall, rps=run["rps"])
+        print(f"{workers:>7} | {run['rps']:>8.1f} | {overall['p50_ms']:>8.1f} | {overall['p99_ms']:>8.1f} | {overall['errors']:>6}")
+
+    if args.output:
+        write_results(args.output, "workers", args, results)
+
+if __name__ == "__main__":
+    main()
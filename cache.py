@@ -0,0 +1,300 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_key(text):
+    """Normalizes a drug name or city so 'Advil ' and 'advil' share one entry."""
+    return ' '.join(text.lower().split())
+
+
+class MemoryBackend:
+    """Bounded in-process LRU of key -> (value, stored_at)."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                self._entries.move_to_end((namespace, key))
+            return entry
+
+    def set(self, namespace, key, value, stored_at):
+        with self._lock:
+            self._entries[(namespace, key)] = (value, stored_at)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self, namespace):
+        with self._lock:
+            return sum(1 for ns, _ in self._entries if ns == namespace)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """On-disk cache shared across restarts (and worker processes) via SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._connect()
+
+    @property
+    def _db(self):
+        # SQLite connections must not cross fork(); each worker process opens its own
+        if self._pid != os.getpid():
+            self._connect()
+        return self._conn
+
+    def _connect(self):
+        self._pid = os.getpid()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+    def get(self, namespace, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, stored_at):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), stored_at),
+            )
+            self._db.commit()
+
+    def size(self, namespace):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+            self._db.commit()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key: the first caller runs the function and
+    every caller that arrives while it is in flight gets the same result.
+    do() is for threads, do_async() for coroutines on one event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+            else:
+                self.shared += 1
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["value"]
+
+        try:
+            call["value"] = fn()
+            return call["value"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    async def do_async(self, key, fn):
+        # The event loop runs one coroutine at a time, so the dict needs no lock
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: a cancelled caller must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+
+class TTLCache:
+    """
+    Read-through cache for integration lookups with stale-while-revalidate.
+
+    Fresh entries are returned directly. Entries past their TTL but within
+    `stale_ttl` are still returned while one background thread refreshes them.
+    Negative results ({"found": False}) are cached with their own shorter TTL;
+    results carrying an "error" (timeouts, upstream failures) are never cached.
+    Concurrent misses for one key share a single fetch.
+    get_or_fetch_async() is the asyncio flavour for the async serving mode.
+    """
+
+    def __init__(self, namespace, backend=None, ttl=6 * 3600, negative_ttl=15 * 60, stale_ttl=24 * 3600):
+        self.namespace = namespace
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._tasks = set()
+        self._flights = SingleFlight()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.fetch_seconds = 0.0
+        self.max_fetch_seconds = 0.0
+        self._flights.shared = 0
+
+    def _lookup(self, key):
+        """Returns (value, is_stale) for a usable entry, or (None, False) on a miss."""
+        entry = self.backend.get(self.namespace, key)
+        value, is_stale = None, False
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            ttl = self.ttl if value.get("found") else self.negative_ttl
+            if age >= ttl + self.stale_ttl:
+                value = None
+            is_stale = age >= ttl
+
+        # Request threads look up concurrently; unlocked += would lose counts
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None, False
+            if is_stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return value, is_stale
+
+    def get_or_fetch(self, key, fetch):
+        """Returns the cached value for `key`, calling `fetch()` on a miss."""
+        value, is_stale = self._lookup(key)
+        if value is None:
+            return self._fetch(key, fetch)
+        if is_stale:
+            self._refresh_in_background(key, fetch)
+        return value
+
+    async def get_or_fetch_async(self, key, fetch):
+        """Same as get_or_fetch() for a coroutine function `fetch`; refreshes run as tasks."""
+        value, is_stale = self._lookup(key)
+        if value is None:
+            return await self._fetch_async(key, fetch)
+        if is_stale and self._start_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._refresh_async(key, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return value
+
+    def _record_fetch(self, key, value, elapsed):
+        with self._lock:
+            self.fetches += 1
+            self.fetch_seconds += elapsed
+            self.max_fetch_seconds = max(self.max_fetch_seconds, elapsed)
+            if "error" in value:
+                self.fetch_errors += 1
+
+        if "error" not in value:
+            self.backend.set(self.namespace, key, value, time.time())
+        return value
+
+    def _fetch(self, key, fetch):
+        def timed_fetch():
+            start = time.perf_counter()
+            value = fetch()
+            return self._record_fetch(key, value, time.perf_counter() - start)
+        return self._flights.do(key, timed_fetch)
+
+    async def _fetch_async(self, key, fetch):
+        async def timed_fetch():
+            start = time.perf_counter()
+            value = await fetch()
+            return self._record_fetch(key, value, time.perf_counter() - start)
+        return await self._flights.do_async(key, timed_fetch)
+
+    def _start_refresh(self, key):
+        """Claims the refresh of `key`; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _finish_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key, fetch):
+        if not self._start_refresh(key):
+            return
+
+        def refresh():
+            try:
+                self._fetch(key, fetch)
+            finally:
+                self._finish_refresh(key)
+
+        threading.Thread(target=refresh, name=f"{self.namespace}-refresh", daemon=True).start()
+
+    async def _refresh_async(self, key, fetch):
+        try:
+            await self._fetch_async(key, fetch)
+        finally:
+            self._finish_refresh(key)
+
+    def stats(self):
+        with self._lock:
+            hits, stale_hits, misses = self.hits, self.stale_hits, self.misses
+        lookups = hits + stale_hits + misses
+        return {
+            "entries": self.backend.size(self.namespace),
+            "hits": hits,
+            "stale_hits": stale_hits,
+            "misses": misses,
+            "hit_ratio": (hits + stale_hits) / lookups if lookups else 0.0,
+            "fetches": self.fetches,
+            "coalesced": self._flights.shared,
+            "fetch_errors": self.fetch_errors,
+            "avg_fetch_ms": self.fetch_seconds / self.fetches * 1e3 if self.fetches else 0.0,
+            "max_fetch_ms": self.max_fetch_seconds * 1e3,
+        }
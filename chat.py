@@ -1,35 +1,43 @@
 import pickle
-import nltk
 import random
 import os
-from nltk.stem import WordNetLemmatizer
 from colorama import init, Fore, Style
+from compiled_model import compile_model
+from knowledge_base import RESPONSES_DB, ResponseStore
+from model_bundle import current_version, load_bundle
+from preprocessing import preprocess_text
 
 # Initialize Colorama
 init(autoreset=True)
 
-lemmatizer = WordNetLemmatizer()
-
 def load_artifacts():
+    if current_version() is not None:
+        model, vectorizer, tag_map, _ = load_bundle()
+        return model, vectorizer, tag_map
+
     if not os.path.exists('chat_model.pkl'):
         print(Fore.RED + "Error: Model not found. Please run 'train.py' first.")
         return None, None, None
 
     with open('chat_model.pkl', 'rb') as f:
         model = pickle.load(f)
+
+    try:
+        model = compile_model(model)
+    except ValueError as e:
+        print(Fore.YELLOW + f"Serving the pickled model as is: {e}")
     
     with open('vectorizer.pkl', 'rb') as f:
         vectorizer = pickle.load(f)
     
-    with open('tag_map.pkl', 'rb') as f:
-        tag_map = pickle.load(f)
+    if os.path.exists(RESPONSES_DB):
+        tag_map = ResponseStore(RESPONSES_DB)
+    else:
+        with open('tag_map.pkl', 'rb') as f:
+            tag_map = pickle.load(f)
         
     return model, vectorizer, tag_map
 
-def preprocess_text(text):
-    tokens = nltk.word_tokenize(text)
-    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
-
 def get_response(user_input, model, vectorizer, tag_map):
     processed_input = preprocess_text(user_input)
     vectorized_input = vectorizer.transform([processed_input])
@@ -0,0 +1,18 @@
+"""Shared [PASS]/[FAIL] reporting for the verify_*.py scripts."""
+import sys
+
+results = []
+
+
+def check(name, condition):
+    """Prints one [PASS]/[FAIL] line and records the outcome."""
+    results.append(bool(condition))
+    print(f"[{'PASS' if condition else 'FAIL'}] {name}")
+    return condition
+
+
+def report():
+    """Prints the score and exits with status 1 if any check failed."""
+    print(f"\nScore: {sum(results)}/{len(results)}")
+    if not all(results):
+        sys.exit(1)
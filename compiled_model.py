@@ -0,0 +1,120 @@
+import numpy as np
+from scipy.special import expit
+
+
+class CompiledModel:
+    """
+    Dense NumPy version of a CalibratedClassifierCV(LinearSVC, method='sigmoid').
+
+    Every fold's decision function and sigmoid calibrator is folded into one
+    coefficient matrix, so predict_proba is a single sparse-dense matmul
+    followed by a few vectorized array operations. A one-vs-rest logistic model
+    (SGDClassifier(loss='log_loss')) is the special case of one fold with a=-1, b=0.
+    """
+
+    def __init__(self, classes, coef, intercept, a, b, mask):
+        self.classes_ = np.asarray(classes)
+        self.coef = coef            # (n_features, n_folds * n_classes)
+        self.intercept = intercept  # (n_folds * n_classes,)
+        self.a = a                  # sigmoid slope per (fold, class)
+        self.b = b                  # sigmoid offset per (fold, class)
+        self.mask = mask            # 0.0 where a fold never saw a class
+        self.n_classes = len(self.classes_)
+        self.n_folds = len(intercept) // self.n_classes
+
+    def predict_proba(self, X):
+        scores = np.asarray(X @ self.coef) + self.intercept
+        proba = expit(-(self.a * scores + self.b)) * self.mask
+        proba = proba.reshape(-1, self.n_folds, self.n_classes)
+
+        if self.n_classes == 2:
+            proba[:, :, 0] = 1.0 - proba[:, :, 1]
+        else:
+            # Same normalization as sklearn's _CalibratedClassifier.predict_proba
+            denominator = proba.sum(axis=2, keepdims=True)
+            uniform = np.full_like(proba, 1.0 / self.n_classes)
+            proba = np.divide(proba, denominator, out=uniform, where=denominator != 0)
+        proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+
+        return proba.mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _fold_parts(calibrated_classifier):
+    """Returns (estimator, calibrators) across the attribute names used by sklearn releases."""
+    estimator = getattr(calibrated_classifier, 'estimator', None)
+    if estimator is None:
+        estimator = calibrated_classifier.base_estimator
+    calibrators = getattr(calibrated_classifier, 'calibrators', None)
+    if calibrators is None:
+        calibrators = calibrated_classifier.calibrators_
+    return estimator, calibrators
+
+
+def _compile_logistic_ovr(model):
+    classes = model.classes_
+    n_classes = len(classes)
+    coef = np.zeros((model.coef_.shape[1], n_classes))
+    intercept = np.zeros(n_classes)
+    # Binary models have a single decision column for the positive class
+    positions = [1] if n_classes == 2 else range(n_classes)
+    for row, position in enumerate(positions):
+        coef[:, position] = model.coef_[row]
+        intercept[position] = np.ravel(model.intercept_)[row]
+    mask = np.zeros(n_classes)
+    mask[list(positions)] = 1.0
+    # expit(-(a * score + b)) with a=-1, b=0 is expit(score), as in sklearn's _predict_proba_lr
+    return CompiledModel(classes, coef, intercept, -mask, np.zeros(n_classes), mask)
+
+
+def compile_model(model):
+    """
+    Folds a fitted sigmoid CalibratedClassifierCV over a linear estimator (or an
+    SGDClassifier with log loss) into a CompiledModel. A hierarchical model gets
+    each of its stages compiled.
+    Raises ValueError for models that can't be expressed as linear scores + sigmoid.
+    """
+    if hasattr(model, 'map_stages'):
+        return model.map_stages(compile_model)
+    if getattr(model, 'loss', None) in ('log_loss', 'log') and hasattr(model, 'coef_'):
+        return _compile_logistic_ovr(model)
+    if not hasattr(model, 'calibrated_classifiers_'):
+        raise ValueError(f"Can't compile {type(model).__name__}: not a CalibratedClassifierCV.")
+    if getattr(model, 'method', 'sigmoid') != 'sigmoid':
+        raise ValueError("Only method='sigmoid' calibration can be compiled.")
+
+    classes = model.classes_
+    class_index = {label: i for i, label in enumerate(classes)}
+    n_classes = len(classes)
+    folds = model.calibrated_classifiers_
+    n_features = _fold_parts(folds[0])[0].coef_.shape[1]
+
+    width = len(folds) * n_classes
+    coef = np.zeros((n_features, width))
+    intercept = np.zeros(width)
+    a = np.zeros(width)
+    b = np.zeros(width)
+    mask = np.zeros(width)
+
+    for f, fold in enumerate(folds):
+        estimator, calibrators = _fold_parts(fold)
+        if not hasattr(estimator, 'coef_'):
+            raise ValueError(f"Can't compile {type(estimator).__name__}: no linear coef_.")
+
+        if n_classes == 2:
+            # Binary estimators have a single decision column for the positive class
+            positions = [1]
+        else:
+            positions = [class_index[label] for label in estimator.classes_]
+
+        for row, (position, calibrator) in enumerate(zip(positions, calibrators)):
+            column = f * n_classes + position
+            coef[:, column] = estimator.coef_[row]
+            intercept[column] = np.ravel(estimator.intercept_)[row]
+            a[column] = calibrator.a_
+            b[column] = calibrator.b_
+            mask[column] = 1.0
+
+    return CompiledModel(classes, coef, intercept, a, b, mask)
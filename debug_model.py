@@ -1,12 +1,5 @@
 import pickle
-import nltk
-from nltk.stem import WordNetLemmatizer
-
-lemmatizer = WordNetLemmatizer()
-
-def preprocess_text(text):
-    tokens = nltk.word_tokenize(text)
-    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
+from preprocessing import preprocess_text
 
 def test_model():
     print("Loading artifacts...")
@@ -1,8 +1,7 @@
 import pickle
-import nltk
-from nltk.stem import WordNetLemmatizer
 import os
 import pandas as pd
+from preprocessing import preprocess_text
 
 # Load artifacts
 with open('chat_model.pkl', 'rb') as f:
@@ -10,12 +9,6 @@ with open('chat_model.pkl', 'rb') as f:
 with open('vectorizer.pkl', 'rb') as f:
     vectorizer = pickle.load(f)
 
-lemmatizer = WordNetLemmatizer()
-
-def preprocess_text(text):
-    tokens = nltk.word_tokenize(text)
-    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
-
 queries = [
     "Hello", "Hi", # Greeting (Should be high)
     "I have a fever", # Symptom (Should be high)
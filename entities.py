@@ -0,0 +1,144 @@
+"""
+Gazetteer-based entity extraction for the drug and hospital lookups.
+
+Drug and city names come from plain-text gazetteers (gazetteers/drugs.txt,
+gazetteers/cities.txt). Each one is compiled into a token trie, so a message is
+matched in a single left-to-right pass, taking the longest name at the earliest
+position ("new york city" beats "new york"). When nothing matches exactly, a
+deletion index finds names within one typo of a message word ("advill",
+"tylenl"). Lookups only run for a recognized name, and they always use its
+canonical spelling, so "Panadol" and "paracetamol" share one cache entry.
+"""
+import os
+import re
+import threading
+
+GAZETTEER_DIR = os.environ.get("MEDIBOT_GAZETTEER_DIR",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteers"))
+# Names shorter than this are only matched exactly: too many short words are one edit
+# from a short name ("quite" -> Quito). Drug names rarely look like everyday words.
+MIN_FUZZY_LENGTH = {"drugs": 5, "cities": 6}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_END = None  # trie key that holds the canonical name of a complete entry
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def read_entries(path):
+    """Yields (alias, canonical) from `name` or `alias<TAB>canonical` lines, skipping blanks and # comments."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                alias, _, canonical = line.partition("\t")
+                yield alias.strip(), canonical.strip() or alias.strip()
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _one_edit(a, b):
+    """True if b is a with one letter inserted, deleted, replaced, or two neighbours swapped."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2]
+                                      and a[i + 2:] == b[i + 2:])
+
+
+class Gazetteer:
+    """Token trie of names (and aliases) -> canonical name, with a one-edit fallback for single words."""
+
+    def __init__(self, entries=(), min_fuzzy_length=6):
+        self.min_fuzzy_length = min_fuzzy_length
+        self.root = {}
+        self.size = 0
+        # word or word-minus-one-letter -> (word, canonical) of single-word entries
+        self._fuzzy = {}
+        for alias, canonical in entries:
+            self.add(alias, canonical)
+
+    def add(self, alias, canonical=None):
+        tokens = tokenize(alias)
+        if not tokens:
+            return
+        canonical = canonical or alias
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = canonical
+        if len(tokens) == 1 and len(tokens[0]) >= self.min_fuzzy_length:
+            for variant in _deletes(tokens[0]) | {tokens[0]}:
+                self._fuzzy.setdefault(variant, set()).add((tokens[0], canonical))
+
+    @classmethod
+    def load(cls, path, min_fuzzy_length=6):
+        return cls(read_entries(path), min_fuzzy_length)
+
+    def match(self, tokens):
+        """Returns the canonical name of the earliest, longest exact match in `tokens`, or None."""
+        for start in range(len(tokens)):
+            node = self.root
+            found = None
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                found = node.get(_END, found)
+            if found is not None:
+                return found
+        return None
+
+    def fuzzy_match(self, tokens):
+        """Returns the canonical name one edit away from a token, or None if there is none or it's ambiguous."""
+        for token in tokens:
+            if len(token) < self.min_fuzzy_length - 1:
+                continue
+            candidates = set()
+            for variant in _deletes(token) | {token}:
+                for word, canonical in self._fuzzy.get(variant, ()):
+                    # Typos rarely hit the first letter; requiring it keeps "chilly" from matching "philly"
+                    if word[0] == token[0] and _one_edit(word, token):
+                        candidates.add(canonical)
+            if len(candidates) == 1:
+                return candidates.pop()
+        return None
+
+    def find(self, text):
+        tokens = tokenize(text)
+        return self.match(tokens) or self.fuzzy_match(tokens)
+
+
+_gazetteers = {}
+_lock = threading.Lock()
+
+
+def gazetteer(name):
+    """Loads gazetteers/<name>.txt once per process."""
+    with _lock:
+        if name not in _gazetteers:
+            _gazetteers[name] = Gazetteer.load(os.path.join(GAZETTEER_DIR, f"{name}.txt"),
+                                               MIN_FUZZY_LENGTH.get(name, 6))
+        return _gazetteers[name]
+
+
+def find_drug(text):
+    """Canonical drug name mentioned in `text`, or None."""
+    return gazetteer("drugs").find(text)
+
+
+def find_city(text):
+    """Canonical city name mentioned in `text`, or None."""
+    return gazetteer("cities").find(text)
@@ -0,0 +1,152 @@
+"""
+Fused single-pass featurizer for serving.
+
+The training pipeline turns a message into a TF-IDF row in three passes:
+nltk.word_tokenize + lemmatize into a space-joined string, then
+TfidfVectorizer.transform re-tokenizes that string with its token_pattern,
+builds every n-gram as a new string and looks each one up in the vocabulary.
+
+FusedFeaturizer keeps NLTK's tokenizer, whose contraction and punctuation
+rules define the trained features, and does the rest in one pass. Each token
+goes through a table that maps it straight to the ids of the vocabulary words
+in its lemma. N-grams are looked up as tuples of those ids. The L2-normalized
+row is then built from the feature counts. Rows are identical to
+vectorizer.transform([preprocess_text(message)]).
+"""
+import re
+from functools import lru_cache
+import nltk
+import numpy as np
+import scipy.sparse as sp
+from model_bundle import vectorizer_settings
+from preprocessing import LEMMA_CACHE_SIZE, MESSAGE_CACHE_SIZE, lemmatize
+
+# Word id of a token that appears in no vocabulary term
+UNKNOWN = -1
+
+
+class FusedFeaturizer:
+    """
+    Raw message -> TF-IDF row for a fitted vocabulary and idf vector.
+
+    features(message) returns the message's feature indices, sorted and repeated
+    once per occurrence, which is also the message's intent-cache key.
+    transform_features() turns a list of those into a CSR matrix, and
+    transform(messages) does both.
+    """
+
+    def __init__(self, vocabulary, idf, lowercase=True, token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 1),
+                 norm="l2", sublinear_tf=False, binary=False, table_size=LEMMA_CACHE_SIZE,
+                 cache_size=MESSAGE_CACHE_SIZE):
+        if norm not in ("l1", "l2", None):
+            raise ValueError(f"Unsupported norm {norm!r}.")
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.lowercase = lowercase
+        self.token_pattern = re.compile(token_pattern)
+        self.min_n, self.max_n = ngram_range
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+        self.table_size = table_size
+
+        # Every word of a vocabulary term gets a small int id; unigram features are
+        # indexed by word id and longer n-grams are keyed by their tuple of word ids
+        self.word_ids = {}
+        ngrams = {}
+        for term, index in vocabulary.items():
+            ids = tuple(self.word_ids.setdefault(word, len(self.word_ids)) for word in term.split(" "))
+            ngrams[ids] = int(index)
+        self.unigrams = [UNKNOWN] * len(self.word_ids)
+        for ids, index in list(ngrams.items()):
+            if len(ids) == 1:
+                self.unigrams[ids[0]] = index
+                del ngrams[ids]
+        self.ngrams = ngrams
+        # Lowercased NLTK token -> word ids of the terms its lemma yields
+        self._table = {}
+        self.features = lru_cache(maxsize=cache_size)(self._features)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        """
+        Builds the featurizer for a fitted TfidfVectorizer or bundle vectorizer.
+        Raises ValueError for vectorizers without a vocabulary (e.g. hashed features)
+        or with settings the fused path doesn't reproduce.
+        """
+        return cls(vectorizer.vocabulary_, vectorizer.idf_, **vectorizer_settings(vectorizer))
+
+    def _word_ids(self, word):
+        lemma = lemmatize(word)
+        if self.lowercase:
+            lemma = lemma.lower()
+        ids = tuple(self.word_ids.get(term, UNKNOWN) for term in self.token_pattern.findall(lemma))
+        if len(self._table) < self.table_size:
+            self._table[word] = ids
+        return ids
+
+    def _features(self, message):
+        ids = []
+        table = self._table
+        for token in nltk.word_tokenize(message):
+            word = token.lower()
+            word_ids = table.get(word)
+            if word_ids is None:
+                word_ids = self._word_ids(word)
+            ids.extend(word_ids)
+
+        features = []
+        # Same n-gram sizes as sklearn's _word_ngrams
+        if self.min_n == 1:
+            unigrams = self.unigrams
+            features = [unigrams[i] for i in ids if i != UNKNOWN and unigrams[i] != UNKNOWN]
+        ngrams = self.ngrams
+        for n in range(max(self.min_n, 2), self.max_n + 1):
+            for key in zip(*(ids[k:] for k in range(n))):
+                index = ngrams.get(key)
+                if index is not None:
+                    features.append(index)
+        features.sort()
+        return tuple(features)
+
+    def transform_features(self, feature_lists):
+        """CSR matrix with one TF-IDF row per features() result."""
+        indptr = [0]
+        indices = []
+        counts = []
+        for features in feature_lists:
+            # Sorted, so repeats of a feature are adjacent
+            previous = None
+            for index in features:
+                if index == previous:
+                    counts[-1] += 1
+                else:
+                    indices.append(index)
+                    counts.append(1)
+                    previous = index
+            indptr.append(len(indices))
+
+        n_rows = len(indptr) - 1
+        indices = np.asarray(indices, dtype=np.int32)
+        indptr = np.asarray(indptr, dtype=np.int32)
+        values = np.asarray(counts, dtype=np.float64)
+        if self.binary:
+            values[:] = 1.0
+        elif self.sublinear_tf:
+            values = np.log(values) + 1.0
+        values *= self.idf[indices]
+
+        if self.norm is not None and len(values):
+            rows = np.repeat(np.arange(n_rows), np.diff(indptr))
+            weights = values * values if self.norm == "l2" else np.abs(values)
+            norms = np.bincount(rows, weights=weights, minlength=n_rows)
+            if self.norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0] = 1.0
+            values /= norms[rows]
+        return sp.csr_matrix((values, indices, indptr), shape=(n_rows, len(self.idf)))
+
+    def transform(self, messages):
+        return self.transform_features([self.features(message) for message in messages])
+
+    def cache_stats(self):
+        return {"message": self.features.cache_info()._asdict(), "table_size": len(self._table)}
@@ -0,0 +1,33 @@
+import gc
+import multiprocessing
+import os
+
+# Tunables (override with environment variables)
+bind = os.environ.get("MEDIBOT_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("MEDIBOT_WORKERS", multiprocessing.cpu_count()))
+# More threads than admission.py lets run at once (MEDIBOT_ADMISSION_LIMIT), so excess
+# requests wait in its bounded queue or get a fast 503 rather than queueing in gunicorn
+threads = int(os.environ.get("MEDIBOT_THREADS", 32))
+worker_class = "gthread"
+timeout = int(os.environ.get("MEDIBOT_WORKER_TIMEOUT", 30))
+keepalive = 5
+max_requests = int(os.environ.get("MEDIBOT_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Load the model once in the master so workers share it copy-on-write
+preload_app = True
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation, so the
+    # garbage collector in each worker never writes to (and un-shares) those pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    import app
+    import http_client
+    import integrations
+    # The preloaded clients were built for one process; each worker gets its share of the upstream rate limits
+    http_client.set_processes(server.cfg.workers)
+    integrations.configure_clients()
+    if app.MODEL_POLL_SECONDS > 0:
+        app.registry.start_watching(app.MODEL_POLL_SECONDS)
@@ -0,0 +1,93 @@
+"""
+Two-stage intent classifier for large tag sets (train.py --hierarchical).
+
+A first-stage model picks the intent family (symptoms, integrations, small
+talk, mental health, ...) and a per-family model picks the tag within it. Only
+the BEAM most likely families run their second stage, so the cost per message
+follows the number of families plus the size of a few families instead of the
+whole catalogue. predict_proba still returns one probability per tag, in the
+order of classes_, so the fallback tiers and suggestions work unchanged.
+"""
+import numpy as np
+
+# Tags whose family isn't the first word of the tag
+FAMILIES = {
+    "greeting": "small_talk", "goodbye": "small_talk", "thanks": "small_talk", "meta_bot": "small_talk",
+    "drug_lookup": "integrations", "hospital_search": "integrations", "pharmacy_inquiry": "integrations",
+    "mental_health": "mental_health", "mental_health_panic": "mental_health",
+}
+# Families whose tag model runs for each message
+BEAM = 2
+
+
+def family_of(tag):
+    """'symptom_flu' -> 'symptom'; tags listed in FAMILIES use their explicit family."""
+    return FAMILIES.get(tag, tag.split("_")[0])
+
+
+class HierarchicalModel:
+    """
+    P(tag) = P(family) * P(tag | family). Tags of families outside the beam get
+    an even share of their family's probability, so every row sums to 1.
+    """
+
+    def __init__(self, classes, families, family_model, tag_models, beam=BEAM):
+        self.classes_ = np.asarray(classes)
+        self.families = families            # tag -> family
+        self.family_model = family_model    # predicts family names
+        self.tag_models = tag_models        # family -> model over its tags, None for one-tag families
+        self.beam = beam
+        family_names = list(family_model.classes_)
+        self._family_index = np.array([family_names.index(families[tag]) for tag in self.classes_])
+        self._family_size = np.bincount(self._family_index, minlength=len(family_names))[self._family_index]
+        self._columns = [None if tag_models[family] is None
+                         else np.searchsorted(self.classes_, tag_models[family].classes_)
+                         for family in family_names]
+
+    def predict_proba(self, X):
+        family_probs = np.asarray(self.family_model.predict_proba(X))
+        proba = family_probs[:, self._family_index] / self._family_size
+        beam = min(self.beam, family_probs.shape[1])
+        top = np.argpartition(-family_probs, beam - 1, axis=1)[:, :beam]
+        # One call per selected family, for all the rows that selected it
+        for f in np.unique(top):
+            model = self.tag_models[self.family_model.classes_[f]]
+            if model is None:
+                continue
+            rows = np.flatnonzero((top == f).any(axis=1))
+            if len(rows) == len(proba):
+                # Every row (always the case for one message): skip the sparse row copy
+                proba[:, self._columns[f]] = family_probs[:, f, None] * model.predict_proba(X)
+            else:
+                proba[np.ix_(rows, self._columns[f])] = family_probs[rows, f, None] * model.predict_proba(X[rows])
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def score(self, X, y):
+        return float(np.mean(self.predict(X) == np.asarray(y)))
+
+    def map_stages(self, fn):
+        """Returns a copy with fn applied to every stage model, e.g. compiled_model.compile_model."""
+        tag_models = {family: None if model is None else fn(model) for family, model in self.tag_models.items()}
+        return HierarchicalModel(self.classes_, self.families, fn(self.family_model), tag_models, self.beam)
+
+
+def fit(X, tags, make_estimator, family=family_of, beam=BEAM):
+    """
+    Trains the family model and one model per multi-tag family with estimators
+    from make_estimator(). Raises ValueError if every tag is in the same family.
+    """
+    tags = np.asarray(tags)
+    families = {tag: family(tag) for tag in np.unique(tags)}
+    y_family = np.array([families[tag] for tag in tags])
+    if len(set(families.values())) < 2:
+        raise ValueError("A hierarchical model needs tags from at least two families.")
+    family_model = make_estimator().fit(X, y_family)
+    tag_models = {}
+    for name in family_model.classes_:
+        rows = np.flatnonzero(y_family == name)
+        members = np.unique(tags[rows])
+        tag_models[name] = make_estimator().fit(X[rows], tags[rows]) if len(members) > 1 else None
+    return HierarchicalModel(np.unique(tags), families, family_model, tag_models, beam)
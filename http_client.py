@@ -0,0 +1,337 @@
+import asyncio
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.environ.get("MEDIBOT_HTTP_CONNECT_TIMEOUT", 2.0))
+READ_TIMEOUT = float(os.environ.get("MEDIBOT_HTTP_READ_TIMEOUT", 4.0))
+RETRIES = int(os.environ.get("MEDIBOT_HTTP_RETRIES", 2))
+BACKOFF_FACTOR = 0.2
+POOL_SIZE = 20
+
+# Requests per second per upstream and process (0 = unlimited): openFDA allows
+# 240/min without an API key, Nominatim's usage policy 1/s
+RATE_LIMITS = {
+    "openfda": float(os.environ.get("MEDIBOT_RATE_LIMIT_OPENFDA", 4.0)),
+    "nominatim": float(os.environ.get("MEDIBOT_RATE_LIMIT_NOMINATIM", 1.0)),
+}
+# Server processes splitting RATE_LIMITS between them (see set_processes())
+_processes = 1
+# Longest a request queues for a token before failing fast
+RATE_LIMIT_WAIT = float(os.environ.get("MEDIBOT_RATE_LIMIT_WAIT", 2.0))
+
+# Upstream answers that count as "unhealthy" for retries and the circuit breaker
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# No attempt is started with less than this left before the caller's deadline
+MIN_ATTEMPT_TIME = 0.05
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class RateLimitedError(Exception):
+    """Raised instead of queueing longer than the rate limiter's max_wait for an upstream."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised instead of calling an upstream when the caller's deadline leaves no time for it."""
+
+
+def _time_for_attempt(deadline, pause=0.0):
+    """True if an attempt started after sleeping `pause` seconds still has MIN_ATTEMPT_TIME before `deadline`."""
+    return deadline is None or deadline - time.monotonic() - pause >= MIN_ATTEMPT_TIME
+
+
+def _cap_timeouts(connect, read, deadline):
+    """(connect, read) timeouts cut to the time left before `deadline`."""
+    if deadline is None:
+        return connect, read
+    left = max(deadline - time.monotonic(), MIN_ATTEMPT_TIME)
+    return min(connect, left), min(read, left)
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of `burst`.
+
+    Callers reserve a token and sleep until it is due, so waiting requests are
+    released in arrival order at the configured rate. A request that would wait
+    longer than `max_wait` is rejected instead.
+    """
+
+    def __init__(self, rate, burst=1, max_wait=RATE_LIMIT_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waited = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        Takes a token; returns the seconds to wait before using it, or None if that
+        exceeds max_wait (the bucket's own, or a shorter one for this call).
+        """
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if wait > max_wait:
+                self.rejected += 1
+                return None
+            # Negative tokens are the queue of callers already holding a reservation
+            self.tokens -= 1
+            if wait:
+                self.waited += 1
+            return wait
+
+    def _max_wait(self, deadline):
+        # A caller with a deadline waits only as long as still leaves time for the call
+        return None if deadline is None else deadline - time.monotonic() - MIN_ATTEMPT_TIME
+
+    def acquire(self, name, deadline=None):
+        wait = self.reserve(self._max_wait(deadline))
+        if wait is None:
+            raise RateLimitedError(f"{name} rate limit exceeded")
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, name, deadline=None):
+        wait = self.reserve(self._max_wait(deadline))
+        if wait is None:
+            raise RateLimitedError(f"{name} rate limit exceeded")
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        return {"rate": self.rate, "burst": self.burst, "waited": self.waited, "rejected": self.rejected}
+
+
+def set_processes(count):
+    """
+    Splits each RATE_LIMITS rate evenly between `count` server processes, so
+    together they stay within the API's limit. Affects limiters created afterwards.
+    """
+    global _processes
+    _processes = max(1, count)
+
+
+def default_limiter(name):
+    rate = RATE_LIMITS.get(name, 0) / _processes
+    return TokenBucket(rate) if rate > 0 else None
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast for `reset_timeout` seconds. Then a single probe is let through;
+    its success closes the circuit, its failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Gives back a half-open probe that was allowed but never sent, so the next call can probe."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """
+    Keep-alive session for one upstream API with timeouts, bounded retries, a circuit
+    breaker and a token-bucket rate limiter (limiter=False disables the default one).
+    """
+
+    def __init__(self, name, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE, breaker=None, limiter=None):
+        self.name = name
+        self.connect_timeout = CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self.read_timeout = READ_TIMEOUT if read_timeout is None else read_timeout
+        self.breaker = breaker if breaker is not None else CircuitBreaker(name)
+        self.limiter = default_limiter(name) if limiter is None else limiter or None
+
+        self.retries = RETRIES if retries is None else retries
+        self.backoff_factor = backoff_factor
+        # Retries are done in get(), where they can respect the caller's deadline
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, deadline=None, **kwargs):
+        """
+        GETs `url` through the pooled session, retrying connection errors, timeouts and
+        429/5xx answers with exponential backoff. A `deadline` (time.monotonic() value)
+        bounds the whole call: each attempt's timeouts are cut to the time left, and
+        no retry is started that couldn't run before it.
+
+        Raises CircuitOpenError when failing fast, RateLimitedError when the rate
+        limiter's queue is too long, DeadlineExceededError when there's no time left
+        to call at all, and requests.HTTPError / requests.RequestException when the
+        upstream still fails after the retries.
+        """
+        if not _time_for_attempt(deadline):
+            raise DeadlineExceededError(f"{self.name} call skipped, the request deadline has passed")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if self.limiter is not None:
+            try:
+                self.limiter.acquire(self.name, deadline)
+            except RateLimitedError:
+                self.breaker.release_probe()
+                raise
+
+        response = error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                pause = self.backoff_factor * (2 ** (attempt - 1))
+                if not _time_for_attempt(deadline, pause):
+                    break
+                time.sleep(pause)
+            try:
+                response = self.session.get(
+                    url, timeout=_cap_timeouts(self.connect_timeout, self.read_timeout, deadline), **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+                continue
+            except requests.RequestException:
+                self.breaker.record_failure()
+                raise
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+
+        self.breaker.record_failure()
+        if response is None:
+            raise error
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """
+    asyncio counterpart of UpstreamClient built on httpx.AsyncClient.
+
+    Pass the sync client's breaker and limiter so both serving modes share one view
+    of the upstream's health and rate. The httpx client is created lazily inside the
+    running event loop and should be closed with aclose() on shutdown.
+    """
+
+    def __init__(self, name, connect_timeout=None, read_timeout=None, retries=None,
+                 backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE, breaker=None, limiter=None):
+        self.name = name
+        self.connect_timeout = CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        self.read_timeout = READ_TIMEOUT if read_timeout is None else read_timeout
+        self.retries = RETRIES if retries is None else retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.breaker = breaker if breaker is not None else CircuitBreaker(name)
+        self.limiter = default_limiter(name) if limiter is None else limiter or None
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return self._client
+
+    async def get(self, url, deadline=None, **kwargs):
+        """Async GET with the same retry, timeout, deadline and circuit breaker rules as UpstreamClient.get()."""
+        import httpx
+
+        if not _time_for_attempt(deadline):
+            raise DeadlineExceededError(f"{self.name} call skipped, the request deadline has passed")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if self.limiter is not None:
+            try:
+                await self.limiter.acquire_async(self.name, deadline)
+            except RateLimitedError:
+                self.breaker.release_probe()
+                raise
+
+        client = self._get_client()
+        response = error = None
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    pause = self.backoff_factor * (2 ** (attempt - 1))
+                    if not _time_for_attempt(deadline, pause):
+                        break
+                    await asyncio.sleep(pause)
+                connect, read = _cap_timeouts(self.connect_timeout, self.read_timeout, deadline)
+                try:
+                    response = await client.get(url, timeout=httpx.Timeout(read, connect=connect), **kwargs)
+                except httpx.TransportError as e:
+                    response, error = None, e
+                    continue
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+            if response is None:
+                raise error
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            # A cancelled call (the client went away) has no verdict, but must not keep the half-open probe
+            self.breaker.release_probe()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
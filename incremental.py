@@ -0,0 +1,163 @@
+"""
+Incremental training for train.py --incremental.
+
+Preprocessed patterns are cached on disk by content hash, features come from a
+stateless HashingVectorizer (adding patterns never moves a feature index), and
+an SGDClassifier(loss='log_loss') is updated with partial_fit on just the added
+patterns plus a proportional replay sample of old ones, so an update costs time
+in proportion to the diff rather than the whole catalogue.
+"""
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from preprocessing import preprocess_many
+
+CACHE_DIR = ".train_cache"
+PATTERN_CACHE = os.path.join(CACHE_DIR, "preprocessed.json")
+STATE_FILE = os.path.join(CACHE_DIR, "incremental_state.pkl")
+
+# Bump when preprocess_text changes so cached outputs are recomputed
+PREPROCESS_VERSION = 1
+
+N_FEATURES = 2 ** 17
+NGRAM_RANGE = (1, 2)
+ALPHA = 1e-4
+FULL_EPOCHS = 30
+UPDATE_EPOCHS = 10
+# Old patterns replayed per added pattern, so updates don't drift away from existing intents
+REPLAY_RATIO = 4
+
+
+def content_hash(*parts):
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class PatternCache:
+    """Preprocessed text per pattern, keyed by a hash of the raw pattern."""
+
+    def __init__(self, path=PATTERN_CACHE):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") == PREPROCESS_VERSION:
+                self.entries = saved["entries"]
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def preprocess_many(self, patterns, jobs=1):
+        """Preprocessed `patterns`, in order, running the cache misses in `jobs` processes."""
+        keys = [content_hash(pattern) for pattern in patterns]
+        missing = {}
+        for key, pattern in zip(keys, patterns):
+            if key not in self.entries and key not in missing:
+                missing[key] = pattern
+        self.misses += len(missing)
+        self.hits += len(patterns) - len(missing)
+        if missing:
+            self.entries.update(zip(missing, preprocess_many(missing.values(), jobs)))
+            self._dirty = True
+        return [self.entries[key] for key in keys]
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": PREPROCESS_VERSION, "entries": self.entries}, f)
+        os.replace(self.path + ".tmp", self.path)
+        self._dirty = False
+
+
+def make_vectorizer():
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=NGRAM_RANGE, alternate_sign=False, norm="l2")
+
+
+def settings():
+    return {"n_features": N_FEATURES, "ngram_range": list(NGRAM_RANGE), "alpha": ALPHA,
+            "preprocess_version": PREPROCESS_VERSION}
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def fit_full(samples, vectorizer, seed=0):
+    """Trains a fresh SGD model on every (processed, tag) sample."""
+    texts, tags = zip(*samples.values())
+    model = SGDClassifier(loss="log_loss", alpha=ALPHA, max_iter=FULL_EPOCHS, tol=None, random_state=seed)
+    model.fit(vectorizer.transform(texts), np.asarray(tags))
+    return model
+
+
+def fit_update(model, samples, added, vectorizer, seed=0):
+    """Continues training on the added samples plus REPLAY_RATIO old samples for each."""
+    rng = np.random.default_rng(seed)
+    old = sorted(key for key in samples if key not in added)
+    replay = rng.choice(old, size=min(len(old), REPLAY_RATIO * len(added)), replace=False).tolist() if old else []
+    keys = sorted(added) + replay
+    X = vectorizer.transform([samples[key][0] for key in keys])
+    y = np.asarray([samples[key][1] for key in keys])
+    # All epochs in one partial_fit call: per-call setup is O(n_features * n_classes)
+    order = np.concatenate([rng.permutation(len(keys)) for _ in range(UPDATE_EPOCHS)])
+    model.partial_fit(X[order], y[order])
+    return model
+
+
+def train(patterns, tags, state=None, seed=0):
+    """
+    Brings the model in `state` up to date with the preprocessed `patterns` and their `tags`.
+    Returns (model, vectorizer, new_state, report). Removed patterns, new intents
+    or changed settings can't be applied with partial_fit, so they trigger a full refit.
+    """
+    samples = {content_hash(tag, processed): (processed, tag) for processed, tag in zip(patterns, tags)}
+    vectorizer = make_vectorizer()
+    trained = set(state["trained"]) if state else set()
+    added = set(samples) - trained
+    removed = trained - set(samples)
+    classes = sorted(set(tags))
+
+    if state is None:
+        reason = "no previous incremental state"
+    elif state["settings"] != settings():
+        reason = "training settings changed"
+    elif removed:
+        reason = f"{len(removed)} pattern(s) removed or relabeled"
+    elif classes != state["classes"]:
+        reason = "intents added or removed"
+    else:
+        reason = None
+
+    if reason is not None:
+        model = fit_full(samples, vectorizer, seed)
+        trained_on = len(samples)
+    elif added:
+        model = fit_update(state["model"], samples, added, vectorizer, seed)
+        trained_on = min(len(samples), len(added) * (REPLAY_RATIO + 1))
+    else:
+        model = state["model"]
+        trained_on = 0
+
+    new_state = {"model": model, "trained": sorted(samples), "classes": classes, "settings": settings()}
+    report = {"mode": "full" if reason else "update", "reason": reason, "added": len(added),
+              "removed": len(removed), "trained_on": trained_on}
+    return model, vectorizer, new_state, report
@@ -1,70 +1,252 @@
-import requests
+import os
+import admission
+from cache import TTLCache, MemoryBackend, SQLiteBackend, normalize_key
+from http_client import (UpstreamClient, AsyncUpstreamClient, CircuitOpenError, DeadlineExceededError,
+                         RateLimitedError)
+from local_index import LOCAL_DATA, LocalIndex
+import metrics
+
+# Overridable so tests can point the integrations at a local stub server
+OPENFDA_URL = os.environ.get("MEDIBOT_OPENFDA_URL", "https://api.fda.gov/drug/label.json")
+NOMINATIM_URL = os.environ.get("MEDIBOT_NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+
+def _default_backend():
+    # Set MEDIBOT_CACHE_PATH to keep lookups across restarts in SQLite
+    path = os.environ.get("MEDIBOT_CACHE_PATH")
+    return SQLiteBackend(path) if path else MemoryBackend()
+
+_cache_backend = _default_backend()
+_cache_ttl = int(os.environ.get("MEDIBOT_CACHE_TTL", 6 * 3600))
+drug_cache = TTLCache("openfda", _cache_backend, ttl=_cache_ttl)
+hospital_cache = TTLCache("nominatim", _cache_backend, ttl=_cache_ttl)
+
+# "live": always ask the APIs; "local": only the local index (see local_index.py);
+# "local+live": the local index first, the APIs for names it doesn't know
+DATA_MODES = ("live", "local", "local+live")
+
+def _open_local_index(path, mode):
+    if mode not in DATA_MODES:
+        raise ValueError(f"MEDIBOT_DATA_MODE must be one of {DATA_MODES}, not {mode!r}.")
+    if mode == "live":
+        return None
+    if not os.path.exists(path):
+        if mode == "local":
+            print(f"Local data mode, but '{path}' doesn't exist; every lookup will come back not found.")
+        return None
+    return LocalIndex(path)
+
+data_mode = os.environ.get("MEDIBOT_DATA_MODE", "local+live")
+local_index = _open_local_index(os.environ.get("MEDIBOT_LOCAL_DATA", LOCAL_DATA), data_mode)
+
+def configure_local_index(path=LOCAL_DATA, mode="local+live"):
+    """Switches the data mode, e.g. configure_local_index('fixtures.db', 'local')."""
+    global data_mode, local_index
+    index = _open_local_index(path, mode)
+    if local_index is not None:
+        local_index.close()
+    data_mode, local_index = mode, index
+
+@metrics.timed_integration("local")
+def lookup_local(kind, key):
+    return local_index.drug_info(key) if kind == "drugs" else local_index.hospitals(key)
+
+def _local_answer(kind, key):
+    """The local index's result, or None when the live API should be asked instead."""
+    if data_mode == "live":
+        return None
+    if local_index is None:
+        # No index file: nothing was looked up, so nothing is timed as "local"
+        return {"found": False} if data_mode == "local" else None
+    info = lookup_local(kind, key)
+    if info["found"] or data_mode == "local":
+        return info
+    return None
+
+def configure_cache(backend=None, **ttl_settings):
+    """
+    Replaces the lookup caches, e.g. configure_cache(SQLiteBackend('cache.db'), ttl=600).
+    Accepts the TTLCache keyword arguments ttl, negative_ttl and stale_ttl.
+    """
+    global drug_cache, hospital_cache
+    backend = backend if backend is not None else MemoryBackend()
+    drug_cache = TTLCache("openfda", backend, **ttl_settings)
+    hospital_cache = TTLCache("nominatim", backend, **ttl_settings)
+
+# One keep-alive connection pool, circuit breaker and rate limiter per upstream.
+# The async clients (used by asgi.py) share the breakers and limiters with the sync ones.
+openfda_client = UpstreamClient("openfda")
+nominatim_client = UpstreamClient("nominatim")
+openfda_async_client = AsyncUpstreamClient("openfda", breaker=openfda_client.breaker,
+                                           limiter=openfda_client.limiter or False)
+nominatim_async_client = AsyncUpstreamClient("nominatim", breaker=nominatim_client.breaker,
+                                             limiter=nominatim_client.limiter or False)
+
+def configure_clients(**client_settings):
+    """
+    Replaces both upstream clients, e.g. configure_clients(read_timeout=1.0, retries=0).
+    Accepts the UpstreamClient keyword arguments.
+    """
+    global openfda_client, nominatim_client, openfda_async_client, nominatim_async_client
+    openfda_client.close()
+    nominatim_client.close()
+    openfda_client = UpstreamClient("openfda", **client_settings)
+    nominatim_client = UpstreamClient("nominatim", **client_settings)
+    client_settings.pop("breaker", None)
+    client_settings.pop("limiter", None)
+    openfda_async_client = AsyncUpstreamClient("openfda", breaker=openfda_client.breaker,
+                                               limiter=openfda_client.limiter or False, **client_settings)
+    nominatim_async_client = AsyncUpstreamClient("nominatim", breaker=nominatim_client.breaker,
+                                                 limiter=nominatim_client.limiter or False, **client_settings)
+
+async def close_async_clients():
+    await openfda_async_client.aclose()
+    await nominatim_async_client.aclose()
+
+def cache_stats():
+    stats = {"openfda": drug_cache.stats(), "nominatim": hospital_cache.stats(), "data_mode": data_mode}
+    for client in (openfda_client, nominatim_client):
+        if client.limiter is not None:
+            stats[client.name]["rate_limit"] = client.limiter.stats()
+    if local_index is not None:
+        stats["local_index"] = local_index.stats()
+    return stats
 
 def get_drug_info(drug_name):
     """
-    Fetches drug information from OpenFDA API.
+    Fetches drug information from the local index or OpenFDA API, cached by normalized drug name.
     """
-    base_url = "https://api.fda.gov/drug/label.json"
-    query = f'search=openfda.brand_name:"{drug_name}"&limit=1'
-    
-    try:
-        response = requests.get(f"{base_url}?{query}")
-        data = response.json()
-        
-        if "results" in data and len(data["results"]) > 0:
-            result = data["results"][0]
-            
-            # Extract relevant info
-            purpose = result.get('purpose', ['Information not available'])[0]
-            warnings = result.get('warnings', ['No specific warnings found'])[0]
-            
-            # Truncate if too long (simple approach)
-            if len(warnings) > 300:
-                warnings = warnings[:300] + "..."
-                
-            return {
-                "found": True,
-                "name": drug_name,
-                "purpose": purpose,
-                "warnings": warnings
-            }
-        else:
-            return {"found": False}
-    except Exception as e:
-        print(f"Error fetching drug info: {e}")
-        return {"found": False, "error": str(e)}
+    key = normalize_key(drug_name)
+    info = _local_answer("drugs", key) or drug_cache.get_or_fetch(key, lambda: fetch_drug_info(key))
+    if info["found"]:
+        info = dict(info, name=drug_name)
+    return info
 
 def get_hospitals(city):
     """
-    Fetches hospital information for a given city using OpenStreetMap (Nominatim).
+    Fetches hospitals for a city from the local index or OpenStreetMap (Nominatim), cached by normalized city.
+    """
+    key = normalize_key(city)
+    return _local_answer("hospitals", key) or hospital_cache.get_or_fetch(key, lambda: fetch_hospitals(key))
+
+async def get_drug_info_async(drug_name):
+    """
+    asyncio version of get_drug_info(), sharing its cache.
+    """
+    key = normalize_key(drug_name)
+    # Local lookups take microseconds, so they run inline on the event loop
+    info = _local_answer("drugs", key) or await drug_cache.get_or_fetch_async(key, lambda: fetch_drug_info_async(key))
+    if info["found"]:
+        info = dict(info, name=drug_name)
+    return info
+
+async def get_hospitals_async(city):
     """
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
+    asyncio version of get_hospitals(), sharing its cache.
+    """
+    key = normalize_key(city)
+    return _local_answer("hospitals", key) or await hospital_cache.get_or_fetch_async(
+        key, lambda: fetch_hospitals_async(key))
+
+def drug_query_url(drug_name):
+    return f'{OPENFDA_URL}?search=openfda.brand_name:"{drug_name}"&limit=1'
+
+def hospital_query_params(city):
+    return {
         "q": f"hospitals in {city}",
         "format": "json",
         "limit": 3,
         "addressdetails": 1
     }
-    headers = {
-        "User-Agent": "MediBot/1.0"
-    }
 
+HOSPITAL_HEADERS = {
+    "User-Agent": "MediBot/1.0"
+}
+
+def parse_drug_label(data, drug_name):
+    """Builds the drug info dict from an OpenFDA label.json response."""
+    if "results" in data and len(data["results"]) > 0:
+        result = data["results"][0]
+
+        # Extract relevant info; some labels carry the field as an empty list
+        purpose = (result.get('purpose') or ['Information not available'])[0]
+        warnings = (result.get('warnings') or ['No specific warnings found'])[0]
+
+        # Truncate if too long (simple approach)
+        if len(warnings) > 300:
+            warnings = warnings[:300] + "..."
+
+        return {
+            "found": True,
+            "name": drug_name,
+            "purpose": purpose,
+            "warnings": warnings
+        }
+    else:
+        return {"found": False}
+
+def parse_hospitals(data):
+    """Builds the hospitals dict from a Nominatim search response."""
+    if not data:
+        return {"found": False}
+
+    hospitals = []
+    for place in data:
+        name = place.get('display_name', 'Unknown Hospital').split(',')[0]
+        lat = place.get('lat')
+        lon = place.get('lon')
+        hospitals.append({"name": name, "lat": lat, "lon": lon})
+
+    return {"found": True, "hospitals": hospitals}
+
+@metrics.timed_integration("openfda")
+def fetch_drug_info(drug_name):
+    """
+    Fetches drug information from OpenFDA API.
+    """
     try:
-        response = requests.get(url, params=params, headers=headers)
-        data = response.json()
-        
-        if not data:
-            return {"found": False}
-
-        hospitals = []
-        for place in data:
-            name = place.get('display_name', 'Unknown Hospital').split(',')[0]
-            lat = place.get('lat')
-            lon = place.get('lon')
-            hospitals.append({"name": name, "lat": lat, "lon": lon})
-            
-        return {"found": True, "hospitals": hospitals}
-        
+        # Retries and timeouts stay within the admitted request's deadline
+        response = openfda_client.get(drug_query_url(drug_name), deadline=admission.current_deadline())
+        return parse_drug_label(response.json(), drug_name)
+    except (CircuitOpenError, RateLimitedError, DeadlineExceededError) as e:
+        return {"found": False, "error": str(e)}
+    except Exception as e:
+        print(f"Error fetching drug info: {e}")
+        return {"found": False, "error": str(e)}
+
+@metrics.timed_integration("nominatim")
+def fetch_hospitals(city):
+    """
+    Fetches hospital information for a given city using OpenStreetMap (Nominatim).
+    """
+    try:
+        response = nominatim_client.get(NOMINATIM_URL, params=hospital_query_params(city), headers=HOSPITAL_HEADERS,
+                                        deadline=admission.current_deadline())
+        return parse_hospitals(response.json())
+    except (CircuitOpenError, RateLimitedError, DeadlineExceededError) as e:
+        return {"found": False, "error": str(e)}
+    except Exception as e:
+        print(f"Error fetching hospital info: {e}")
+        return {"found": False, "error": str(e)}
+
+@metrics.timed_integration("openfda")
+async def fetch_drug_info_async(drug_name):
+    try:
+        response = await openfda_async_client.get(drug_query_url(drug_name), deadline=admission.current_deadline())
+        return parse_drug_label(response.json(), drug_name)
+    except (CircuitOpenError, RateLimitedError, DeadlineExceededError) as e:
+        return {"found": False, "error": str(e)}
+    except Exception as e:
+        print(f"Error fetching drug info: {e}")
+        return {"found": False, "error": str(e)}
+
+@metrics.timed_integration("nominatim")
+async def fetch_hospitals_async(city):
+    try:
+        response = await nominatim_async_client.get(NOMINATIM_URL, params=hospital_query_params(city), headers=HOSPITAL_HEADERS,
+                                                    deadline=admission.current_deadline())
+        return parse_hospitals(response.json())
+    except (CircuitOpenError, RateLimitedError, DeadlineExceededError) as e:
+        return {"found": False, "error": str(e)}
     except Exception as e:
         print(f"Error fetching hospital info: {e}")
         return {"found": False, "error": str(e)}
@@ -73,3 +255,4 @@ if __name__ == "__main__":
     # Simple test
     print(get_drug_info("Advil"))
     print(get_hospitals("San Francisco"))
+    print(cache_stats())
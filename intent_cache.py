@@ -0,0 +1,119 @@
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from knowledge_base import INTENTS_SOURCE, iter_intents
+from preprocessing import preprocess_text
+
+RUNTIME_CACHE_SIZE = int(os.environ.get("MEDIBOT_INTENT_CACHE_SIZE", 10000))
+# Upper bound on pinned training patterns, so huge catalogues don't grow every worker
+PRECOMPUTED_LIMIT = int(os.environ.get("MEDIBOT_INTENT_CACHE_PATTERNS", 20000))
+WARM_CHUNK = 1000
+
+
+def iter_patterns(source=INTENTS_SOURCE):
+    """Yields every training pattern in the intents catalogue; nothing if it is missing."""
+    try:
+        for intent in iter_intents(source):
+            yield from intent["patterns"]
+    except FileNotFoundError:
+        return
+
+
+def load_patterns(source=INTENTS_SOURCE):
+    """Returns every training pattern in the intents catalogue, or [] if it is missing."""
+    return list(iter_patterns(source))
+
+
+class IntentCache:
+    """
+    Top-k classifier output per distinct feature set, for one model generation.
+
+    Messages are keyed by the vectorizer terms their preprocessed text produces
+    (out-of-vocabulary tokens dropped, order ignored), so any two messages with
+    the same key get exactly the same TF-IDF row and probabilities. With a fused
+    featurizer the preprocessed form already is that key, as feature indices.
+    Training patterns are scored once at load time and never evicted; other
+    messages go through a bounded LRU that is filled on first sight.
+    """
+
+    def __init__(self, model, vectorizer, max_entries=RUNTIME_CACHE_SIZE, featurizer=None):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.featurizer = featurizer
+        self.max_entries = max_entries
+        self._analyze = vectorizer.build_analyzer()
+        # HashingVectorizer has no vocabulary; every term then counts
+        self._vocabulary = getattr(vectorizer, "vocabulary_", None)
+        self._precomputed = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"precomputed": 0, "runtime": 0}
+        self.misses = 0
+
+    def key(self, processed):
+        if self.featurizer is not None:
+            return processed
+        terms = self._analyze(processed)
+        if self._vocabulary is not None:
+            terms = [term for term in terms if term in self._vocabulary]
+        return tuple(sorted(terms))
+
+    def get(self, key):
+        """Returns (top_tags, top_probs) for a key, or None."""
+        value = self._precomputed.get(key)
+        if value is not None:
+            self.hits["precomputed"] += 1
+            return value
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits["runtime"] += 1
+            return value
+
+    def put(self, key, top_tags, top_probs):
+        if self.max_entries <= 0:
+            return
+        value = (tuple(str(tag) for tag in top_tags), tuple(float(p) for p in top_probs))
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def warm(self, messages, top_k, limit=PRECOMPUTED_LIMIT):
+        """
+        Scores up to `limit` messages in chunks and pins their results.
+        `top_k(probabilities)` -> (indices, probs).
+        """
+        messages = iter(messages)
+        remaining = limit
+        while remaining > 0:
+            chunk = list(itertools.islice(messages, min(WARM_CHUNK, remaining)))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            if self.featurizer is not None:
+                processed = [self.featurizer.features(message) for message in chunk]
+                X = self.featurizer.transform_features(processed)
+            else:
+                processed = [preprocess_text(message) for message in chunk]
+                X = self.vectorizer.transform(processed)
+            probabilities = self.model.predict_proba(X)
+            top_indices, top_probs = top_k(probabilities)
+            top_tags = self.model.classes_[top_indices]
+            for text, tags, probs in zip(processed, top_tags, top_probs):
+                self._precomputed[self.key(text)] = (tuple(str(tag) for tag in tags), tuple(float(p) for p in probs))
+
+    def stats(self):
+        lookups = self.hits["precomputed"] + self.hits["runtime"] + self.misses
+        return {
+            "precomputed_size": len(self._precomputed),
+            "runtime_size": len(self._entries),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_ratio": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
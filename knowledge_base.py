@@ -0,0 +1,178 @@
+"""
+Intents catalogue I/O for large knowledge bases.
+
+Sources can be the classic intents.json, JSON Lines (one intent object per
+line) or a directory of per-intent .json/.jsonl files; iter_intents() streams
+them one intent at a time. Responses are written to an indexed SQLite file
+that servers read lazily by tag, so a worker only holds the responses of
+recently answered intents, however large the catalogue grows.
+
+    python knowledge_base.py intents.json intents.jsonl   # convert to JSON Lines
+    python knowledge_base.py intents.json intents/        # one file per intent
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+INTENTS_SOURCE = os.environ.get("MEDIBOT_INTENTS", "intents.json")
+RESPONSES_DB = "responses.db"
+# Tags whose responses each process keeps in memory
+HOT_TAGS = 256
+
+
+def _iter_file(path):
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"{path}:{line_number}: {e}") from None
+        return
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    # intents.json layout, a list of intents, or a single intent
+    if isinstance(data, dict) and "intents" in data:
+        yield from data["intents"]
+    elif isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+
+def iter_intents(source=INTENTS_SOURCE):
+    """Yields {"tag", "patterns", "responses"} dicts from a file or a directory of files, in a stable order."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith((".json", ".jsonl")):
+                yield from _iter_file(os.path.join(source, name))
+    else:
+        yield from _iter_file(source)
+
+
+class ResponseStore:
+    """
+    Read-only, dict-like view of the responses in a SQLite file built by build_store().
+    Supports tag_map.get(tag, default), `tag in tag_map` and len(); recently used
+    tags are kept in a small LRU.
+    """
+
+    def __init__(self, path, hot_tags=HOT_TAGS):
+        self.path = path
+        self.hot_tags = hot_tags
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._db  # fail fast if the file is missing
+
+    @property
+    def _db(self):
+        # SQLite connections must not cross fork(); each worker process opens its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            uri = "file:" + os.path.abspath(self.path) + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
+
+    def get(self, tag, default=None):
+        with self._lock:
+            responses = self._hot.get(tag)
+            if responses is not None:
+                self._hot.move_to_end(tag)
+                return responses
+            rows = self._db.execute(
+                "SELECT text FROM responses WHERE tag = ? ORDER BY position", (tag,)
+            ).fetchall()
+            if not rows:
+                return default
+            responses = [text for text, in rows]
+            self._hot[tag] = responses
+            while len(self._hot) > self.hot_tags:
+                self._hot.popitem(last=False)
+            return responses
+
+    def __getitem__(self, tag):
+        responses = self.get(tag)
+        if responses is None:
+            raise KeyError(tag)
+        return responses
+
+    def __contains__(self, tag):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM intents WHERE tag = ?", (tag,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+
+    def __iter__(self):
+        with self._lock:
+            tags = [tag for tag, in self._db.execute("SELECT tag FROM intents ORDER BY tag")]
+        return iter(tags)
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def build_store(intents, path=RESPONSES_DB):
+    """
+    Writes the responses of an iterable of intents to a new SQLite file and
+    atomically replaces `path`, so readers never see a half-built store.
+    Returns the number of intents written.
+    """
+    staging = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(staging):
+        os.remove(staging)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute("CREATE TABLE intents (tag TEXT PRIMARY KEY, n_responses INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE responses (tag TEXT NOT NULL, position INTEGER NOT NULL, text TEXT NOT NULL,"
+                     " PRIMARY KEY (tag, position)) WITHOUT ROWID")
+        count = 0
+        for intent in intents:
+            responses = intent.get("responses", [])
+            # A tag spread over several files keeps appending responses
+            offset = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM responses WHERE tag = ?",
+                                  (intent["tag"],)).fetchone()[0]
+            conn.executemany("INSERT INTO responses (tag, position, text) VALUES (?, ?, ?)",
+                             [(intent["tag"], offset + i, text) for i, text in enumerate(responses)])
+            conn.execute("INSERT INTO intents (tag, n_responses) VALUES (?, ?) "
+                         "ON CONFLICT(tag) DO UPDATE SET n_responses = n_responses + excluded.n_responses",
+                         (intent["tag"], len(responses)))
+            count += 1
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(staging, path)
+    return count
+
+
+def convert(source, destination):
+    """Rewrites a catalogue as JSON Lines (destination ending in .jsonl) or a directory of per-intent files."""
+    if destination.endswith(".jsonl"):
+        with open(destination, "w", encoding="utf-8") as f:
+            for intent in iter_intents(source):
+                f.write(json.dumps(intent, ensure_ascii=False) + "\n")
+        return
+    os.makedirs(destination, exist_ok=True)
+    for intent in iter_intents(source):
+        filename = re.sub(r"[^\w.-]", "_", intent["tag"]) + ".json"
+        with open(os.path.join(destination, filename), "w", encoding="utf-8") as f:
+            json.dump(intent, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,238 @@
+"""
+Offline drug-label and hospital index for the integrations (MEDIBOT_DATA_MODE).
+
+Build it from an openFDA drug label bulk download and an OpenStreetMap extract:
+
+    python local_index.py --drugs drug-label-0001-of-0013.json.zip ... --osm hospitals.osm --output local_data.db
+
+Drug labels are indexed by every brand and generic name. Hospitals are indexed
+by city and by position; city centres come from the extract's place nodes.
+get_drug_info()/get_hospitals() then answer from the SQLite file in
+microseconds, with the same result dicts as the live APIs.
+
+OSM input can be XML (.osm, nodes only) or Overpass API JSON (`out center;`,
+which also covers hospitals mapped as buildings).
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+
+LOCAL_DATA = "local_data.db"
+HOSPITAL_LIMIT = 3
+# Hospitals within this distance of a city centre count as "in" it
+CITY_RADIUS_KM = 15
+KM_PER_DEGREE = 111.2
+
+
+def _normalize(text):
+    # Same as cache.normalize_key, so local and cached lookups agree on names
+    return ' '.join(text.lower().split())
+
+
+def _read_json(path):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith(".json"):
+                    with archive.open(member) as f:
+                        yield json.load(f)
+        return
+    with open(path, encoding="utf-8") as f:
+        yield json.load(f)
+
+
+def iter_drug_labels(paths):
+    """Yields label dicts from openFDA drug label bulk files (.json or .json.zip)."""
+    for path in paths:
+        for data in _read_json(path):
+            yield from data.get("results", [])
+
+
+def _is_hospital(tags):
+    return (tags.get("amenity") == "hospital" or tags.get("healthcare") == "hospital") and tags.get("name")
+
+
+def _is_place(tags):
+    return tags.get("place") in ("city", "town") and tags.get("name")
+
+
+def iter_osm_elements(paths):
+    """Yields (tags, lat, lon) for tagged OSM nodes (XML) or elements (Overpass JSON)."""
+    for path in paths:
+        if path.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                elements = json.load(f).get("elements", [])
+            for element in elements:
+                position = element.get("center") or element
+                if "lat" in position and element.get("tags"):
+                    yield element["tags"], float(position["lat"]), float(position["lon"])
+            continue
+        for _, element in ET.iterparse(path):
+            if element.tag == "node":
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                if tags:
+                    yield tags, float(element.get("lat")), float(element.get("lon"))
+            if element.tag in ("node", "way", "relation"):
+                element.clear()
+
+
+def build_index(drug_files=(), osm_files=(), path=LOCAL_DATA):
+    """
+    Writes a new index from the given dumps and atomically replaces `path`.
+    Returns {"labels", "drug_names", "hospitals", "places"} counts.
+    """
+    # Shared with the live path, so both produce identical result dicts
+    from integrations import parse_drug_label
+
+    staging = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(staging):
+        os.remove(staging)
+    conn = sqlite3.connect(staging)
+    try:
+        conn.execute("CREATE TABLE labels (id INTEGER PRIMARY KEY, purpose TEXT NOT NULL, warnings TEXT NOT NULL)")
+        conn.execute("CREATE TABLE drug_names (name TEXT PRIMARY KEY, label_id INTEGER NOT NULL,"
+                     " priority INTEGER NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE places (name TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE hospitals (id INTEGER PRIMARY KEY, name TEXT NOT NULL, lat REAL NOT NULL,"
+                     " lon REAL NOT NULL, city TEXT)")
+
+        counts = {"labels": 0, "hospitals": 0, "places": 0}
+        for label in iter_drug_labels(drug_files):
+            openfda = label.get("openfda", {})
+            # A brand name beats another label's generic name; otherwise the first label wins
+            names = [(name, 0) for name in openfda.get("brand_name", [])]
+            names += [(name, 1) for name in openfda.get("generic_name", [])]
+            if not names:
+                continue
+            info = parse_drug_label({"results": [label]}, None)
+            label_id = conn.execute("INSERT INTO labels (purpose, warnings) VALUES (?, ?)",
+                                    (info["purpose"], info["warnings"])).lastrowid
+            conn.executemany(
+                "INSERT INTO drug_names (name, label_id, priority) VALUES (?, ?, ?) ON CONFLICT(name) DO UPDATE"
+                " SET label_id = excluded.label_id, priority = excluded.priority"
+                " WHERE excluded.priority < drug_names.priority",
+                [(_normalize(name), label_id, priority) for name, priority in names])
+            counts["labels"] += 1
+
+        for tags, lat, lon in iter_osm_elements(osm_files):
+            if _is_hospital(tags):
+                city = tags.get("addr:city")
+                conn.execute("INSERT INTO hospitals (name, lat, lon, city) VALUES (?, ?, ?, ?)",
+                             (tags["name"], lat, lon, _normalize(city) if city else None))
+                counts["hospitals"] += 1
+            elif _is_place(tags):
+                # Keep the first (usually the main) place of a name
+                conn.execute("INSERT OR IGNORE INTO places (name, lat, lon) VALUES (?, ?, ?)",
+                             (_normalize(tags["name"]), lat, lon))
+                counts["places"] += 1
+
+        conn.execute("CREATE INDEX hospitals_city ON hospitals (city)")
+        conn.execute("CREATE INDEX hospitals_position ON hospitals (lat, lon)")
+        counts["drug_names"] = conn.execute("SELECT COUNT(*) FROM drug_names").fetchone()[0]
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(staging, path)
+    return counts
+
+
+class LocalIndex:
+    """Read-only lookups in an index built by build_index(), safe to share across threads."""
+
+    def __init__(self, path=LOCAL_DATA):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.hits = {"drugs": 0, "hospitals": 0}
+        self.misses = {"drugs": 0, "hospitals": 0}
+        self._db  # fail fast if the file is missing
+
+    @property
+    def _db(self):
+        # SQLite connections must not cross fork(); each worker process opens its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            uri = "file:" + os.path.abspath(self.path) + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
+
+    def _record(self, kind, found):
+        (self.hits if found else self.misses)[kind] += 1
+
+    def drug_info(self, drug_name):
+        """Same dict as integrations.parse_drug_label() for the label indexed under `drug_name`."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT purpose, warnings FROM drug_names JOIN labels ON labels.id = drug_names.label_id"
+                " WHERE drug_names.name = ?", (_normalize(drug_name),)).fetchone()
+            self._record("drugs", row is not None)
+        if row is None:
+            return {"found": False}
+        return {"found": True, "name": drug_name, "purpose": row[0], "warnings": row[1]}
+
+    def hospitals(self, city, limit=HOSPITAL_LIMIT):
+        """
+        Same dict as integrations.parse_hospitals(): hospitals tagged with the city,
+        closest to its centre first, then untagged ones within CITY_RADIUS_KM of it.
+        """
+        key = _normalize(city)
+        with self._lock:
+            centre = self._db.execute("SELECT lat, lon FROM places WHERE name = ?", (key,)).fetchone()
+            rows = self._db.execute("SELECT id, name, lat, lon FROM hospitals WHERE city = ?", (key,)).fetchall()
+            if centre is not None:
+                # Bounding box on the (lat, lon) index, then exact distances for the few candidates
+                lat, lon = centre
+                dlat = CITY_RADIUS_KM / KM_PER_DEGREE
+                dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+                nearby = self._db.execute(
+                    "SELECT id, name, lat, lon FROM hospitals WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+                    (lat - dlat, lat + dlat, lon - dlon, lon + dlon)).fetchall()
+                tagged = {row[0] for row in rows}
+                rows = sorted(rows, key=lambda row: _distance_km(lat, lon, row[2], row[3]))
+                rows += sorted((row for row in nearby if row[0] not in tagged
+                                and _distance_km(lat, lon, row[2], row[3]) <= CITY_RADIUS_KM),
+                               key=lambda row: _distance_km(lat, lon, row[2], row[3]))
+            else:
+                rows.sort(key=lambda row: row[1])
+            self._record("hospitals", bool(rows))
+        if not rows:
+            return {"found": False}
+        return {"found": True,
+                "hospitals": [{"name": name, "lat": str(lat), "lon": str(lon)} for _, name, lat, lon in rows[:limit]]}
+
+    def stats(self):
+        with self._lock:
+            counts = {table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("drug_names", "hospitals", "places")}
+        return dict(counts, hits=dict(self.hits), misses=dict(self.misses))
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._pid = None
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    # Equirectangular approximation; plenty for ranking hospitals within a city
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371.0 * math.hypot(x, y)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline drug-label and hospital index.")
+    parser.add_argument("--drugs", nargs="*", default=[], help="openFDA drug label bulk files (.json or .json.zip)")
+    parser.add_argument("--osm", nargs="*", default=[], help="OSM extracts (.osm XML or Overpass .json)")
+    parser.add_argument("--output", default=LOCAL_DATA)
+    args = parser.parse_args()
+    counts = build_index(args.drugs, args.osm, args.output)
+    print(f"Indexed {counts['labels']} drug labels under {counts['drug_names']} names, "
+          f"{counts['hospitals']} hospitals and {counts['places']} cities into {args.output}.")
@@ -0,0 +1,231 @@
+"""
+In-process metrics for the chat pipeline, exposed in the Prometheus text format on /metrics.
+
+Hot-path calls are a perf_counter() read plus one locked dict update, and
+nothing is recorded with MEDIBOT_METRICS=0. Each process (e.g. each gunicorn
+worker) keeps its own counters.
+
+Sampled per-request stage breakdowns are opt-in: MEDIBOT_PROFILE_SAMPLE=0.01
+appends 1% of requests as JSON lines to MEDIBOT_PROFILE_PATH (message text is
+never written).
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+
+ENABLED = os.environ.get("MEDIBOT_METRICS", "1") != "0"
+PROFILE_SAMPLE_RATE = float(os.environ.get("MEDIBOT_PROFILE_SAMPLE", 0))
+PROFILE_PATH = os.environ.get("MEDIBOT_PROFILE_PATH", "profile.jsonl")
+
+# Seconds; stages range from a few microseconds (lookups in warm caches) to upstream timeouts
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROBABILITY_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._series.items())
+        for label_values, (counts, total, n) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {n}")
+        return lines
+
+
+stage_seconds = Histogram("medibot_stage_duration_seconds", "Time spent in each chat pipeline stage.", ("stage",))
+request_seconds = Histogram("medibot_request_duration_seconds", "End-to-end time of chat API calls.", ("route",))
+confidence_tiers = Counter("medibot_confidence_tier_total",
+                           "Classified messages per Smart Fallback tier (low < 0.15 <= suggest < 0.35 <= confident).",
+                           ("tier",))
+intents = Counter("medibot_intent_total", "Classified messages per top-1 intent.", ("intent",))
+top_probability = Histogram("medibot_top_probability", "Top-1 class probability of classified messages.",
+                            buckets=PROBABILITY_BUCKETS)
+integration_seconds = Histogram("medibot_integration_duration_seconds",
+                                "Time of upstream calls (cache misses only).", ("upstream",))
+integration_errors = Counter("medibot_integration_errors_total", "Upstream calls that ended in an error.", ("upstream",))
+shed = Counter("medibot_shed_total",
+               "Requests turned away (rate_limited, queue_full, deadline) or answered without their lookup (lookup).",
+               ("route", "reason"))
+
+ALL = (stage_seconds, request_seconds, confidence_tiers, intents, top_probability, integration_seconds, integration_errors,
+       shed)
+
+_trace = contextvars.ContextVar("medibot_trace", default=None)
+_profile_lock = threading.Lock()
+
+
+def now():
+    return time.perf_counter()
+
+def stage_done(stage, start):
+    """Records the time since `start` for a pipeline stage and returns the current time, for chaining."""
+    end = time.perf_counter()
+    if ENABLED:
+        stage_seconds.observe(end - start, stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace["stages_ms"][stage] = trace["stages_ms"].get(stage, 0.0) + (end - start) * 1e3
+    return end
+
+def record_classification(tag, probability, tier):
+    if ENABLED:
+        confidence_tiers.inc(tier)
+        intents.inc(tag)
+        top_probability.observe(probability)
+    trace = _trace.get()
+    if trace is not None:
+        trace.setdefault("intents", []).append({"intent": tag, "probability": round(probability, 4), "tier": tier})
+
+def record_integration(upstream, seconds, error):
+    if not ENABLED:
+        return
+    integration_seconds.observe(seconds, upstream)
+    if error:
+        integration_errors.inc(upstream)
+
+def record_shed(route, reason):
+    if ENABLED:
+        shed.inc(route, reason)
+
+def timed_integration(upstream):
+    """Decorates a sync or async fetcher returning an info dict; results with an "error" key count as errors."""
+    def decorate(fetch):
+        if inspect.iscoroutinefunction(fetch):
+            @functools.wraps(fetch)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                info = await fetch(*args, **kwargs)
+                record_integration(upstream, time.perf_counter() - start, "error" in info)
+                return info
+            return timed_async
+
+        @functools.wraps(fetch)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            info = fetch(*args, **kwargs)
+            record_integration(upstream, time.perf_counter() - start, "error" in info)
+            return info
+        return timed
+    return decorate
+
+@contextlib.contextmanager
+def track_request(route):
+    """
+    Times one API call and, for a sampled fraction of calls, collects its stage
+    breakdown and appends it to PROFILE_PATH. Code run in another thread only
+    joins the trace when started with contextvars.copy_context().run.
+    """
+    token = None
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        token = _trace.set({"route": route, "stages_ms": {}})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if ENABLED:
+            request_seconds.observe(elapsed, route)
+        if token is not None:
+            trace = _trace.get()
+            _trace.reset(token)
+            trace["time"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            trace["total_ms"] = elapsed * 1e3
+            _write_profile(trace)
+
+def _write_profile(trace):
+    try:
+        with _profile_lock, open(PROFILE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace) + "\n")
+    except OSError as e:
+        print(f"Could not write profile sample: {e}")
+
+def render(info=None):
+    """Prometheus text exposition of all metrics; `info` adds a medibot_info gauge with those labels."""
+    lines = []
+    if info:
+        lines += ["# HELP medibot_info Serving process information.", "# TYPE medibot_info gauge",
+                  f"medibot_info{_format_labels(tuple(info), tuple(info.values()))} 1"]
+    for metric in ALL:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def reset():
+    for metric in ALL:
+        metric.reset()
@@ -0,0 +1,246 @@
+"""
+Versioned, sklearn-free model artifact bundle.
+
+    model_bundle/
+        CURRENT                 <- name of the active version, swapped atomically
+        20240101-120000-1a2b3c4d/
+            manifest.json       <- format/model version and vectorizer settings
+            vocabulary.json     <- terms, ordered by feature index
+            idf.npy
+            coef.npy, intercept.npy, a.npy, b.npy, mask.npy  <- compiled classifier
+            classes.json
+            responses.db        <- responses per tag (SQLite), read lazily; tag_map.json in format 1
+
+The .npy arrays are opened with mmap_mode='r', so worker processes on one host
+share the weight pages instead of each unpickling a private copy.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from compiled_model import CompiledModel, compile_model
+from knowledge_base import RESPONSES_DB, ResponseStore, build_store
+
+BUNDLE_DIR = "model_bundle"
+FORMAT_VERSION = 2
+# Format 1 bundles kept the responses in tag_map.json
+SUPPORTED_FORMATS = (1, 2)
+ARRAYS = ("idf", "coef", "intercept", "a", "b", "mask")
+
+
+class BundleVectorizer:
+    """Re-implements TfidfVectorizer.transform for word n-grams without importing sklearn."""
+
+    def __init__(self, terms, idf, lowercase=True, token_pattern=r"(?u)\b\w\w+\b",
+                 ngram_range=(1, 1), norm="l2", sublinear_tf=False, binary=False):
+        self.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        self.idf_ = idf
+        self.lowercase = lowercase
+        self.token_pattern = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    def build_analyzer(self):
+        return self._analyze
+
+    def _analyze(self, doc):
+        if self.lowercase:
+            doc = doc.lower()
+        tokens = self.token_pattern.findall(doc)
+
+        # Same n-gram order as sklearn's _word_ngrams
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n + 1, len(tokens) + 1)):
+            for i in range(len(tokens) - n + 1):
+                ngrams.append(" ".join(tokens[i:i + n]))
+        return ngrams
+
+    def transform(self, raw_documents):
+        indptr = [0]
+        indices = []
+        data = []
+        for doc in raw_documents:
+            counts = Counter(
+                self.vocabulary_[term] for term in self._analyze(doc) if term in self.vocabulary_
+            )
+            for index in sorted(counts):
+                indices.append(index)
+                data.append(counts[index])
+            indptr.append(len(indices))
+
+        tf = np.asarray(data, dtype=np.float64)
+        if self.binary:
+            tf[:] = 1.0
+        elif self.sublinear_tf:
+            tf = np.log(tf) + 1.0
+        indices = np.asarray(indices, dtype=np.int32)
+        values = tf * self.idf_[indices]
+
+        X = sp.csr_matrix((values, indices, np.asarray(indptr)), shape=(len(indptr) - 1, len(self.idf_)))
+        if self.norm == "l2":
+            row_norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        elif self.norm == "l1":
+            row_norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        else:
+            return X
+        row_norms[row_norms == 0] = 1.0
+        X.data /= np.repeat(row_norms, np.diff(X.indptr))
+        return X
+
+
+def vectorizer_settings(vectorizer):
+    """
+    Checks the fitted TfidfVectorizer only uses settings BundleVectorizer (and the
+    fused featurizer) re-implement, and returns them.
+    """
+    if not hasattr(vectorizer, "vocabulary_") or not hasattr(vectorizer, "idf_"):
+        raise ValueError(f"Can't export a {type(vectorizer).__name__}: no fitted vocabulary and idf.")
+    unsupported = {
+        "analyzer": "word", "preprocessor": None, "tokenizer": None,
+        "stop_words": None, "strip_accents": None, "use_idf": True,
+    }
+    for name, expected in unsupported.items():
+        if getattr(vectorizer, name, expected) != expected:
+            raise ValueError(f"Can't export a vectorizer with {name}={getattr(vectorizer, name)!r}.")
+    return {
+        "lowercase": vectorizer.lowercase,
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "norm": vectorizer.norm,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "binary": vectorizer.binary,
+    }
+
+
+def export_bundle(model, vectorizer, tag_map, root=BUNDLE_DIR):
+    """
+    Writes a new bundle version under `root` and points CURRENT at it. `tag_map` is a
+    dict or a knowledge_base.ResponseStore. Returns the version name.
+    Raises ValueError if the model or vectorizer can't be exported.
+    """
+    compiled = compile_model(model)
+    if not isinstance(compiled, CompiledModel):
+        raise ValueError(f"Can't export a {type(compiled).__name__}: bundles hold a single linear model.")
+    settings = vectorizer_settings(vectorizer)
+    terms = [term for term, _ in sorted(vectorizer.vocabulary_.items(), key=lambda item: item[1])]
+    arrays = {
+        "idf": vectorizer.idf_, "coef": compiled.coef, "intercept": compiled.intercept,
+        "a": compiled.a, "b": compiled.b, "mask": compiled.mask,
+    }
+
+    digest = hashlib.sha256()
+    for name in ARRAYS:
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    digest.update(json.dumps([terms, list(map(str, compiled.classes_))]).encode())
+    tags = sorted(tag_map)
+    for tag in tags:
+        digest.update(json.dumps([tag, tag_map.get(tag)]).encode())
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{digest.hexdigest()[:8]}"
+
+    os.makedirs(root, exist_ok=True)
+    staging = os.path.join(root, f".{version}.tmp")
+    os.makedirs(staging)
+    for name in ARRAYS:
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+    files = {
+        "vocabulary.json": terms,
+        "classes.json": [str(c) for c in compiled.classes_],
+        "manifest.json": {
+            "format_version": FORMAT_VERSION,
+            "model_version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "n_features": len(terms),
+            "n_classes": compiled.n_classes,
+            "n_folds": compiled.n_folds,
+            "vectorizer": settings,
+        },
+    }
+    for filename, content in files.items():
+        with open(os.path.join(staging, filename), "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False)
+    build_store(({"tag": tag, "responses": tag_map.get(tag)} for tag in tags), os.path.join(staging, RESPONSES_DB))
+
+    final = os.path.join(root, version)
+    if os.path.exists(final):
+        shutil.rmtree(final)
+    os.rename(staging, final)
+    _write_current(root, version)
+    return version
+
+
+def _write_current(root, version):
+    pointer = os.path.join(root, "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+
+def clear_current(root=BUNDLE_DIR):
+    """Stops serving bundles (versions stay on disk), so loaders fall back to the pickles."""
+    try:
+        os.remove(os.path.join(root, "CURRENT"))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def current_version(root=BUNDLE_DIR):
+    """Returns the active bundle version, or None if no bundle was exported."""
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_bundle(root=BUNDLE_DIR, version=None, mmap=True):
+    """
+    Loads (model, vectorizer, tag_map, manifest) from a bundle without scikit-learn.
+    `version` defaults to the one named in CURRENT.
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model bundle found in '{root}'.")
+    path = os.path.join(root, version)
+
+    def read_json(filename):
+        with open(os.path.join(path, filename), encoding="utf-8") as f:
+            return json.load(f)
+
+    manifest = read_json("manifest.json")
+    if manifest["format_version"] not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported bundle format {manifest['format_version']} in '{path}'.")
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+              for name in ARRAYS}
+    vectorizer = BundleVectorizer(read_json("vocabulary.json"), arrays["idf"], **manifest["vectorizer"])
+    model = CompiledModel(read_json("classes.json"), arrays["coef"], arrays["intercept"],
+                          arrays["a"], arrays["b"], arrays["mask"])
+    if manifest["format_version"] == 1:
+        return model, vectorizer, read_json("tag_map.json"), manifest
+    return model, vectorizer, ResponseStore(os.path.join(path, RESPONSES_DB)), manifest
+
+
+if __name__ == "__main__":
+    # Export the current pickles without retraining
+    import pickle
+    with open("chat_model.pkl", "rb") as f:
+        model = pickle.load(f)
+    with open("vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    if os.path.exists(RESPONSES_DB):
+        tag_map = ResponseStore(RESPONSES_DB)
+    else:
+        with open("tag_map.pkl", "rb") as f:
+            tag_map = pickle.load(f)
+    print(f"Exported model bundle {export_bundle(model, vectorizer, tag_map)}.")
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import pickle
+import threading
+import numpy as np
+from compiled_model import compile_model
+from knowledge_base import RESPONSES_DB, ResponseStore
+from model_bundle import BUNDLE_DIR, current_version, load_bundle
+
+PICKLES = ('chat_model.pkl', 'vectorizer.pkl')
+# Responses come from the SQLite store train.py writes, or a legacy tag_map.pkl
+RESPONSE_FILES = (RESPONSES_DB, 'tag_map.pkl')
+
+# Messages every candidate model must score sanely before it is swapped in
+SMOKE_MESSAGES = ["hello", "I have a fever", "hospitals in boston", "tell me about aspirin"]
+
+
+class LoadedModel:
+    """One immutable generation of serving artifacts. Requests hold on to it until they finish."""
+
+    __slots__ = ("model", "vectorizer", "tag_map", "version", "intent_cache", "featurizer")
+
+    def __init__(self, model, vectorizer, tag_map, version):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.tag_map = tag_map
+        self.version = version
+        self.intent_cache = None
+        self.featurizer = None
+
+
+def response_file():
+    return next((path for path in RESPONSE_FILES if os.path.exists(path)), None)
+
+
+def pickle_version():
+    """Identifies the pickled artifacts by their modification times and sizes."""
+    if not os.path.exists(PICKLES[0]):
+        return None
+    signature = hashlib.sha1()
+    responses = response_file()
+    for path in PICKLES + ((responses,) if responses else ()):
+        stat = os.stat(path)
+        signature.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return f"pickle-{signature.hexdigest()[:8]}"
+
+
+def load_pickles():
+    with open('chat_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+
+    # Score with plain NumPy arrays instead of the nested sklearn estimators
+    try:
+        model = compile_model(model)
+    except ValueError as e:
+        print(f"Serving the pickled model as is: {e}")
+
+    with open('vectorizer.pkl', 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    if response_file() == RESPONSES_DB:
+        tag_map = ResponseStore(RESPONSES_DB)
+    else:
+        with open('tag_map.pkl', 'rb') as f:
+            tag_map = pickle.load(f)
+    return model, vectorizer, tag_map
+
+
+def validate(candidate):
+    """Raises ValueError unless the candidate produces a sane probability vector."""
+    probabilities = candidate.model.predict_proba(candidate.vectorizer.transform(SMOKE_MESSAGES))
+    n_classes = len(candidate.model.classes_)
+    if probabilities.shape != (len(SMOKE_MESSAGES), n_classes):
+        raise ValueError(f"predict_proba returned shape {probabilities.shape}, expected ({len(SMOKE_MESSAGES)}, {n_classes}).")
+    if not np.all(np.isfinite(probabilities)) or not np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-3):
+        raise ValueError("predict_proba rows are not valid probability distributions.")
+    missing = [tag for tag in candidate.model.classes_ if tag not in candidate.tag_map]
+    if missing:
+        raise ValueError(f"tag_map has no responses for {missing}.")
+
+
+class ModelRegistry:
+    """
+    Holds the serving model and swaps in retrained artifacts without a restart.
+
+    Candidates are loaded and validated off the request path, then published
+    with a single reference assignment. Requests read `registry.current` once
+    and keep using that generation, so in-flight requests finish on the old
+    version while new ones pick up the new one.
+    """
+
+    def __init__(self, bundle_dir=BUNDLE_DIR, prefer_bundle=True, prepare=None):
+        self.bundle_dir = bundle_dir
+        self.prefer_bundle = prefer_bundle
+        # Called with each validated candidate before it is published, e.g. to precompute caches
+        self.prepare = prepare
+        self.current = None
+        self.last_error = None
+        self.failed_version = None
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def available_version(self):
+        """Version the artifacts on disk would load as, or None if there are none."""
+        if self.prefer_bundle:
+            version = current_version(self.bundle_dir)
+            if version is not None:
+                return version
+        return pickle_version()
+
+    def _load_candidate(self, version=None):
+        if self.prefer_bundle and (version or current_version(self.bundle_dir)):
+            model, vectorizer, tag_map, manifest = load_bundle(self.bundle_dir, version)
+            return LoadedModel(model, vectorizer, tag_map, manifest["model_version"])
+
+        version = pickle_version()
+        if version is None:
+            return None
+        return LoadedModel(*load_pickles(), version)
+
+    def reload(self, version=None):
+        """
+        Loads, validates and publishes the artifacts on disk (or a given bundle version).
+        Returns True if a new generation was swapped in; the old one stays on failure.
+        """
+        with self._reload_lock:
+            try:
+                candidate = self._load_candidate(version)
+                if candidate is None:
+                    self.last_error = "Model not found. Run train.py first."
+                    return False
+                if self.current is not None and candidate.version == self.current.version:
+                    return False
+                validate(candidate)
+                if self.prepare is not None:
+                    self.prepare(candidate)
+            except Exception as e:
+                self.failed_version = version or self.available_version()
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Model reload failed, still serving {self.version}: {self.last_error}")
+                return False
+
+            self.current = candidate
+            self.last_error = None
+            self.reloads += 1
+            return True
+
+    @property
+    def version(self):
+        return self.current.version if self.current is not None else None
+
+    def start_watching(self, interval=5.0):
+        """Polls the artifacts every `interval` seconds and reloads when they change."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    # Don't keep re-loading a version that already failed validation
+                    available = self.available_version()
+                    if available not in (self.version, self.failed_version):
+                        if self.reload():
+                            print(f"Hot-reloaded model {self.version}.")
+                except Exception as e:
+                    print(f"Model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
@@ -0,0 +1,76 @@
+import os
+import nltk
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from nltk.stem import WordNetLemmatizer
+import metrics
+
+# Initialize Lemmatizer
+lemmatizer = WordNetLemmatizer()
+
+# Chat traffic is very repetitive, so small bounded caches absorb most of it
+MESSAGE_CACHE_SIZE = 10000
+LEMMA_CACHE_SIZE = 50000
+
+def download_nltk_data():
+    """Download necessary NLTK data."""
+    try:
+        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('tokenizers/punkt_tab')
+        nltk.data.find('corpora/wordnet')
+    except LookupError:
+        print("Downloading NLTK data...")
+        nltk.download('punkt')
+        nltk.download('punkt_tab')
+        nltk.download('wordnet')
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(word):
+    """Lemmatizes one lowercased token."""
+    return lemmatizer.lemmatize(word)
+
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def preprocess_text(text):
+    """Tokenize and lemmatize text."""
+    # Stage timers only run on cache misses; the "preprocess" stage in app.py covers hits too
+    start = metrics.now()
+    tokens = nltk.word_tokenize(text)
+    start = metrics.stage_done("tokenize", start)
+    processed = ' '.join([lemmatize(word.lower()) for word in tokens])
+    metrics.stage_done("lemmatize", start)
+    return processed
+
+def _init_worker():
+    download_nltk_data()
+    # Load WordNet once per worker process instead of on its first pattern
+    lemmatizer.lemmatize("warmup")
+
+def _preprocess_chunk(texts):
+    return [preprocess_text(text) for text in texts]
+
+def preprocess_many(texts, jobs=1, chunksize=256):
+    """
+    Preprocesses texts in `jobs` worker processes (-1 for all cores), keeping input order.
+    The output is identical to [preprocess_text(t) for t in texts].
+    """
+    texts = list(texts)
+    if jobs < 0:
+        jobs = os.cpu_count() or 1
+    # Small inputs aren't worth the pool start-up
+    if jobs <= 1 or len(texts) < 2 * chunksize:
+        return [preprocess_text(text) for text in texts]
+
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        return [processed for chunk in pool.map(_preprocess_chunk, chunks) for processed in chunk]
+
+def cache_stats():
+    """Returns hits/misses/size of the message and lemma caches."""
+    return {
+        "message": preprocess_text.cache_info()._asdict(),
+        "lemma": lemmatize.cache_info()._asdict(),
+    }
+
+def clear_caches():
+    preprocess_text.cache_clear()
+    lemmatize.cache_clear()
@@ -0,0 +1,231 @@
+"""
+Offline bulk classification of logged messages.
+
+    python replay.py transcripts.jsonl --output scored.jsonl --jobs 8
+    python replay.py chats.csv --field text --label-field tag --sweep-thresholds --report sweep.json
+
+Streams a JSONL or CSV transcript and sends chunks of messages to a process
+pool. Each worker scores its chunk in one vectorized pass with the served
+artifacts (bundle or pickles, loaded once per process) and returns one JSON
+line per message: the top-k tags and probabilities and the Smart Fallback
+tier app.py would pick. Only a few chunks are in flight at a time, so memory
+stays flat however long the transcript is, and output keeps the input order.
+
+--sweep-thresholds reports, from the same pass, how the fallback and suggest
+cutoffs would split the traffic at other values. With --label-field it also
+reports the accuracy of the messages each cutoff would answer confidently.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import app
+from featurizer import FusedFeaturizer
+from model_registry import ModelRegistry
+
+CHUNK_SIZE = 2000
+# Resolution of the top-1 probability histogram behind --sweep-thresholds
+SWEEP_BINS = 1000
+SWEEP_CUTOFFS = [round(0.05 * i, 2) for i in range(1, 20)]
+
+# Serving artifacts of this process; inherited from the parent on fork
+_artifacts = None
+
+
+def load_artifacts(prefer_bundle=True):
+    global _artifacts
+    if _artifacts is None:
+        registry = ModelRegistry(prefer_bundle=prefer_bundle)
+        if not registry.reload():
+            raise RuntimeError(registry.last_error)
+        artifacts = registry.current
+        try:
+            artifacts.featurizer = FusedFeaturizer.from_vectorizer(artifacts.vectorizer)
+        except ValueError:
+            pass
+        _artifacts = artifacts
+    return _artifacts
+
+
+def read_messages(path, field="message", label_field=None):
+    """Yields (line number, message, label or None) from a JSONL or CSV transcript."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            # Row numbers count data rows, after the header
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield number, row.get(field), row.get(label_field) if label_field else None
+            return
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, None, None
+                continue
+            if not isinstance(record, dict):
+                record = {}
+            yield number, record.get(field), record.get(label_field) if label_field else None
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def tier_of(max_prob, low, suggest):
+    return "low" if max_prob < low else "suggest" if max_prob < suggest else "confident"
+
+
+def score_chunk(rows, top_k=app.TOP_K, low=app.LOW_CONFIDENCE, suggest=app.SUGGEST_CONFIDENCE, prefer_bundle=True):
+    """
+    Scores one chunk of (line, message, label) rows. Returns (output lines, counts):
+    counts[0], [1] and [2] histogram the top-1 probability of all, labeled and
+    correctly predicted rows.
+    """
+    # Spawned workers load their own artifacts, so they need the parent's choice of format
+    artifacts = load_artifacts(prefer_bundle)
+    valid = [row for row in rows if isinstance(row[1], str) and row[1].strip()]
+    lines = {}
+    for number, message, _ in rows:
+        if not (isinstance(message, str) and message.strip()):
+            lines[number] = json.dumps({"line": number, "error": "No message."})
+
+    counts = np.zeros((3, SWEEP_BINS + 1), dtype=np.int64)
+    if valid:
+        processed = [app.preprocess_message(message, artifacts) for _, message, _ in valid]
+        if artifacts.featurizer is not None:
+            X = artifacts.featurizer.transform_features(processed)
+        else:
+            X = artifacts.vectorizer.transform(processed)
+        top_indices, top_probs = app.top_k_predictions(artifacts.model.predict_proba(X), top_k)
+        top_tags = artifacts.model.classes_[top_indices]
+
+        bins = np.minimum((top_probs[:, 0] * SWEEP_BINS).astype(np.int64), SWEEP_BINS)
+        labeled = np.array([label is not None for _, _, label in valid])
+        hits = labeled & (top_tags[:, 0].astype(str) == np.array([str(label) for _, _, label in valid]))
+        for i, mask in enumerate((slice(None), labeled, hits)):
+            counts[i] = np.bincount(bins[mask], minlength=SWEEP_BINS + 1)
+
+        for (number, _, label), tags, probs in zip(valid, top_tags, top_probs):
+            record = {"line": number, "tags": [str(tag) for tag in tags], "probs": [round(float(p), 6) for p in probs],
+                      "tier": tier_of(probs[0], low, suggest)}
+            if label is not None:
+                record["label"] = label
+            lines[number] = json.dumps(record, ensure_ascii=False)
+    return [lines[number] for number, _, _ in rows], counts
+
+
+def replay(rows, output, jobs=1, chunk_size=CHUNK_SIZE, top_k=app.TOP_K,
+           low=app.LOW_CONFIDENCE, suggest=app.SUGGEST_CONFIDENCE, prefer_bundle=True):
+    """
+    Scores (line, message, label) rows in `jobs` processes and writes one JSON
+    line per row to the `output` file object, in input order.
+    Returns {"rows", "counts"} with the summed score_chunk() histograms.
+    """
+    if jobs < 0:
+        jobs = os.cpu_count() or 1
+    totals = {"rows": 0, "counts": np.zeros((3, SWEEP_BINS + 1), dtype=np.int64)}
+
+    def collect(result):
+        lines, counts = result
+        output.write("\n".join(lines) + "\n")
+        totals["rows"] += len(lines)
+        totals["counts"] += counts
+
+    chunks = chunked(rows, chunk_size)
+    if jobs <= 1:
+        for chunk in chunks:
+            collect(score_chunk(chunk, top_k, low, suggest, prefer_bundle))
+        return totals
+
+    # Bounded window of in-flight chunks; Executor.map would read the whole transcript up front
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(score_chunk, chunk, top_k, low, suggest, prefer_bundle))
+            if len(pending) >= 2 * jobs:
+                collect(pending.popleft().result())
+        while pending:
+            collect(pending.popleft().result())
+    return totals
+
+
+def sweep(counts):
+    """Per cutoff: share of messages below it, and accuracy of the labeled ones at or above it."""
+    seen, labeled, correct = counts
+    total = seen.sum()
+    report = []
+    for cutoff in SWEEP_CUTOFFS:
+        split = int(round(cutoff * SWEEP_BINS))
+        below = seen[:split].sum()
+        entry = {"cutoff": cutoff, "below": int(below), "below_share": float(below / total) if total else 0.0}
+        if labeled.sum():
+            answered = labeled[split:].sum()
+            entry["accuracy_above"] = float(correct[split:].sum() / answered) if answered else None
+        report.append(entry)
+    return report
+
+
+def print_sweep(report, low, suggest):
+    labeled = "accuracy_above" in report[0]
+    print(f"\n{'cutoff':>6} | {'below':>10} | {'share':>7}" + (f" | {'accuracy at/above':>17}" if labeled else ""))
+    print("-" * (30 + (20 if labeled else 0)))
+    for entry in report:
+        line = f"{entry['cutoff']:>6.2f} | {entry['below']:>10} | {entry['below_share']:>7.1%}"
+        if labeled:
+            accuracy = entry["accuracy_above"]
+            line += f" | {accuracy:>17.1%}" if accuracy is not None else f" | {'-':>17}"
+        print(line)
+    print(f"\nBelow {low} falls back, below {suggest} gets suggestions; "
+          "the rest is answered. Pick cutoffs from the shares above.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("transcript", help="JSONL (one object per line) or .csv file")
+    parser.add_argument("--output", default="replay.jsonl", help="Scored JSONL output")
+    parser.add_argument("--field", default="message", help="Field/column holding the message")
+    parser.add_argument("--label-field", help="Field/column with the expected tag, for accuracy in the sweep")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (-1 for all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--top-k", type=int, default=app.TOP_K)
+    parser.add_argument("--low", type=float, default=app.LOW_CONFIDENCE, help="Fallback cutoff for the tier column")
+    parser.add_argument("--suggest", type=float, default=app.SUGGEST_CONFIDENCE, help="Suggest cutoff for the tier column")
+    parser.add_argument("--sweep-thresholds", action="store_true", help="Report tier shares for other cutoffs")
+    parser.add_argument("--report", help="Also write the sweep as JSON to this path")
+    parser.add_argument("--pickles", action="store_true", help="Score with the pickles even if a bundle exists")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Loaded here once; forked workers share it, spawned ones reload the same format
+    load_artifacts(prefer_bundle=not args.pickles)
+    rows = read_messages(args.transcript, args.field, args.label_field)
+    with open(args.output, "w", encoding="utf-8") as output:
+        totals = replay(rows, output, args.jobs, args.chunk_size, args.top_k, args.low, args.suggest,
+                        prefer_bundle=not args.pickles)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {totals['rows']} lines with model {_artifacts.version} in {elapsed:.1f}s "
+          f"({totals['rows'] / elapsed:.0f} lines/s) into {args.output}.")
+
+    if args.sweep_thresholds or args.report:
+        report = sweep(totals["counts"])
+        if args.sweep_thresholds:
+            print_sweep(report, args.low, args.suggest)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump({"model_version": _artifacts.version, "rows": totals["rows"], "sweep": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
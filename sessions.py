@@ -0,0 +1,219 @@
+"""
+Per-conversation context for follow-up turns.
+
+After a drug or hospital lookup the session keeps the intent, the entity and
+the integration result. Short follow-ups are then answered from that context
+without running the classifier:
+
+    "tell me about aspirin" -> "what about its warnings?"   (answered from the stored label)
+    "hospitals in London"   -> "and in Boston?"             (same intent, new city, no classifier)
+
+A follow-up may only use the words in FOLLOW_UP_VOCABULARY besides a drug or
+city name, so a message with a subject of its own ("my chest hurts, is that
+dangerous?") always goes to the classifier. Any turn that isn't a follow-up
+drops the context (see app.classify_turn()).
+
+Sessions live in a per-process LRU with a sliding TTL, a session count limit
+and a hard cap on the estimated bytes held.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+import entities
+
+SESSION_TTL = float(os.environ.get("MEDIBOT_SESSION_TTL", 30 * 60))
+MAX_SESSIONS = int(os.environ.get("MEDIBOT_SESSIONS", 100000))
+MAX_BYTES = int(float(os.environ.get("MEDIBOT_SESSION_MEMORY_MB", 64)) * 2 ** 20)
+# Fixed cost of one session (record, LRU slot) on top of its key and payload, from benchmarks.sessions
+ENTRY_OVERHEAD = 200
+
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{8,64}")
+
+# Longer messages always go to the classifier
+FOLLOW_UP_WORDS = 8
+CUES = {"and", "also", "what", "about", "how", "then", "ok", "okay", "so"}
+REFERENCES = {"it", "its", "this", "that", "they", "them", "those", "there", "same"}
+FILLER = {"is", "are", "the", "a", "an", "s", "in", "at", "of", "to", "on", "me", "show", "tell", "give", "any",
+          "please", "can", "you", "does", "do", "near"}
+DRUG_FIELDS = {
+    "warnings": {"warning", "warnings", "side", "effects", "risk", "risks", "danger", "dangerous", "safe", "safety"},
+    "purpose": {"purpose", "use", "uses", "used", "treat", "treats", "for"},
+}
+MAP_WORDS = {"map", "where", "directions"}
+FOLLOW_UP_VOCABULARY = CUES | REFERENCES | FILLER | MAP_WORDS | set().union(*DRUG_FIELDS.values())
+
+
+class Session:
+    """Context of one conversation: the last lookup's intent, entity and result."""
+
+    __slots__ = ("tag", "entity", "info", "size", "expires")
+
+    def __init__(self, tag, entity, info, size, expires):
+        self.tag = tag
+        self.entity = entity
+        self.info = info
+        self.size = size
+        self.expires = expires
+
+
+def object_size(value):
+    """Bytes held by a lookup result: sys.getsizeof of it and its values (keys are shared literals)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(object_size(v) for v in value.values())
+    elif isinstance(value, (list, tuple)):
+        size += sum(object_size(v) for v in value)
+    return size
+
+
+def session_key(value):
+    """Returns a client-supplied session id if it is well formed, else None."""
+    return value if isinstance(value, str) and _SESSION_ID.fullmatch(value) else None
+
+
+def follow_up(session, message):
+    """
+    Resolves a follow-up turn from the session's context. Returns (tag, entity, field):
+    field names the part of the stored result asked about ("warnings", "purpose",
+    "map"), or is None when the same lookup is needed for a new entity.
+    Returns None for anything that isn't clearly a follow-up.
+    """
+    words = entities.tokenize(message)
+    if not words or len(words) > FOLLOW_UP_WORDS:
+        return None
+    if session.tag == "drug_lookup":
+        named = entities.find_drug(message)
+    elif session.tag == "hospital_search":
+        named = entities.find_city(message)
+    else:
+        return None
+    rest = set(words) - set(entities.tokenize(named)) if named is not None else set(words)
+    if not rest <= FOLLOW_UP_VOCABULARY:
+        return None
+
+    if named is not None and named.lower() != session.entity.lower():
+        # "and tylenol?", "and in Boston?" or just the name
+        return session.tag, named, None
+    if session.tag == "drug_lookup":
+        if session.info.get("found"):
+            for field, keywords in DRUG_FIELDS.items():
+                if keywords & rest:
+                    return session.tag, session.entity, field
+    elif MAP_WORDS & rest:
+        return session.tag, session.entity, "map"
+    return None
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of Session records with a sliding TTL, at most `max_sessions`
+    entries and at most `max_bytes` of estimated payload.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL, max_bytes=MAX_BYTES):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.follow_ups = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.bytes -= session.size
+
+    def get(self, session_id):
+        """Returns the live Session for an id (refreshing its TTL), or None."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.expires <= now:
+                self._remove(session_id)
+                self.expirations += 1
+                session = None
+            if session is None:
+                self.misses += 1
+                return None
+            session.expires = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return session
+
+    def put(self, session_id, tag, entity, info):
+        """Records a lookup turn as the session's context."""
+        size = ENTRY_OVERHEAD + sys.getsizeof(session_id) + sys.getsizeof(entity) + object_size(info)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._sessions[session_id] = Session(tag, entity, info, size, now + self.ttl)
+            self.bytes += size
+            # Least recently used first; the oldest entries are also the first to expire
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if oldest.expires <= now:
+                    self.expirations += 1
+                elif len(self._sessions) > self.max_sessions or self.bytes > self.max_bytes:
+                    self.evictions += 1
+                else:
+                    break
+                self._remove(oldest_id)
+
+    def resolve(self, session_id, message):
+        """
+        Returns (follow_up() result, session) for a follow-up turn, or None if the
+        session has no context or the message isn't a follow-up.
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+        resolved = follow_up(session, message)
+        if resolved is None:
+            return None
+        with self._lock:
+            self.follow_ups += 1
+        return resolved, session
+
+    def discard(self, session_id):
+        """Drops a session's context, e.g. after a turn that wasn't a follow-up."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "follow_ups": self.follow_ups,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+store = SessionStore()
+
+
+def configure(**settings):
+    """Replaces the process-wide store, e.g. configure(ttl=60, max_sessions=1000)."""
+    global store
+    store = SessionStore(**settings)
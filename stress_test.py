@@ -1,8 +1,12 @@
+import os
 import requests
 import json
 import time
 
-url = "http://127.0.0.1:5000/get_response"
+# Checks answer quality only; for throughput and latency see benchmarks/load.py
+
+# Point at another server with MEDIBOT_URL=http://host:port
+url = os.environ.get("MEDIBOT_URL", "http://127.0.0.1:5000").rstrip("/") + "/get_response"
 headers = {"Content-Type": "application/json"}
 
 # diverse set of queries including typos, variations, and missing intents
@@ -46,6 +50,10 @@ passes = 0
 for msg in tests:
     try:
         response = requests.post(url, json={"message": msg}, headers=headers, timeout=5)
+        if response.status_code != 200:
+            # A 429/503 from admission control is no answer at all
+            print(f"[FAIL] Query: '{msg}' (HTTP {response.status_code})")
+            continue
         res_json = response.json()
         reply = res_json.get("response", "")
         
@@ -0,0 +1,141 @@
+"""
+Local stand-in for api.fda.gov and nominatim.openstreetmap.org.
+
+Serves canned OpenFDA labels and Nominatim results on 127.0.0.1 and counts
+requests per path and TCP connections. Latency (`delay`), limited throughput
+(`capacity` requests served at a time, the rest queue) and failures (`failures`
+upcoming requests answered with `fail_status`) can be injected, so caching and
+integration behaviour can be checked without network access:
+
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DRUG_LABELS = {
+    "advil": {"purpose": ["Pain reliever/fever reducer"], "warnings": ["Allergy alert: Ibuprofen may cause a severe allergic reaction."]},
+    "aspirin": {"purpose": ["Pain reliever"], "warnings": ["Reye's syndrome: Children and teenagers should not use this medicine."]},
+    "tylenol": {"purpose": ["Pain reliever/fever reducer"], "warnings": ["Liver warning: This product contains acetaminophen."]},
+}
+
+HOSPITALS = {
+    "boston": ["Massachusetts General Hospital", "Boston Medical Center", "Brigham and Women's Hospital"],
+    "paris": ["Hôpital Pitié-Salpêtrière", "Hôpital Necker", "Hôpital Lariboisière"],
+    "london": ["St Thomas' Hospital", "Guy's Hospital", "Royal London Hospital"],
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.record_connection()
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        stub.record(url.path, query)
+
+        if stub.slots is not None:
+            with stub.slots:
+                self._respond(stub, url, query)
+        else:
+            self._respond(stub, url, query)
+
+    def _respond(self, stub, url, query):
+        if stub.delay:
+            time.sleep(stub.delay)
+        if stub.take_failure():
+            self._send(stub.fail_status, {"error": "injected failure"})
+            return
+
+        if url.path.endswith("/label.json"):
+            match = re.search(r'brand_name:"([^"]*)"', query.get("search", [""])[0])
+            label = DRUG_LABELS.get(match.group(1).lower()) if match else None
+            if label:
+                self._send(200, {"results": [label]})
+            else:
+                self._send(404, {"error": {"code": "NOT_FOUND", "message": "No matches found!"}})
+        elif url.path.endswith("/search"):
+            city = query.get("q", [""])[0].lower().replace("hospitals in ", "", 1)
+            names = HOSPITALS.get(city, [])
+            self._send(200, [
+                {"display_name": f"{name}, {city.title()}", "lat": "0.0", "lon": "0.0"} for name in names
+            ])
+        else:
+            self._send(404, {})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstream:
+    def __init__(self, delay=0.0, failures=0, fail_status=503, capacity=0):
+        self.delay = delay
+        self.slots = threading.Semaphore(capacity) if capacity > 0 else None
+        self.failures = failures
+        self.fail_status = fail_status
+        self.connections = 0
+        self.requests = Counter()
+        self.queries = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.openfda_url = f"{self.base_url}/drug/label.json"
+        self.nominatim_url = f"{self.base_url}/search"
+
+    def record(self, path, query):
+        with self._lock:
+            self.requests[path] += 1
+            self.queries.append((path, query))
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def take_failure(self):
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                return True
+            return False
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.requests.clear()
+            self.queries.clear()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
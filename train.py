@@ -1,52 +1,43 @@
-import json
-import nltk
+import argparse
+import os
 import pickle
+import time
 import numpy as np
-from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
+from preprocessing import download_nltk_data
+from knowledge_base import INTENTS_SOURCE, RESPONSES_DB, ResponseStore, build_store, iter_intents
+from model_bundle import clear_current, export_bundle
+import hierarchical
+import incremental
 
-# Initialize Lemmatizer
-lemmatizer = WordNetLemmatizer()
-
-def download_nltk_data():
-    """Download necessary NLTK data."""
-    try:
-        nltk.data.find('tokenizers/punkt')
-        nltk.data.find('tokenizers/punkt_tab')
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        print("Downloading NLTK data...")
-        nltk.download('punkt')
-        nltk.download('punkt_tab')
-        nltk.download('wordnet')
-
-def preprocess_text(text):
-    """Tokenize and lemmatize text."""
-    tokens = nltk.word_tokenize(text)
-    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
-
-def train_model():
-    download_nltk_data()
-
-    # Load Intents
-    with open('intents.json', 'r') as file:
-        data = json.load(file)
+# C values tried by --search
+SEARCH_GRID = {"estimator__C": [0.1, 0.3, 1.0, 3.0, 10.0]}
+# Responses are staged here until the model is saved next to them
+STAGED_RESPONSES = os.path.join(incremental.CACHE_DIR, RESPONSES_DB)
 
+def load_corpus(intents, pattern_cache, jobs=1, responses_path=STAGED_RESPONSES):
+    """
+    Returns (preprocessed patterns, tags) from an iterable of intents, streaming
+    their responses into a SQLite store at responses_path instead of keeping them.
+    """
     patterns = []
     tags = []
-    tag_map = {}
 
-    print("Processing data...")
-    for intent in data['intents']:
-        for pattern in intent['patterns']:
-            # Create a corpus of patterns
-            patterns.append(preprocess_text(pattern))
-            tags.append(intent['tag'])
-        
-        tag_map[intent['tag']] = intent['responses']
+    def collect():
+        for intent in intents:
+            for pattern in intent['patterns']:
+                # Create a corpus of patterns
+                patterns.append(pattern)
+                tags.append(intent['tag'])
+            yield intent
 
+    os.makedirs(os.path.dirname(responses_path) or ".", exist_ok=True)
+    build_store(collect(), responses_path)
+    return pattern_cache.preprocess_many(patterns, jobs), tags
+
+def train_full(patterns, tags, jobs=1, search=False, two_stage=False):
     # Vectorization (TF-IDF)
     # n-gram range (1,2) allows the model to capture phrases like "near me" or "chest pain"
     vectorizer = TfidfVectorizer(ngram_range=(1, 2))
@@ -54,19 +45,56 @@ def train_model():
     y = tags
 
     # Train Model
-    print("Training model...")
     from sklearn.svm import LinearSVC
     from sklearn.calibration import CalibratedClassifierCV
 
     # Train Model
     print("Training model...")
-    # Use LinearSVC for better performance on text data, with probability calibration
-    svc = LinearSVC()
-    model = CalibratedClassifierCV(svc, method='sigmoid')
-    model.fit(X, y)
+    # Use LinearSVC for better performance on text data, with probability calibration.
+    # A fixed random_state makes the folds fit identically in any process, so n_jobs doesn't change the model.
+    svc = LinearSVC(random_state=0)
+    if two_stage:
+        # Same calibrated SVC for the family stage and every per-family stage
+        model = hierarchical.fit(X, y, lambda: CalibratedClassifierCV(LinearSVC(random_state=0), method='sigmoid', n_jobs=jobs))
+        return model, vectorizer
+    if not search:
+        model = CalibratedClassifierCV(svc, method='sigmoid', n_jobs=jobs)
+        model.fit(X, y)
+        return model, vectorizer
+
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+    # Parallelize the outer search; each candidate fits its calibration folds serially
+    grid = GridSearchCV(CalibratedClassifierCV(svc, method='sigmoid'), SEARCH_GRID,
+                        cv=StratifiedKFold(n_splits=3), n_jobs=jobs)
+    grid.fit(X, y)
+    print(f"Best parameters {grid.best_params_} (cross-validated accuracy {grid.best_score_:.2f})")
+    return grid.best_estimator_, vectorizer
+
+def train_model(incremental_mode=False, jobs=1, search=False, intents=INTENTS_SOURCE, two_stage=False):
+    start = time.perf_counter()
+    download_nltk_data()
+
+    print(f"Processing data from {intents}...")
+    pattern_cache = incremental.PatternCache()
+    patterns, tags = load_corpus(iter_intents(intents), pattern_cache, jobs)
+    pattern_cache.save()
+    print(f"Preprocessed {pattern_cache.misses} new pattern(s), {pattern_cache.hits} from cache.")
+
+    if incremental_mode:
+        model, vectorizer, state, report = incremental.train(patterns, tags, incremental.load_state())
+        if report["mode"] == "full":
+            print(f"Full incremental refit ({report['reason']}).")
+        elif not report["added"]:
+            print("No pattern changes; model unchanged.")
+        else:
+            print(f"Updated model with {report['added']} new pattern(s), "
+                  f"{report['trained_on']} sample(s) including replay.")
+        incremental.save_state(state)
+    else:
+        model, vectorizer = train_full(patterns, tags, jobs, search, two_stage)
 
     # Evaluate (simple check on training data)
-    score = model.score(X, y)
+    score = model.score(vectorizer.transform(patterns), tags)
     print(f"Model trained with accuracy on training set: {score:.2f}")
 
     # Save Artifacts
@@ -76,11 +104,35 @@ def train_model():
     
     with open('vectorizer.pkl', 'wb') as f:
         pickle.dump(vectorizer, f)
-    
-    with open('tag_map.pkl', 'wb') as f:
-        pickle.dump(tag_map, f)
 
-    print("Training complete! Run 'chat.py' to talk to the bot.")
+    os.replace(STAGED_RESPONSES, RESPONSES_DB)
+    tag_map = ResponseStore(RESPONSES_DB)
+
+    # Bundle for serving (memory-mapped arrays its loader reads without sklearn)
+    try:
+        version = export_bundle(model, vectorizer, tag_map)
+        print(f"Exported model bundle {version}.")
+    except ValueError as e:
+        print(f"Skipped model bundle export: {e}")
+        # An older bundle would otherwise shadow the pickles we just wrote
+        if clear_current():
+            print("Serving will load the pickles instead of the previous bundle.")
+
+    print(f"Training complete in {time.perf_counter() - start:.1f}s! Run 'chat.py' to talk to the bot.")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the intent classifier from intents.json.")
+    parser.add_argument("--intents", default=INTENTS_SOURCE,
+                        help="intents.json, a JSON Lines file or a directory of intent files")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update a hashed-feature SGD model with only the changed patterns")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Processes for preprocessing, calibration folds and --search (-1 for all cores)")
+    parser.add_argument("--search", action="store_true", help="Grid-search the LinearSVC C parameter")
+    parser.add_argument("--hierarchical", action="store_true",
+                        help="Train a family model plus one model per intent family (for large tag sets)")
+    args = parser.parse_args()
+    if args.hierarchical and (args.incremental or args.search):
+        parser.error("--hierarchical can't be combined with --incremental or --search")
+    train_model(incremental_mode=args.incremental, jobs=args.jobs, search=args.search, intents=args.intents,
+                two_stage=args.hierarchical)
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+import admission
+import app
+import integrations
+import metrics
+from admission import Gate, Rejected
+from stub_upstream import StubUpstream
+from checks import check, report
+
+def rejection(fn, *args):
+    """Returns (Rejected or None, seconds taken) for one call."""
+    start = time.perf_counter()
+    try:
+        fn(*args)
+        return None, time.perf_counter() - start
+    except Rejected as e:
+        return e, time.perf_counter() - start
+
+def queue_in_thread(route, request_timeout, order):
+    """Starts a thread that queues on `route`, records its admission in `order` and leaves at once."""
+    def run():
+        try:
+            with admission.admit(route, "10.0.0.9", request_timeout):
+                order.append(threading.current_thread().name)
+        except Rejected as e:
+            order.append(e.cause)
+    thread = threading.Thread(target=run, name=f"waiter-{len(order)}-{time.perf_counter()}")
+    thread.start()
+    return thread
+
+def wait_for_waiters(gate, n):
+    while len(gate._waiters) < n:
+        time.sleep(0.005)
+
+async def async_gate_checks():
+    gate = Gate("async", limit=1, queue_size=4)
+    await gate.enter_async(time.monotonic() + 1)
+    second = asyncio.ensure_future(gate.enter_async(time.monotonic() + 1))
+    cancelled = asyncio.ensure_future(gate.enter_async(time.monotonic() + 1))
+    await asyncio.sleep(0.01)
+    queued = not second.done() and len(gate._waiters) == 2
+    cancelled.cancel()
+    await asyncio.sleep(0.01)
+    gate.leave()
+    await asyncio.wait_for(second, 1)
+    handed_over = gate.active == 1 and not gate._waiters
+    gate.leave()
+    expired = None
+    await gate.enter_async(time.monotonic() + 1)
+    try:
+        await gate.enter_async(time.monotonic() + 0.05)
+    except Rejected as e:
+        expired = e.cause
+    gate.leave()
+    return queued and handed_over, expired == "deadline" and gate.active == 0
+
+def main():
+    admission.configure(limit=2, queue_size=2, client_rate=0)
+    metrics.reset()
+
+    # Past the limit and the queue, requests are rejected without waiting
+    held = [admission.admit("test", "10.0.0.1"), admission.admit("test", "10.0.0.1")]
+    gate = admission.gate("test")
+    order = []
+    waiters = []
+    for i in range(2):
+        waiters.append(queue_in_thread("test", None, order))
+        wait_for_waiters(gate, i + 1)
+    e, elapsed = rejection(admission.admit, "test", "10.0.0.1")
+    check(f"full queue answers 503 at once ({elapsed * 1e3:.1f}ms)",
+          e is not None and e.status == 503 and e.cause == "queue_full" and elapsed < 0.05)
+
+    # Released slots go to the queue in arrival order
+    names = [t.name for t in waiters]
+    held[0].release()
+    for t in waiters:
+        t.join(2)
+    held[1].release()
+    check("freed slots are handed to waiters first-come first-served", order == names and gate.active == 0)
+
+    # A request still queued at its deadline gives up
+    held = [admission.admit("test", "10.0.0.1"), admission.admit("test", "10.0.0.1")]
+    e, elapsed = rejection(admission.admit, "test", "10.0.0.1", "0.1")
+    check(f"queued request past its X-Request-Timeout is rejected ({elapsed * 1e3:.0f}ms)",
+          e is not None and e.cause == "deadline" and 0.09 < elapsed < 0.5 and not gate._waiters)
+    for ticket in held:
+        ticket.release()
+    check("slots are all returned", gate.active == 0 and gate.stats()["admitted"] == 6)
+
+    queued_ok, expired_ok = asyncio.run(async_gate_checks())
+    check("asyncio waiters queue, and a cancelled waiter leaves the queue", queued_ok)
+    check("asyncio waiters are rejected at their deadline", expired_ok)
+
+    # Per-client rate limiting
+    admission.configure(limit=2, queue_size=2, client_rate=1, client_burst=3)
+    for _ in range(3):
+        admission.admit("test", "10.0.0.1").release()
+    e, _ = rejection(admission.admit, "test", "10.0.0.1")
+    other, _ = rejection(lambda: admission.admit("test", "10.0.0.2").release())
+    check("a client over its rate gets 429, others don't",
+          e is not None and e.status == 429 and e.retry_after >= 1 and other is None)
+
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_local_index(mode="live")
+        integrations.configure_clients(limiter=False)
+        integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+        admission.configure(limit=1, queue_size=4, client_rate=0)
+
+        with admission.admit("get_response", "10.0.0.1"):
+            reply = app.get_bot_response("Find hospitals in Boston")
+        check("an idle route still runs its lookups",
+              "Massachusetts General Hospital" in reply and stub.requests["/search"] == 1)
+
+        # While requests queue behind this one, it answers without calling Nominatim
+        order = []
+        with admission.admit("get_response", "10.0.0.1"):
+            waiter = queue_in_thread("get_response", None, order)
+            wait_for_waiters(admission.gate("get_response"), 1)
+            reply = app.get_bot_response("Find hospitals in Boston")
+        waiter.join(2)
+        check("a saturated route sheds the lookup for the static reply",
+              reply.startswith(app.SHED_NOTE) and "Massachusetts" not in reply and stub.requests["/search"] == 1)
+        check("replies that need no lookup are unchanged under load",
+              not app.shed_lookup(("greeting", None, "Hi!"), app.registry.current)[2].startswith(app.SHED_NOTE))
+
+        # Too little budget left for an upstream call
+        with admission.admit("get_response", "10.0.0.1", "0.3"):
+            reply = app.get_bot_response("Tell me about advil")
+        check("a request near its deadline sheds the lookup",
+              reply.startswith(app.SHED_NOTE) and stub.requests["/drug/label.json"] == 0)
+
+    # The deadline bounds a lookup's whole upstream call, retries and backoff included
+    with StubUpstream(delay=3.0) as stub:
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_clients(limiter=False, retries=2, backoff_factor=0.01)
+        with admission.admit("get_response", "10.0.0.1", "2"):
+            start = time.perf_counter()
+            info = integrations.fetch_hospitals("Boston")
+            elapsed = time.perf_counter() - start
+        check(f"a slow upstream is abandoned at the deadline ({elapsed:.2f}s, {stub.requests['/search']} call(s))",
+              "error" in info and elapsed < 2.2 and stub.requests["/search"] == 1)
+
+    with StubUpstream(delay=0.3, failures=100) as stub:
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_clients(limiter=False, retries=5, backoff_factor=0.1)
+        with admission.admit("get_response", "10.0.0.1", "1"):
+            start = time.perf_counter()
+            info = integrations.fetch_hospitals("Boston")
+            elapsed = time.perf_counter() - start
+        check(f"failing upstream is retried only while the budget lasts ({elapsed:.2f}s, "
+              f"{stub.requests['/search']} of 6 calls)",
+              "error" in info and elapsed < 1.15 and 2 <= stub.requests["/search"] < 6)
+    check("sheds are counted per route and reason",
+          metrics.shed.value("test", "queue_full") == 1 and metrics.shed.value("test", "rate_limited") == 1
+          and metrics.shed.value("get_response", "lookup") == 2)
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import pickle
+import time
+import numpy as np
+from preprocessing import preprocess_text
+from compiled_model import compile_model
+from checks import check, report
+
+TOLERANCE = 1e-9
+REPEATS = 2000
+
+extra_queries = [
+    "head hurt",
+    "feel bad",
+    "wrongqueryblah",
+    "is advil safe?",
+    "my kid has a high temp",
+]
+
+def time_single_message(predict_proba, vectorized):
+    start = time.perf_counter()
+    for i in range(REPEATS):
+        predict_proba(vectorized[i % vectorized.shape[0]])
+    return (time.perf_counter() - start) / REPEATS * 1e6
+
+def main():
+    with open('chat_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open('vectorizer.pkl', 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open('intents.json', 'r') as f:
+        intents = json.load(f)['intents']
+
+    compiled = compile_model(model)
+
+    messages = [pattern for intent in intents for pattern in intent['patterns']] + extra_queries
+    vectorized = vectorizer.transform([preprocess_text(m) for m in messages])
+
+    expected = model.predict_proba(vectorized)
+    actual = compiled.predict_proba(vectorized)
+    max_diff = np.abs(expected - actual).max()
+
+    same_classes = list(compiled.classes_) == list(model.classes_)
+    same_predictions = (model.predict(vectorized) == compiled.predict(vectorized)).all()
+    check(f"{len(messages)} messages, {compiled.n_folds} folds x {compiled.n_classes} classes, "
+          f"max |diff| = {max_diff:.2e}", same_classes and same_predictions and max_diff <= TOLERANCE)
+
+    sklearn_us = time_single_message(model.predict_proba, vectorized)
+    compiled_us = time_single_message(compiled.predict_proba, vectorized)
+    print(f"predict_proba per message: sklearn {sklearn_us:.1f} us, "
+          f"compiled {compiled_us:.1f} us ({sklearn_us / compiled_us:.1f}x faster)")
+
+    start = time.perf_counter()
+    model.predict_proba(vectorized)
+    sklearn_batch_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    compiled.predict_proba(vectorized)
+    compiled_batch_ms = (time.perf_counter() - start) * 1e3
+    print(f"predict_proba for all {len(messages)} messages: sklearn {sklearn_batch_ms:.2f} ms, "
+          f"compiled {compiled_batch_ms:.2f} ms")
+    report()
+
+if __name__ == "__main__":
+    main()
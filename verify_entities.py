@@ -0,0 +1,41 @@
+from entities import Gazetteer, find_city, find_drug
+from checks import check, report
+
+def main():
+    drugs = {
+        "Is Advil safe?": "Advil",
+        "Tell me about Aspirin": "Aspirin",
+        "what is paracetamol used for": "Acetaminophen",
+        "side effects of advill": "Advil",
+        "can I take ibuprofin with food": "Ibuprofen",
+        "info on z-pak": "Azithromycin",
+        "tell me about foozle": None,
+        "is it safe to take this": None,
+    }
+    for message, expected in drugs.items():
+        actual = find_drug(message)
+        check(f"drug in '{message}' -> {actual}", actual == expected)
+
+    cities = {
+        "Hospitals in Boston": "Boston",
+        "find a hospital near paris please": "Paris",
+        "clinics in New York City": "New York",
+        "hospital in Londn": "London",
+        "hospitals in st. louis": "St Louis",
+        "hospitals near me": None,
+        "I'm quite chilly in here": None,
+    }
+    for message, expected in cities.items():
+        actual = find_city(message)
+        check(f"city in '{message}' -> {actual}", actual == expected)
+
+    gazetteer = Gazetteer([("york", None), ("new york", None), ("new york city", "NYC")])
+    check("longest match wins at the earliest position",
+          gazetteer.find("from new york city to york") == "NYC" and gazetteer.find("new york") == "new york")
+    ambiguous = Gazetteer([("tramadol", None), ("trimadol", None)])
+    check("ambiguous typos are not guessed", ambiguous.find("tremadol") is None)
+
+    report()
+
+if __name__ == "__main__":
+    main()
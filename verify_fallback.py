@@ -1,7 +1,9 @@
+import os
 import requests
 import json
 
-url = "http://127.0.0.1:5000/get_response"
+# Point at another server with MEDIBOT_URL=http://host:port
+url = os.environ.get("MEDIBOT_URL", "http://127.0.0.1:5000").rstrip("/") + "/get_response"
 headers = {"Content-Type": "application/json"}
 
 queries = [
@@ -0,0 +1,91 @@
+import pickle
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from featurizer import FusedFeaturizer
+from intent_cache import load_patterns
+from model_bundle import BundleVectorizer, vectorizer_settings
+from preprocessing import preprocess_text
+from checks import check, report
+
+EXTRA_MESSAGES = [
+    "", "   ", "!!!", "I can't breathe and I don't know why", "It's my kid's fever, 39.5°C",
+    "HOSPITALS IN BOSTON!!", "tell me about ibuprofen/advil", "Ça va? J'ai mal à la tête",
+    "xyzzy plugh", "headache headache headache", "near me near me",
+]
+
+def mismatches(featurizer, vectorizer, messages):
+    """Messages whose fused row differs from vectorizer.transform([preprocess_text(m)])."""
+    expected = vectorizer.transform([preprocess_text(m) for m in messages])
+    fused = featurizer.transform(messages)
+    bad = []
+    for i, message in enumerate(messages):
+        a, b = expected[i], fused[i]
+        a.sort_indices()
+        if list(a.indices) != list(b.indices) or not np.allclose(a.data, b.data, rtol=1e-12, atol=0):
+            bad.append(message)
+    return bad
+
+def main():
+    with open("vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    patterns = load_patterns()
+    messages = patterns + [p.upper() for p in patterns[:50]] + EXTRA_MESSAGES
+
+    featurizer = FusedFeaturizer.from_vectorizer(vectorizer)
+    bad = mismatches(featurizer, vectorizer, messages)
+    for message in bad[:5]:
+        print(f"       '{message}'")
+    check(f"fused rows match the sklearn pipeline for {len(messages) - len(bad)}/{len(messages)} messages "
+          f"({len(patterns)} intents.json patterns)", not bad)
+
+    # The bundle vectorizer serves the same vocabulary without sklearn
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    bundled = BundleVectorizer(terms, vectorizer.idf_, **vectorizer_settings(vectorizer))
+    check("built from a bundle vectorizer it matches too",
+          not mismatches(FusedFeaturizer.from_vectorizer(bundled), bundled, messages))
+
+    # Features are the intent-cache key: the multiset of vocabulary terms
+    analyze = vectorizer.build_analyzer()
+    same_keys = all(
+        sorted(terms[i] for i in featurizer.features(m))
+        == sorted(t for t in analyze(preprocess_text(m)) if t in vectorizer.vocabulary_)
+        for m in messages)
+    check("features() lists every vocabulary term occurrence", same_keys)
+
+    # One batch equals the stacked single rows
+    batch = featurizer.transform(messages)
+    singles = [featurizer.transform([m]) for m in messages]
+    check("batched rows equal per-message rows",
+          all((batch[i] != singles[i]).nnz == 0 for i in range(len(messages))))
+
+    # Other TfidfVectorizer settings the bundle format supports
+    processed = [preprocess_text(p) for p in patterns]
+    for settings in ({"ngram_range": (1, 1)}, {"ngram_range": (2, 3)}, {"ngram_range": (1, 2), "sublinear_tf": True},
+                     {"ngram_range": (1, 2), "binary": True, "norm": "l1"}, {"norm": None, "min_df": 2}):
+        variant = TfidfVectorizer(**settings).fit(processed)
+        bad = mismatches(FusedFeaturizer.from_vectorizer(variant), variant, messages)
+        check(f"parity with TfidfVectorizer({settings})", not bad)
+
+    # Unsupported vectorizers are refused rather than approximated
+    try:
+        FusedFeaturizer.from_vectorizer(TfidfVectorizer(stop_words="english").fit(processed))
+        refused = False
+    except ValueError:
+        refused = True
+    check("stop-word vectorizers are rejected", refused)
+
+    start = time.perf_counter()
+    for m in patterns:
+        vectorizer.transform([preprocess_text(m)])
+    sklearn_us = (time.perf_counter() - start) / len(patterns) * 1e6
+    start = time.perf_counter()
+    for m in patterns:
+        featurizer.transform([m])
+    fused_us = (time.perf_counter() - start) / len(patterns) * 1e6
+    print(f"       warm per-message: {sklearn_us:.1f}µs sklearn pipeline vs {fused_us:.1f}µs fused")
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import json
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.svm import LinearSVC
+from compiled_model import compile_model
+from preprocessing import preprocess_text
+import hierarchical
+from checks import check, report
+
+TOLERANCE = 1e-9
+
+def calibrated_svc():
+    return CalibratedClassifierCV(LinearSVC(random_state=0), method='sigmoid')
+
+def main():
+    with open('intents.json', 'r') as f:
+        intents = json.load(f)['intents']
+    patterns = [preprocess_text(p) for intent in intents for p in intent['patterns']]
+    tags = [intent['tag'] for intent in intents for _ in intent['patterns']]
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2))
+    X = vectorizer.fit_transform(patterns)
+    flat = calibrated_svc().fit(X, tags)
+    model = hierarchical.fit(X, tags, calibrated_svc)
+
+    check("classes match the flat model", list(model.classes_) == list(flat.classes_))
+    probabilities = model.predict_proba(X)
+    check("rows are probability distributions", np.allclose(probabilities.sum(axis=1), 1.0))
+    flat_accuracy = flat.score(X, tags)
+    accuracy = model.score(X, tags)
+    check(f"training accuracy {accuracy:.2f} within 0.05 of flat {flat_accuracy:.2f}", accuracy >= flat_accuracy - 0.05)
+
+    compiled = compile_model(model)
+    max_diff = np.abs(compiled.predict_proba(X) - probabilities).max()
+    check(f"compiled stages match sklearn (max |diff| = {max_diff:.2e})", max_diff <= TOLERANCE)
+
+    # With every family in the beam, the result is the exact product of the two stages
+    model.beam = len(model.family_model.classes_)
+    family_probs = model.family_model.predict_proba(X[:1])[0]
+    expected = {}
+    for f, family in enumerate(model.family_model.classes_):
+        stage = model.tag_models[family]
+        if stage is None:
+            tag = next(t for t, name in model.families.items() if name == family)
+            expected[tag] = family_probs[f]
+        else:
+            for tag, p in zip(stage.classes_, stage.predict_proba(X[:1])[0]):
+                expected[tag] = family_probs[f] * p
+    row = model.predict_proba(X[:1])[0]
+    check("full beam equals P(family) * P(tag | family)",
+          all(abs(row[i] - expected[tag]) <= TOLERANCE for i, tag in enumerate(model.classes_)))
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import pickle
+import tempfile
+import time
+from knowledge_base import iter_intents
+from model_bundle import export_bundle
+from model_registry import ModelRegistry
+from checks import check, report
+
+def main():
+    with open('chat_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open('vectorizer.pkl', 'rb') as f:
+        vectorizer = pickle.load(f)
+    tag_map = {intent['tag']: intent['responses'] for intent in iter_intents()}
+
+    root = tempfile.mkdtemp()
+    first = export_bundle(model, vectorizer, tag_map, root=root)
+    registry = ModelRegistry(bundle_dir=root)
+    check("initial load", registry.reload() and registry.version == first)
+
+    # A request that started on the first version keeps its generation
+    in_flight = registry.current
+    retrained = dict(tag_map, greeting=["Hi there! (retrained)"])
+    second = export_bundle(model, vectorizer, retrained, root=root)
+    swapped = registry.reload()
+    check("new bundle is swapped in", swapped and registry.version == second != first)
+    check("in-flight request still sees the old generation",
+          in_flight.version == first and in_flight.tag_map["greeting"] == tag_map["greeting"])
+    check("reloading the same version is a no-op", not registry.reload())
+
+    # A broken bundle is rejected and the current model keeps serving
+    export_bundle(model, vectorizer, {}, root=root)
+    check("invalid bundle is rejected", not registry.reload() and registry.version == second)
+    check(f"rejection reason is reported: {registry.last_error}", "tag_map" in (registry.last_error or ""))
+
+    # The watcher picks up a new CURRENT pointer on its own
+    registry.start_watching(interval=0.05)
+    third = export_bundle(model, vectorizer, dict(tag_map, thanks=["Anytime!"]), root=root)
+    deadline = time.monotonic() + 5
+    while registry.version != third and time.monotonic() < deadline:
+        time.sleep(0.05)
+    registry.stop_watching()
+    check("watcher hot-reloads a newly exported bundle", registry.version == third)
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import httpx
+import integrations
+from http_client import AsyncUpstreamClient, CircuitBreaker
+from stub_upstream import StubUpstream
+from checks import check, report
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+def fresh(stub, **client_settings):
+    """Points uncached integrations at a clean stub with the given client settings."""
+    stub.reset()
+    stub.delay = 0.0
+    stub.failures = 0
+    integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+    client_settings.setdefault("limiter", False)
+    integrations.configure_clients(**client_settings)
+
+def half_open_probe(handler, cancel_after=None, **kwargs):
+    """Sends an async half-open probe through `handler`; returns the breaker afterwards."""
+    breaker = CircuitBreaker("probe", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = AsyncUpstreamClient("probe", retries=0, breaker=breaker, limiter=False)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def probe():
+        try:
+            await asyncio.wait_for(client.get("http://upstream/", **kwargs), cancel_after)
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            pass
+        await client.aclose()
+
+    asyncio.run(probe())
+    return breaker
+
+async def slow(request):
+    await asyncio.sleep(1)
+    return httpx.Response(200)
+
+def main():
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+
+        # Keep-alive: many lookups share one pooled connection
+        fresh(stub)
+        for _ in range(20):
+            integrations.get_drug_info("advil")
+        check(f"20 lookups reused pooled connections ({stub.connections} opened)", stub.connections == 1)
+
+        # Read timeout bounds a slow upstream
+        fresh(stub, read_timeout=0.2, retries=0)
+        stub.delay = 1.0
+        info, elapsed = timed(integrations.get_drug_info, "advil")
+        check(f"slow upstream times out in {elapsed:.2f}s", not info["found"] and "error" in info and elapsed < 0.8)
+
+        # Bounded retry with backoff recovers from transient failures
+        fresh(stub, retries=2, backoff_factor=0.01)
+        stub.failures = 2
+        info = integrations.get_hospitals("boston")
+        check("two 503s are retried to success", info["found"] and stub.requests["/search"] == 3)
+
+        fresh(stub, retries=1, backoff_factor=0.01)
+        stub.failures = 5
+        info = integrations.get_hospitals("boston")
+        check("retries are bounded", not info["found"] and "error" in info and stub.requests["/search"] == 2)
+
+        # Circuit breaker fails fast while the upstream is unhealthy, then recovers
+        fresh(stub, retries=0, breaker=CircuitBreaker("openfda", failure_threshold=3, reset_timeout=0.3))
+        stub.failures = 100
+        for _ in range(3):
+            integrations.get_drug_info("advil")
+        info, elapsed = timed(integrations.get_drug_info, "advil")
+        check("open circuit fails fast without calling upstream",
+              info == {"found": False, "error": "openfda circuit is open"} and stub.requests["/drug/label.json"] == 3)
+        check(f"fail-fast answer took {elapsed * 1e3:.2f}ms", elapsed < 0.01)
+
+        stub.failures = 0
+        time.sleep(0.35)
+        info = integrations.get_drug_info("advil")
+        check("half-open probe closes the circuit again",
+              info["found"] and integrations.openfda_client.breaker.state == CircuitBreaker.CLOSED)
+
+    # Async probes that end in a non-transport error or are cancelled don't hold the probe slot
+    redirected = half_open_probe(lambda request: httpx.Response(302, headers={"Location": "/"}), follow_redirects=True)
+    undecodable = half_open_probe(lambda request: httpx.Response(200, headers={"Content-Encoding": "gzip"},
+                                                                 content=b"not gzip"))
+    check("async redirect loops and decoding errors count as failures",
+          all(b.state == CircuitBreaker.OPEN and b.failures == 2 and not b._probe_in_flight
+              for b in (redirected, undecodable)))
+    cancelled = half_open_probe(slow, cancel_after=0.05)
+    check("a cancelled async probe is released", cancelled.allow_request())
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import integrations
+from cache import MemoryBackend, SQLiteBackend, TTLCache
+from stub_upstream import StubUpstream
+from checks import check, report
+
+def main():
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        # Every lookup should reach the stub, even if a local index was built
+        integrations.configure_local_index(mode="live")
+
+        # Fresh hits and key normalization
+        integrations.configure_cache()
+        first = integrations.get_drug_info("Advil")
+        second = integrations.get_drug_info("  advil ")
+        check("drug lookup is served from the stub", first["found"] and "Ibuprofen" in first["warnings"])
+        check("normalized repeat is a cache hit", stub.requests["/drug/label.json"] == 1)
+        check("caller's spelling is kept in the result", second["name"] == "  advil ")
+
+        integrations.get_hospitals("Boston")
+        integrations.get_hospitals("boston")
+        check("hospital repeat is a cache hit", stub.requests["/search"] == 1)
+
+        # Negative results are cached too
+        integrations.get_drug_info("notadrug")
+        missing = integrations.get_drug_info("NotADrug")
+        check("negative result is cached", not missing["found"] and stub.requests["/drug/label.json"] == 2)
+
+        # Stale entries are served while a background refresh runs
+        stub.reset()
+        integrations.configure_cache(ttl=0.2, negative_ttl=0.2, stale_ttl=60)
+        integrations.get_drug_info("aspirin")
+        time.sleep(0.3)
+        stale = integrations.get_drug_info("aspirin")
+        time.sleep(0.2)
+        stats = integrations.drug_cache.stats()
+        check("stale entry is returned immediately", stale["found"] and stats["stale_hits"] == 1)
+        check("background refresh re-fetched once", stub.requests["/drug/label.json"] == 2)
+
+        # Expired past the stale window means a blocking fetch
+        stub.reset()
+        integrations.configure_cache(ttl=0.1, negative_ttl=0.1, stale_ttl=0.1)
+        integrations.get_hospitals("paris")
+        time.sleep(0.3)
+        integrations.get_hospitals("paris")
+        check("entry past the stale window is re-fetched", stub.requests["/search"] == 2)
+
+        # SQLite backend survives a new cache instance (e.g. a restart)
+        stub.reset()
+        path = os.path.join(tempfile.mkdtemp(), "integrations_cache.db")
+        integrations.configure_cache(SQLiteBackend(path))
+        integrations.get_hospitals("London")
+        integrations.configure_cache(SQLiteBackend(path))
+        cached = integrations.get_hospitals("london")
+        check("SQLite backend persists across instances", cached["found"] and stub.requests["/search"] == 1)
+
+        print(f"Cache stats: {integrations.cache_stats()}")
+
+    # Hit/miss counters stay exact when request threads look up at the same time
+    cache = TTLCache("threads", MemoryBackend())
+    cache.get_or_fetch("key", lambda: {"found": True})
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=lambda: [cache.get_or_fetch("key", dict) for _ in range(5000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(interval)
+    stats = cache.stats()
+    check(f"8 threads x 5000 lookups counted {stats['hits']} hits", stats["hits"] == 40000 and stats["misses"] == 1)
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import numpy as np
+import app
+from intent_cache import load_patterns
+from model_registry import LoadedModel
+from checks import check, report
+
+def main():
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    cached = app.registry.current
+    uncached = LoadedModel(cached.model, cached.vectorizer, cached.tag_map, cached.version)
+
+    # Patterns, trivially different repeats and messages the model has never seen
+    messages = load_patterns()
+    messages += [m.upper() for m in messages[:20]] + [f"  {m}  " for m in messages[:20]]
+    messages += ["I twisted my ankle", "xyzzy plugh", "my kid has a high temp", "Tell me about Ibuprofen"]
+
+    mismatches = 0
+    for message in messages * 2:  # second pass is served from the runtime LRU
+        # The reference has no featurizer either, so it runs preprocess_text + vectorizer.transform
+        (tags, probs), = app.classify_processed([app.preprocess_message(message, cached)], cached)
+        (ref_tags, ref_probs), = app.classify_processed([app.preprocess_message(message, uncached)], uncached)
+        if list(tags) != list(ref_tags) or not np.allclose(probs, ref_probs):
+            mismatches += 1
+            print(f"       '{message}': {list(tags)} != {list(ref_tags)}")
+    check(f"cached top-k matches the model for {len(messages) * 2 - mismatches}/{len(messages) * 2} lookups",
+          not mismatches)
+
+    stats = cached.intent_cache.stats()
+    print(f"Intent cache: {stats}")
+    check("training patterns and repeats never reach the model",
+          stats["misses"] <= len(messages) - len(load_patterns()))
+
+    # Entity intents still extract from the raw message
+    tag, entity, reply = app.classify_message("Tell me about Aspirin", cached)
+    check(f"drug lookup from a cached pattern still extracts '{entity}'",
+          tag == "drug_lookup" and entity == "Aspirin" and reply is None)
+    report()
+
+if __name__ == "__main__":
+    main()
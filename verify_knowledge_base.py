@@ -0,0 +1,53 @@
+import os
+import tempfile
+import threading
+from knowledge_base import ResponseStore, build_store, convert, iter_intents
+from checks import check, report
+
+def main():
+    intents = list(iter_intents('intents.json'))
+    tmp = tempfile.mkdtemp()
+
+    # Every source layout streams the same intents in the same order
+    jsonl = os.path.join(tmp, 'intents.jsonl')
+    directory = os.path.join(tmp, 'intents')
+    convert('intents.json', jsonl)
+    convert('intents.json', directory)
+    check("JSON Lines source matches intents.json", list(iter_intents(jsonl)) == intents)
+    by_tag = sorted(intents, key=lambda intent: intent['tag'])
+    check("directory source matches intents.json", sorted(iter_intents(directory), key=lambda i: i['tag']) == by_tag)
+
+    path = os.path.join(tmp, 'responses.db')
+    count = build_store(iter_intents(jsonl), path)
+    store = ResponseStore(path, hot_tags=4)
+    expected = {intent['tag']: intent['responses'] for intent in intents}
+    check(f"store holds {count} intents", count == len(intents) == len(store))
+    check("responses round-trip in order", all(store[tag] == responses for tag, responses in expected.items()))
+    check("membership and iteration", all(tag in store for tag in expected) and "no_such_tag" not in store
+          and list(store) == sorted(expected))
+    check("unknown tags return the default", store.get("no_such_tag", ["fallback"]) == ["fallback"])
+    check("hot-tag LRU stays bounded", len(store._hot) <= 4)
+
+    # Concurrent readers share one store safely
+    errors = []
+    def reader():
+        for tag in expected:
+            if store.get(tag) != expected[tag]:
+                errors.append(tag)
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check("concurrent readers see consistent responses", not errors)
+
+    # A rebuild replaces the file atomically
+    build_store([{"tag": "greeting", "responses": ["Rebuilt!"]}], path)
+    check("rebuild leaves no staging file", os.listdir(tmp).count('responses.db') == 1
+          and not any(name.endswith('.tmp') for name in os.listdir(tmp)))
+    check("new readers see the rebuilt store", ResponseStore(path)["greeting"] == ["Rebuilt!"])
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import integrations
+import metrics
+from local_index import build_index
+from stub_upstream import StubUpstream
+from checks import check, report
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "local_data.db")
+    counts = build_index([os.path.join(FIXTURES, "drug-labels.json")],
+                         [os.path.join(FIXTURES, "hospitals.osm"), os.path.join(FIXTURES, "hospitals-overpass.json")],
+                         path)
+    print(f"Built {counts}")
+    check("fixtures are indexed", counts["labels"] == 5 and counts["hospitals"] == 8 and counts["places"] == 4)
+
+    with open(os.path.join(FIXTURES, "drug-labels.json"), encoding="utf-8") as f:
+        advil_label = json.load(f)["results"][0]
+
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_cache()
+
+        integrations.configure_local_index(path, "local")
+        info = integrations.get_drug_info("Advil")
+        check("drug answer matches the live parser's dict",
+              info == integrations.parse_drug_label({"results": [advil_label]}, "Advil"))
+        check("generic names resolve to a label", integrations.get_drug_info("Ibuprofen")["found"])
+        boston = integrations.get_hospitals("boston")
+        check("hospitals tagged with the city, nearest the centre first",
+              [h["name"] for h in boston["hospitals"]][:2] == ["Massachusetts General Hospital", "Brigham and Women's Hospital"])
+        check("untagged hospitals are found near the city centre",
+              [h["name"] for h in integrations.get_hospitals("London")["hospitals"]] == ["St Thomas' Hospital"])
+        check("Overpass JSON ways use their centre", integrations.get_hospitals("Chicago")["found"])
+        check("clinics and unnamed hospitals are skipped",
+              all("Clinic" not in h["name"] for h in integrations.get_hospitals("London")["hospitals"]))
+        missing = integrations.get_drug_info("notadrug")
+        check("local mode never calls the APIs",
+              not missing["found"] and stub.requests["/drug/label.json"] == 0 and stub.requests["/search"] == 0)
+
+        integrations.configure_local_index(path, "local+live")
+        integrations.get_drug_info("Advil")
+        integrations.get_drug_info("tylenol")
+        check("local+live answers known names locally", stub.requests["/drug/label.json"] == 0)
+        integrations.configure_cache()
+        integrations.get_hospitals("Paris")
+        integrations.get_hospitals("Springfield")
+        check("local+live falls back to the API for unknown names", stub.requests["/search"] == 1)
+
+        integrations.configure_local_index(path, "live")
+        integrations.get_drug_info("Advil")
+        check("live mode ignores the index", stub.requests["/drug/label.json"] == 1)
+
+        metrics.reset()
+        integrations.configure_local_index(path + ".missing", "local+live")
+        integrations.configure_cache()
+        integrations.get_drug_info("Advil")
+        check("without an index file no local lookup is recorded",
+              metrics.integration_seconds.count("local") == 0 and metrics.integration_seconds.count("openfda") == 1)
+
+        print(f"Stats: {integrations.cache_stats()}")
+
+    # A label with an empty field is indexed with the live path's placeholder, not dropped with the whole build
+    dump = os.path.join(tempfile.mkdtemp(), "labels.json")
+    with open(dump, "w", encoding="utf-8") as f:
+        json.dump({"results": [{"openfda": {"brand_name": ["Emptyl"]}, "purpose": [], "warnings": []}, advil_label]}, f)
+    counts = build_index([dump], [], path)
+    integrations.configure_local_index(path, "local")
+    check("labels with empty purpose/warnings lists are indexed",
+          counts["labels"] == 2 and integrations.get_drug_info("Emptyl")["purpose"] == "Information not available")
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import tempfile
+import numpy as np
+import app
+import metrics
+from checks import check, report
+
+def classify(probabilities):
+    """Runs the Smart Fallback tiers on a fake top-3 distribution."""
+    tags = np.array(["greeting", "symptom_flu", "thanks"])
+    return app.resolve_intent("hello", tags, np.array(probabilities), {"greeting": ["Hi!"]})
+
+def main():
+    metrics.reset()
+
+    # Tiers follow the 0.15 / 0.35 thresholds
+    classify([0.10, 0.05, 0.05])
+    classify([0.30, 0.20, 0.10])
+    classify([0.90, 0.05, 0.05])
+    classify([0.35, 0.30, 0.10])
+    check("confidence tiers counted at the thresholds",
+          [metrics.confidence_tiers.value(t) for t in ("low", "suggest", "confident")] == [1, 1, 2])
+    check("intent counter tracks the top-1 tag", metrics.intents.value("greeting") == 4)
+
+    # Stage timers and the exposition format
+    start = metrics.now()
+    metrics.stage_done("predict", start)
+    text = metrics.render({"model_version": "test"})
+    check("histogram exposes cumulative buckets, sum and count",
+          'medibot_stage_duration_seconds_bucket{stage="predict",le="+Inf"} 1' in text
+          and 'medibot_stage_duration_seconds_count{stage="predict"} 1' in text)
+    check("model version exported as an info gauge", 'medibot_info{model_version="test"} 1' in text)
+
+    # Integration latency and errors, for sync and async fetchers
+    @metrics.timed_integration("openfda")
+    def fetch(ok):
+        return {"found": ok} if ok else {"found": False, "error": "boom"}
+
+    @metrics.timed_integration("openfda")
+    async def fetch_async(ok):
+        return {"found": ok} if ok else {"found": False, "error": "boom"}
+
+    fetch(True)
+    fetch(False)
+    asyncio.run(fetch_async(False))
+    check("integration calls and errors counted",
+          metrics.integration_seconds.count("openfda") == 3 and metrics.integration_errors.value("openfda") == 2)
+
+    # Disabled metrics record nothing
+    metrics.reset()
+    metrics.ENABLED = False
+    classify([0.90, 0.05, 0.05])
+    metrics.stage_done("predict", metrics.now())
+    check("nothing recorded while disabled",
+          metrics.confidence_tiers.value("confident") == 0 and metrics.stage_seconds.count("predict") == 0)
+    metrics.ENABLED = True
+
+    # Sampled profiles write one stage breakdown per request, without the message text
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics.PROFILE_PATH = os.path.join(tmp, "profile.jsonl")
+        metrics.PROFILE_SAMPLE_RATE = 1.0
+        with metrics.track_request("get_response"):
+            metrics.stage_done("preprocess", metrics.now())
+            classify([0.90, 0.05, 0.05])
+        metrics.PROFILE_SAMPLE_RATE = 0.0
+        with metrics.track_request("get_response"):
+            classify([0.90, 0.05, 0.05])
+        with open(metrics.PROFILE_PATH) as f:
+            samples = [json.loads(line) for line in f]
+    check("profiler samples carry stages and intent, not text",
+          len(samples) == 1 and "preprocess" in samples[0]["stages_ms"]
+          and samples[0]["intents"][0]["intent"] == "greeting" and "hello" not in json.dumps(samples))
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import json
+import pickle
+import tempfile
+import numpy as np
+from preprocessing import preprocess_text
+from model_bundle import export_bundle, load_bundle
+from checks import check, report
+
+TOLERANCE = 1e-9
+
+def main():
+    with open('chat_model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    with open('vectorizer.pkl', 'rb') as f:
+        vectorizer = pickle.load(f)
+    with open('intents.json', 'r') as f:
+        intents = json.load(f)['intents']
+    tag_map = {intent['tag']: intent['responses'] for intent in intents}
+
+    root = tempfile.mkdtemp()
+    version = export_bundle(model, vectorizer, tag_map, root=root)
+    bundle_model, bundle_vectorizer, bundle_tag_map, manifest = load_bundle(root)
+    check(f"bundle {version} loads with manifest version {manifest['model_version']}", manifest['model_version'] == version)
+
+    messages = [pattern for intent in intents for pattern in intent['patterns']]
+    messages += ["wrongqueryblah", "", "Is Advil safe? Is advil safe??"]
+    processed = [preprocess_text(m) for m in messages]
+
+    expected_X = vectorizer.transform(processed)
+    actual_X = bundle_vectorizer.transform(processed)
+    check("TF-IDF rows match sklearn", abs(expected_X - actual_X).max() <= TOLERANCE)
+
+    max_diff = np.abs(model.predict_proba(expected_X) - bundle_model.predict_proba(actual_X)).max()
+    check(f"probabilities match the pickled model (max |diff| = {max_diff:.2e})", max_diff <= TOLERANCE)
+    check("classes and tag map round-trip", list(bundle_model.classes_) == list(model.classes_)
+          and {tag: bundle_tag_map[tag] for tag in bundle_tag_map} == tag_map)
+
+    report()
+
+if __name__ == "__main__":
+    main()
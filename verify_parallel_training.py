@@ -0,0 +1,34 @@
+import json
+import numpy as np
+from preprocessing import clear_caches, preprocess_many
+from train import train_full
+from checks import check, report
+
+JOBS = 2
+
+def main():
+    with open('intents.json', 'r') as f:
+        intents = json.load(f)['intents']
+    corpus = [(intent['tag'], pattern) for intent in intents for pattern in intent['patterns']]
+    # Enough distinct patterns to actually use the process pool
+    corpus += [(tag, f"{pattern} case {i}") for i in range(1, 6) for tag, pattern in corpus]
+    texts = [pattern for _, pattern in corpus]
+    tags = [tag for tag, _ in corpus]
+
+    serial = preprocess_many(texts, jobs=1)
+    clear_caches()
+    parallel = preprocess_many(texts, jobs=JOBS, chunksize=64)
+    check(f"{len(texts)} patterns preprocessed identically with {JOBS} processes", serial == parallel)
+
+    serial_model, vectorizer = train_full(serial, tags, jobs=1)
+    parallel_model, _ = train_full(parallel, tags, jobs=JOBS)
+    repeat_model, _ = train_full(serial, tags, jobs=1)
+    X = vectorizer.transform(serial)
+    check(f"calibration folds fitted with n_jobs={JOBS} give identical probabilities",
+          np.array_equal(serial_model.predict_proba(X), parallel_model.predict_proba(X)))
+    check("two serial trainings give identical probabilities",
+          np.array_equal(serial_model.predict_proba(X), repeat_model.predict_proba(X)))
+    report()
+
+if __name__ == "__main__":
+    main()
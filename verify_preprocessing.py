@@ -0,0 +1,39 @@
+import json
+import time
+import nltk
+from nltk.stem import WordNetLemmatizer
+from preprocessing import preprocess_text, cache_stats, clear_caches
+from checks import check, report
+
+lemmatizer = WordNetLemmatizer()
+
+def reference_preprocess(text):
+    """The original uncached pipeline that train.py used."""
+    tokens = nltk.word_tokenize(text)
+    return ' '.join([lemmatizer.lemmatize(word.lower()) for word in tokens])
+
+def time_pass(messages):
+    start = time.perf_counter()
+    for msg in messages:
+        preprocess_text(msg)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+def main():
+    with open('intents.json', 'r') as f:
+        intents = json.load(f)['intents']
+    messages = [pattern for intent in intents for pattern in intent['patterns']]
+
+    mismatches = [m for m in messages if preprocess_text(m) != reference_preprocess(m)]
+    check(f"{len(messages) - len(mismatches)}/{len(messages)} patterns byte-identical", not mismatches)
+    for m in mismatches:
+        print(f"       '{m}': '{preprocess_text(m)}' != '{reference_preprocess(m)}'")
+
+    clear_caches()
+    cold_us = time_pass(messages)
+    warm_us = time_pass(messages)
+    print(f"Per message: cold {cold_us:.1f} us, warm {warm_us:.2f} us ({cold_us / warm_us:.0f}x faster)")
+    print(f"Cache stats: {cache_stats()}")
+    report()
+
+if __name__ == "__main__":
+    main()
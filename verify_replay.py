@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import numpy as np
+import app
+import replay
+from knowledge_base import iter_intents
+from checks import check, report
+
+def score(rows, jobs, chunk_size=64):
+    output = io.StringIO()
+    totals = replay.replay(rows, output, jobs, chunk_size)
+    return [json.loads(line) for line in output.getvalue().splitlines()], totals
+
+def main():
+    artifacts = replay.load_artifacts()
+    labeled = [(intent["tag"], pattern) for intent in iter_intents() for pattern in intent["patterns"]]
+
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl = os.path.join(directory, "transcript.jsonl")
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for tag, pattern in labeled:
+                f.write(json.dumps({"message": pattern, "tag": tag}) + "\n")
+            f.write("\nnot json\n" + json.dumps({"message": "  "}) + "\n")
+        path_csv = os.path.join(directory, "transcript.csv")
+        with open(path_csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["text", "tag"])
+            writer.writerows((pattern, tag) for tag, pattern in labeled)
+
+        serial, totals = score(replay.read_messages(jsonl, label_field="tag"), jobs=1)
+        parallel, _ = score(replay.read_messages(jsonl, label_field="tag"), jobs=2)
+        from_csv, _ = score(replay.read_messages(path_csv, field="text", label_field="tag"), jobs=1)
+
+    check("2 processes write the same lines as 1, in input order", serial == parallel)
+    check("every line is answered, bad lines with an error",
+          len(serial) == len(labeled) + 2 and [r["line"] for r in serial] == sorted(r["line"] for r in serial)
+          and all("error" in r for r in serial[-2:]))
+    check("CSV transcripts score the same", [r["tags"] for r in from_csv] == [r["tags"] for r in serial[:-2]])
+
+    # Same top-k and tier as the server would pick
+    expected = app.classify_processed([app.preprocess_message(m, artifacts) for _, m in labeled], artifacts)
+    same = all(list(r["tags"]) == [str(t) for t in tags] and np.allclose(r["probs"], probs, atol=1e-6)
+               and r["tier"] == replay.tier_of(probs[0], app.LOW_CONFIDENCE, app.SUGGEST_CONFIDENCE)
+               for r, (tags, probs) in zip(serial, expected))
+    check("top-k, probabilities and tier match app.py", same)
+
+    # The sweep comes from the same pass
+    cutoffs = replay.sweep(totals["counts"])
+    scored = [r for r in serial if "tier" in r]
+    at_low = next(e for e in cutoffs if e["cutoff"] == 0.15)
+    check("sweep counts match the tier column at the 0.15 cutoff",
+          at_low["below"] == sum(r["tier"] == "low" for r in scored))
+    accuracy = sum(r["tags"][0] == r["label"] for r in scored if r["probs"][0] >= 0.5) / \
+        max(1, sum(r["probs"][0] >= 0.5 for r in scored))
+    at_half = next(e for e in cutoffs if e["cutoff"] == 0.5)
+    check(f"sweep accuracy at 0.5 matches the scored lines ({accuracy:.1%})",
+          at_half["accuracy_above"] is None or abs(at_half["accuracy_above"] - accuracy) < 1e-9)
+
+    report()
+
+if __name__ == "__main__":
+    main()
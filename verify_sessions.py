@@ -0,0 +1,117 @@
+import time
+import app
+import integrations
+import sessions
+from sessions import SessionStore
+from stub_upstream import StubUpstream
+from checks import check, report
+
+SESSION = "test-session-1"
+
+classify_calls = []
+classify_message = app.classify_message
+
+def counting_classify(user_input, artifacts):
+    classify_calls.append(user_input)
+    return classify_message(user_input, artifacts)
+
+def main():
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+    app.classify_message = counting_classify
+
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_local_index(mode="live")
+        integrations.configure_clients(limiter=False)
+        # No lookup cache, so every lookup shows up at the stub
+        integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+        sessions.configure()
+
+        # A drug follow-up is answered from the stored label
+        first = app.get_bot_response("Tell me about aspirin", session_id=SESSION)
+        calls, fda = len(classify_calls), stub.requests["/drug/label.json"]
+        reply = app.get_bot_response("what about its warnings?", session_id=SESSION)
+        check("drug follow-up answers from the session", "Reye's syndrome" in first and "Reye's syndrome" in reply
+              and "Warnings" in reply)
+        check("...without the classifier or an OpenFDA request",
+              len(classify_calls) == calls and stub.requests["/drug/label.json"] == fda)
+
+        reply = app.get_bot_response("and tylenol?", session_id=SESSION)
+        check("switching drugs looks up the new drug without the classifier",
+              "Liver warning" in reply and len(classify_calls) == calls
+              and stub.requests["/drug/label.json"] == fda + 1)
+
+        # A city follow-up repeats the search for the new city
+        app.get_bot_response("Find hospitals in London", session_id=SESSION)
+        calls, searches = len(classify_calls), stub.requests["/search"]
+        reply = app.get_bot_response("and in Boston?", session_id=SESSION)
+        check("city follow-up searches the new city without the classifier",
+              "Massachusetts General Hospital" in reply and len(classify_calls) == calls
+              and stub.requests["/search"] == searches + 1)
+        reply = app.get_bot_response("show it on a map", session_id=SESSION)
+        check("map follow-up links the last city", "hospitals+in+Boston" in reply and len(classify_calls) == calls)
+
+        # Messages with a subject of their own go to the classifier, even with "it" or "that" in them
+        for message in ["my chest hurts, is that dangerous?", "I have a fever, is it dangerous?",
+                        "Is it safe to go to the hospital?", "what is this rash, is it a risk?"]:
+            app.get_bot_response("Tell me about aspirin", session_id=SESSION)
+            calls = len(classify_calls)
+            reply = app.get_bot_response(message, session_id=SESSION)
+            check(f"'{message}' is classified, not answered from the session",
+                  len(classify_calls) == calls + 1 and "Reye's syndrome" not in reply)
+        app.get_bot_response("Find hospitals in London", session_id=SESSION)
+        reply = app.get_bot_response("so where is the pharmacy", session_id=SESSION)
+        check("'so where is the pharmacy' doesn't get the last city's map", "hospitals+in+London" not in reply)
+
+        # A turn that isn't a follow-up drops the context
+        app.get_bot_response("Tell me about aspirin", session_id=SESSION)
+        app.get_bot_response("hello", session_id=SESSION)
+        calls = len(classify_calls)
+        reply = app.get_bot_response("what about its warnings?", session_id=SESSION)
+        check("context doesn't outlive an unrelated turn", len(classify_calls) == calls + 1
+              and "Reye's syndrome" not in reply)
+
+        # Anything else, or no session at all, goes to the classifier
+        calls = len(classify_calls)
+        app.get_bot_response("I have a fever and a headache", session_id=SESSION)
+        app.get_bot_response("what about its warnings?")
+        check("non-follow-ups and session-less turns use the classifier", len(classify_calls) == calls + 2)
+
+        # The stream reuses the same session handling
+        app.get_bot_response("Tell me about advil", session_id="stream-session")
+        events = list(app.stream_bot_response("is it safe?", session_id="stream-session"))
+        check("streamed follow-up answers from the session",
+              "placeholder" not in events[0][1] and "Allergy alert" in events[1][1]["response"])
+    app.classify_message = classify_message
+
+    check("malformed session ids are ignored",
+          sessions.session_key("abc") is None and sessions.session_key("../../etc/passwd") is None
+          and sessions.session_key({"id": 1}) is None and sessions.session_key(SESSION) == SESSION)
+
+    info = {"found": True, "name": "Advil", "purpose": "Pain reliever", "warnings": "Allergy alert"}
+    store = SessionStore(ttl=0.05)
+    store.put(SESSION, "drug_lookup", "Advil", info)
+    hit = store.get(SESSION) is not None
+    time.sleep(0.1)
+    check("sessions expire after their TTL", hit and store.get(SESSION) is None and store.stats()["expirations"] == 1)
+
+    store = SessionStore(max_sessions=100)
+    for i in range(150):
+        store.put(f"session-{i:04d}", "drug_lookup", "Advil", info)
+        if i >= 50:
+            store.get("session-0000")
+    check("the session count cap evicts the least recently used",
+          len(store) == 100 and store.get("session-0000") is not None and store.get("session-0001") is None)
+
+    store = SessionStore(max_bytes=10000)
+    for i in range(1000):
+        store.put(f"session-{i:04d}", "drug_lookup", "Advil", info)
+    check(f"the memory cap bounds the estimated bytes ({store.bytes}, {len(store)} sessions)",
+          store.bytes <= 10000 and 0 < len(store) < 100)
+
+    report()
+
+if __name__ == "__main__":
+    main()
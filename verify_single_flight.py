@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+import integrations
+from cache import MemoryBackend, TTLCache
+import http_client
+from http_client import CircuitBreaker, TokenBucket
+from stub_upstream import StubUpstream
+from checks import check, report
+
+def concurrently(n, fn, *args):
+    """Runs fn(*args) in n threads released at the same moment; returns their results."""
+    barrier = threading.Barrier(n)
+    values = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        values[i] = fn(*args)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return values
+
+def main():
+    with StubUpstream(delay=0.3) as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_local_index(mode="live")
+        integrations.configure_clients(limiter=False)
+
+        # Threaded callers missing on the same key share one upstream request
+        integrations.configure_cache()
+        infos = concurrently(20, integrations.get_drug_info, "advil")
+        check(f"20 concurrent drug lookups made {stub.requests['/drug/label.json']} upstream request(s)",
+              stub.requests["/drug/label.json"] == 1)
+        check("every caller got the shared answer", all(info["found"] for info in infos))
+        check("followers are counted as coalesced", integrations.cache_stats()["openfda"]["coalesced"] == 19)
+
+        concurrently(10, integrations.get_hospitals, "Boston")
+        check("spellings normalizing to one key share a request too", stub.requests["/search"] == 1)
+
+        # Distinct keys still fetch independently
+        stub.reset()
+        integrations.configure_cache()
+        for city in ("paris", "london"):
+            threading.Thread(target=integrations.get_hospitals, args=(city,)).start()
+        integrations.get_hospitals("boston")
+        time.sleep(0.1)
+        check("different keys are not coalesced", stub.requests["/search"] == 3)
+
+        # Errors are shared with the waiting callers and not cached
+        stub.reset()
+        stub.failures = 1
+        integrations.configure_cache()
+        integrations.configure_clients(retries=0, limiter=False)
+        infos = concurrently(5, integrations.get_drug_info, "aspirin")
+        check("a failed fetch is shared, not retried by each caller",
+              stub.requests["/drug/label.json"] == 1 and all("error" in info for info in infos))
+        check("the next call fetches again", integrations.get_drug_info("aspirin")["found"]
+              and stub.requests["/drug/label.json"] == 2)
+
+    # asyncio callers on one event loop share one fetch
+    cache = TTLCache("async", MemoryBackend())
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"found": True}
+
+    async def gather():
+        return await asyncio.gather(*[cache.get_or_fetch_async("key", fetch) for _ in range(20)])
+
+    infos = asyncio.run(gather())
+    check(f"20 concurrent async lookups ran {len(calls)} fetch(es)", len(calls) == 1 and all(i["found"] for i in infos))
+
+    # Token bucket: bursts are released at the configured rate, the queue is bounded
+    bucket = TokenBucket(rate=20, burst=2, max_wait=0.18)
+    start = time.perf_counter()
+    waits = [bucket.reserve() for _ in range(6)]
+    check(f"burst of 2 passes immediately, then 1/20s apart ({[round(w, 2) if w is not None else w for w in waits]})",
+          waits[:2] == [0.0, 0.0] and all(abs(w - 0.05 * i) < 0.01 for i, w in enumerate(waits[2:5], 1)))
+    check("requests beyond max_wait are rejected", waits[5] is None and bucket.rejected == 1)
+    time.sleep(max(0.0, 0.3 - (time.perf_counter() - start)))
+    check("tokens refill over time", bucket.reserve() == 0.0)
+
+    # A rate-limited client degrades to an uncached error instead of queueing forever
+    with StubUpstream() as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+        integrations.configure_clients(limiter=TokenBucket(rate=1, burst=1, max_wait=0.1))
+        first = integrations.get_drug_info("advil")
+        second = integrations.get_drug_info("tylenol")
+        check("second request within the window is rejected without reaching the upstream",
+              first["found"] and second == {"found": False, "error": "openfda rate limit exceeded"}
+              and stub.requests["/drug/label.json"] == 1)
+
+        # A half-open probe turned away by the limiter must not leave the circuit stuck
+        breaker = CircuitBreaker("openfda", failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        limiter = TokenBucket(rate=10, burst=1, max_wait=0)
+        limiter.reserve()
+        integrations.configure_clients(breaker=breaker, limiter=limiter)
+        time.sleep(0.06)
+        limited = integrations.get_drug_info("advil")
+        time.sleep(0.1)
+        probed = integrations.get_drug_info("advil")
+        check("a rate-limited half-open probe is released for the next call",
+              limited.get("error") == "openfda rate limit exceeded" and probed["found"]
+              and breaker.state == CircuitBreaker.CLOSED)
+        print(f"Cache stats: {integrations.cache_stats()}")
+
+    # Worker processes split the default rates, so together they keep to e.g. Nominatim's 1 request/s
+    http_client.set_processes(4)
+    integrations.configure_clients()
+    shares = {client.name: client.limiter.rate for client in (integrations.openfda_client, integrations.nominatim_client)}
+    http_client.set_processes(1)
+    check(f"4 workers each get a quarter of the default rates ({shares})",
+          shares == {name: rate / 4 for name, rate in http_client.RATE_LIMITS.items()}
+          and integrations.nominatim_async_client.limiter is integrations.nominatim_client.limiter)
+
+    report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import json
+import time
+import app
+import integrations
+from stub_upstream import StubUpstream
+from checks import check, report
+
+UPSTREAM_DELAY = 0.5
+
+def timed_events(message):
+    """Returns [(event, data, seconds since the call)] for one streamed reply."""
+    start = time.perf_counter()
+    return [(event, data, time.perf_counter() - start) for event, data in app.stream_bot_response(message)]
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def main():
+    if not app.load_artifacts():
+        raise SystemExit("Model not found. Run train.py first.")
+
+    with StubUpstream(delay=UPSTREAM_DELAY) as stub:
+        integrations.OPENFDA_URL = stub.openfda_url
+        integrations.NOMINATIM_URL = stub.nominatim_url
+        integrations.configure_local_index(mode="live")
+        integrations.configure_clients(limiter=False)
+        integrations.configure_cache(ttl=0, negative_ttl=0, stale_ttl=0)
+
+        # A hospital search streams its intent and placeholder before Nominatim answers
+        events = timed_events("Find hospitals in Boston")
+        names = [event for event, _, _ in events]
+        check(f"events arrive as intent, response, done ({names})", names == ["intent", "response", "done"])
+        (_, intent, first), (_, response, last) = events[:2]
+        check(f"intent streamed after {first * 1e3:.0f}ms, before the {UPSTREAM_DELAY * 1e3:.0f}ms upstream",
+              intent["tag"] == "hospital_search" and "Boston" in intent["placeholder"] and first < UPSTREAM_DELAY / 2)
+        check(f"full reply followed after {last * 1e3:.0f}ms", last >= UPSTREAM_DELAY)
+
+        blocking_start = time.perf_counter()
+        blocking = app.get_bot_response("Find hospitals in Boston")
+        blocking_elapsed = time.perf_counter() - blocking_start
+        check("streamed reply matches /get_response",
+              response["response"] == blocking and "Massachusetts General Hospital" in blocking and "View on Map" in blocking)
+        print(f"       time to first byte: {first * 1e3:.1f}ms streamed vs {blocking_elapsed * 1e3:.1f}ms blocking")
+
+        # Drug lookups stream the same way
+        events = timed_events("Tell me about Advil")
+        check("drug lookup streams a placeholder, then the FDA info",
+              events[0][1].get("placeholder") and "Ibuprofen" in events[1][1]["response"] and events[0][2] < UPSTREAM_DELAY / 2)
+
+        # Replies without a lookup come in one go with no placeholder
+        events = timed_events("hello")
+        check("greeting has no placeholder and no upstream call",
+              "placeholder" not in events[0][1] and events[1][0] == "response" and stub.requests["/search"] == 2)
+
+        # Upstream failures still end the stream with a reply
+        stub.failures = 100
+        integrations.configure_clients(retries=0, limiter=False)
+        events = timed_events("Find hospitals in Boston")
+        check("failed lookup answers with the not-found reply", "couldn't find hospitals" in events[1][1]["response"]
+              and events[-1][0] == "done")
+
+    # Wire format: one "event:"/"data:" block per event
+    wire = "".join(app.format_sse(event, data) for event, data in
+                   [("intent", {"tag": "greeting", "model_version": "v1"}), ("response", {"response": "Hi!<br>"}), ("done", {})])
+    check("events round-trip through the SSE encoding",
+          parse_sse(wire) == [("intent", {"tag": "greeting", "model_version": "v1"}),
+                              ("response", {"response": "Hi!<br>"}), ("done", {})])
+
+    report()
+
+if __name__ == "__main__":
+    main()
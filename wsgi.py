@@ -0,0 +1,13 @@
+"""
+Production WSGI entry point.
+
+    gunicorn wsgi:app          # picks up gunicorn.conf.py from this directory
+
+The model is loaded here, at import time. With preload_app=True (see
+gunicorn.conf.py) that happens once in the master, before the workers are
+forked, so every worker shares the read-only model pages copy-on-write.
+"""
+from app import create_app
+
+# The watcher thread would not survive fork(); gunicorn.conf.py starts it per worker
+app = create_app(watch=False)